@@ -0,0 +1,138 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models import AnalysisCacheEntry, SessionLocal
+
+
+def make_cache_key(image_data: bytes, mime_type: str, prompt: str, model_name: str) -> str:
+    digest = hashlib.sha256()
+    for part in (mime_type, prompt, model_name):
+        encoded = part.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    digest.update(image_data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 86400, persistent: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'persistent_errors': 0,
+        }
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return copy.deepcopy(result)
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        if self.persistent:
+            result = self._get_persistent(key)
+            if result is not None:
+                self._store_memory(key, result)
+                with self._lock:
+                    self._counters['persistent_hits'] += 1
+                return copy.deepcopy(result)
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        result = copy.deepcopy(result)
+        self._store_memory(key, result)
+        if self.persistent:
+            self._set_persistent(key, result)
+        with self._lock:
+            self._counters['stores'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters['memory_hits'] + counters['persistent_hits']
+        lookups = hits + counters['misses']
+        return {
+            **counters,
+            'hits': hits,
+            'hit_rate': round(hits / lookups * 100, 2) if lookups else 0,
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'persistent': self.persistent,
+        }
+
+    def _store_memory(self, key: str, result: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _get_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            entry = db.get(AnalysisCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+                db.delete(entry)
+                db.commit()
+                with self._lock:
+                    self._counters['expirations'] += 1
+                return None
+            return json.loads(entry.result)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._counters['persistent_errors'] += 1
+            return None
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: str, result: Dict[str, Any]) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(AnalysisCacheEntry(
+                cache_key=key,
+                created_at=datetime.utcnow(),
+                result=json.dumps(result)
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._counters['persistent_errors'] += 1
+        finally:
+            db.close()
@@ -0,0 +1,388 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTION_KEYWORDS = re.compile(
+    r'(?P<overall_recommendation>recommendation)'
+    r'|(?P<confidence_level>confidence)'
+    r'|(?P<trend_direction>trend)'
+    r'|(?P<support_levels>support)'
+    r'|(?P<resistance_levels>resistance)'
+    r'|(?P<rsi_analysis>\brsi\b)'
+    r'|(?P<macd_analysis>\bmacd\b)'
+    r'|(?P<fibonacci_levels>fibonacci)'
+    r'|(?P<key_observations>observation)'
+    r'|(?P<risk_factors>risk)'
+    r'|(?P<entry_points>entry|entries)'
+    r'|(?P<exit_points>exit)'
+    r'|(?P<summary>summary|conclusion)'
+)
+
+LIST_SECTIONS = (
+    'support_levels',
+    'resistance_levels',
+    'key_observations',
+    'risk_factors',
+    'entry_points',
+    'exit_points',
+)
+
+HEADING_LINE = re.compile(
+    r'^(?P<hashes>#{1,6}[ \t]*)?(?P<bold>\*\*|__)?(?P<number>\d{1,2}[.)][ \t]*)?(?(bold)|(?P<inner_bold>\*\*|__)?)'
+    r'(?P<label>[A-Za-z][A-Za-z &/()\'-]{0,58}+)(?:\*\*|__)?'
+    r'(?:(?P<colon>:)[ \t]*(?:\*\*|__)?|$)(?P<rest>.*)'
+)
+HEADING_START = frozenset('#*_0123456789')
+BULLET_START = frozenset('-*•+')
+BULLET_LINE = re.compile(r'^(?:[-*•+]|\d{1,2}[.)])[ \t]+(?P<item>.+)$')
+EMPHASIS = re.compile(r'\*\*|__|`')
+
+RECOMMENDATION = re.compile(r'\b(STRONG BUY|STRONG SELL|BUY|SELL|HOLD)\b')
+CONFIDENCE = re.compile(r'\b(HIGH|MEDIUM|MODERATE|LOW)\b')
+TREND = re.compile(r'\b(BULLISH|BEARISH|SIDEWAYS|NEUTRAL|RANGING)\b')
+INDICATOR_SIGNAL_LINE = re.compile(r'\b[^:\n]{0,20}:[ \t]*\W*(?P<signal>[a-z]+)')
+INDICATOR_SIGNALS = ('OVERBOUGHT', 'OVERSOLD', 'BULLISH', 'BEARISH', 'NEUTRAL')
+INDICATOR_VALUE_KEYWORDS = ('value', 'reading', 'level', 'histogram', 'currently', 'around', 'approximately')
+INDICATOR_VALUE = re.compile(r'\b[^\d\n-]{0,25}?(?P<value>-?\d+(?:\.\d+)?)')
+LABELLED_VALUE = re.compile(r'^[A-Za-z][\w ()/-]{0,30}:[ \t]*[\w.%$-]{0,12}$')
+INTERPRETATION_LINE = re.compile(r'\b[^:\n]{0,10}:[ \t]*')
+PRICE = re.compile(r'\$[ \t]*(\d[\d,]*(?:\.\d+)?)|(\d[\d,]*\.\d+)(?![\d%])')
+STANDARD_FIB_LEVELS = ('0%', '23.6%', '38.2%', '50%', '61.8%', '78.6%', '100%')
+
+
+def _clean(text: str) -> str:
+    if '*' in text or '_' in text or '`' in text:
+        text = EMPHASIS.sub('', text)
+    return text.strip()
+
+
+def _bullet_item(line: str) -> Optional[str]:
+    first = line[0]
+    if first in BULLET_START:
+        return line[1:].lstrip() if len(line) > 1 and line[1] in ' \t' else None
+    if first.isdigit():
+        bullet = BULLET_LINE.match(line)
+        return bullet.group('item') if bullet else None
+    return None
+
+
+def classify_heading(match: re.Match) -> Optional[str]:
+    label = match.group('label').rstrip()
+    if not (match.group('hashes') or match.group('bold') or match.group('inner_bold')):
+        if not match.group('colon'):
+            return None
+        if not match.group('number') and len(label.split()) > 4:
+            return None
+
+    section = section_for_label(label.lower())
+    if section is None:
+        return '' if match.group('hashes') else None
+    return section
+
+
+@lru_cache(maxsize=1024)
+def section_for_label(label: str) -> Optional[str]:
+    keyword = SECTION_KEYWORDS.search(label)
+    return keyword.lastgroup if keyword else None
+
+
+def index_sections(text: str) -> Dict[str, Dict[str, Any]]:
+    sections: Dict[str, Dict[str, Any]] = {}
+    current: Optional[Dict[str, Any]] = None
+    current_name = ''
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        first = line[0]
+        if first in HEADING_START or (first.isalpha() and ':' in line):
+            match = HEADING_LINE.match(line)
+            name = classify_heading(match) if match is not None else None
+            if name is not None and name != current_name:
+                current_name = name
+                if not name:
+                    current = None
+                    continue
+                rest = _clean(match.group('rest'))
+                current = sections.get(name)
+                if current is None:
+                    current = sections[name] = {'rest': rest, 'lines': []}
+                elif rest:
+                    current['lines'].append(rest)
+                continue
+
+        if current is not None:
+            current['lines'].append(line)
+
+    return sections
+
+
+def section_text(section: Dict[str, Any]) -> str:
+    return '\n'.join([section['rest']] + section['lines']) if section['rest'] else '\n'.join(section['lines'])
+
+
+def extract_recommendation(section: Optional[Dict[str, Any]], text: str) -> str:
+    for source in (section_text(section) if section else '', text):
+        match = RECOMMENDATION.search(source.upper())
+        if match:
+            return match.group(1)
+    return "HOLD"
+
+
+def extract_choice(section: Optional[Dict[str, Any]], pattern: re.Pattern, aliases: Dict[str, str]) -> str:
+    if section is None:
+        return "N/A"
+    match = pattern.search(section_text(section).upper())
+    if match is None:
+        return "N/A"
+    return aliases.get(match.group(1), match.group(1))
+
+
+def extract_list(section: Optional[Dict[str, Any]]) -> List[str]:
+    items = []
+    if section is not None:
+        if section['rest']:
+            items.append(section['rest'])
+        prose = []
+        has_bullets = False
+        for line in section['lines']:
+            if len(items) >= 5:
+                break
+            item = _bullet_item(line)
+            if item is not None:
+                has_bullets = True
+                item = _clean(item)
+                if item:
+                    items.append(item)
+            elif not has_bullets:
+                prose.append(line)
+        if not has_bullets:
+            items.extend(item for item in map(_clean, prose[:5]) if item)
+    return items[:5] if items else ["Not identified in chart"]
+
+
+def _match_after(text: str, keywords: tuple, pattern: re.Pattern) -> Optional[re.Match]:
+    best = None
+    for keyword in keywords:
+        start = text.find(keyword)
+        while start != -1:
+            if best is not None and start >= best.start():
+                break
+            end = start + len(keyword)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                match = pattern.match(text, end)
+                if match:
+                    best = match
+                    break
+            start = text.find(keyword, end)
+    return best
+
+
+def extract_indicator(section: Optional[Dict[str, Any]], name: str) -> Dict[str, str]:
+    result = {
+        "name": name,
+        "value": "N/A",
+        "signal": "NEUTRAL",
+        "description": "Not visible or cannot be determined"
+    }
+    if section is None:
+        return result
+
+    body = section_text(section)
+    lowered = body.lower()
+    explicit = _match_after(lowered, ('signal',), INDICATOR_SIGNAL_LINE)
+    if explicit and explicit.group('signal').upper() in INDICATOR_SIGNALS:
+        result["signal"] = explicit.group('signal').upper()
+    else:
+        for signal in INDICATOR_SIGNALS[:-1]:
+            if signal.lower() in lowered:
+                result["signal"] = signal
+                break
+
+    value = _match_after(lowered, INDICATOR_VALUE_KEYWORDS, INDICATOR_VALUE)
+    if value:
+        result["value"] = value.group('value')
+
+    interpretation = _match_after(lowered, ('interpretation',), INTERPRETATION_LINE)
+    if interpretation:
+        end = body.find('\n', interpretation.end())
+        result["description"] = _clean(body[interpretation.end():end if end != -1 else None])[:200]
+    else:
+        for line in ([section['rest']] if section['rest'] else []) + section['lines']:
+            item = _bullet_item(line)
+            description = _clean(item if item is not None else line)
+            if not description or LABELLED_VALUE.match(description):
+                continue
+            result["description"] = description[:200]
+            break
+
+    return result
+
+
+def extract_fibonacci(section: Optional[Dict[str, Any]], text: str) -> List[Dict[str, str]]:
+    lines = ([section['rest']] + section['lines']) if section else text.splitlines()
+    found: Dict[str, Dict[str, str]] = {}
+
+    for line in lines:
+        if '%' not in line:
+            continue
+        for level in STANDARD_FIB_LEVELS:
+            if level in found:
+                continue
+            start = line.find(level)
+            while start > 0 and (line[start - 1].isdigit() or line[start - 1] == '.'):
+                start = line.find(level, start + 1)
+            if start == -1:
+                continue
+            tail = line[start + len(level):]
+            price = PRICE.search(tail)
+            lowered = tail.lower()
+            significance = "Key level"
+            if "support" in lowered:
+                significance = "Acting as support"
+            elif "resistance" in lowered:
+                significance = "Acting as resistance"
+            found[level] = {
+                "level": level,
+                "price": (price.group(1) or price.group(2)) if price else "See chart",
+                "significance": significance
+            }
+
+    fib_levels = [found[level] for level in STANDARD_FIB_LEVELS if level in found]
+    if not fib_levels:
+        fib_levels.append({
+            "level": "N/A",
+            "price": "N/A",
+            "significance": "Fibonacci levels not visible on chart"
+        })
+    return fib_levels
+
+
+def extract_summary(section: Optional[Dict[str, Any]], text: str) -> str:
+    if section is not None:
+        parts = [_clean(line) for line in ([section['rest']] if section['rest'] else []) + section['lines']]
+        summary = ' '.join(part for part in parts if part)
+        if summary:
+            return summary[:500]
+
+    sentences = text.replace('\n', ' ').split('.')
+    return '. '.join(sentences[:3]) + '.' if sentences else "Analysis complete."
+
+
+def build_field(name: str, sections: Dict[str, Dict[str, Any]], text: str) -> Any:
+    section = sections.get(name)
+    if name == 'overall_recommendation':
+        return extract_recommendation(section, text)
+    if name == 'confidence_level':
+        return extract_choice(section, CONFIDENCE, {'MODERATE': 'MEDIUM'})
+    if name == 'trend_direction':
+        return extract_choice(section, TREND, {'NEUTRAL': 'SIDEWAYS', 'RANGING': 'SIDEWAYS'})
+    if name in LIST_SECTIONS:
+        return extract_list(section)
+    if name == 'rsi_analysis':
+        return extract_indicator(section, "RSI")
+    if name == 'macd_analysis':
+        return extract_indicator(section, "MACD")
+    if name == 'fibonacci_levels':
+        return extract_fibonacci(section, text)
+    if name == 'summary':
+        return extract_summary(section, text)
+    raise KeyError(name)
+
+
+FIELD_ORDER = (
+    'overall_recommendation',
+    'confidence_level',
+    'trend_direction',
+    'support_levels',
+    'resistance_levels',
+    'rsi_analysis',
+    'macd_analysis',
+    'fibonacci_levels',
+    'key_observations',
+    'risk_factors',
+    'entry_points',
+    'exit_points',
+    'summary',
+)
+
+
+def parse_analysis(raw_text: str) -> Dict[str, Any]:
+    sections = index_sections(raw_text)
+    result = {name: build_field(name, sections, raw_text) for name in FIELD_ORDER}
+    result["raw_analysis"] = raw_text
+    return result
+
+
+def _bullets(values) -> str:
+    return '\n'.join(f'   - {value}' for value in values)
+
+
+def format_analysis(analysis: Dict[str, Any]) -> str:
+    sections = []
+    for number, name in enumerate(FIELD_ORDER, 1):
+        title = name.replace('_', ' ').title().replace('Rsi', 'RSI').replace('Macd', 'MACD')
+        value = analysis[name]
+        if name in ('rsi_analysis', 'macd_analysis'):
+            lines = [f'   - Current approximate value: {value["value"]}'] if value['value'] != 'N/A' else []
+            lines += [f'   - Signal: {value["signal"]}', f'   - Interpretation: {value["description"]}']
+            body = '\n' + '\n'.join(lines)
+        elif name == 'fibonacci_levels':
+            title = 'Fibonacci Retracement Levels'
+            body = '\n' + _bullets(f'{level["level"]} at {level["price"]} - {level["significance"]}' for level in value)
+        elif name in LIST_SECTIONS:
+            body = '\n' + _bullets(value)
+        else:
+            body = f' {value}'
+        sections.append(f'{number}. **{title}**:{body}\n')
+    return '\n'.join(sections)
+
+
+def heading_section(line: str) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    first = line[0]
+    if not (first in HEADING_START or (first.isalpha() and ':' in line)):
+        return None
+    match = HEADING_LINE.match(line)
+    return classify_heading(match) if match is not None else None
+
+
+class StreamingAnalysisParser:
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._partial_line = ''
+        self._current = ''
+        self._emitted = set()
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._chunks.append(chunk)
+        lines = (self._partial_line + chunk).split('\n')
+        self._partial_line = lines.pop()
+
+        finished = []
+        for line in lines:
+            name = heading_section(line)
+            if name is None or name == self._current:
+                continue
+            if self._current and self._current not in self._emitted:
+                finished.append(self._current)
+            self._current = name
+
+        if not finished:
+            return []
+
+        text = self.text
+        sections = index_sections(text)
+        self._emitted.update(finished)
+        return [(name, build_field(name, sections, text)) for name in finished]
+
+    def close(self) -> Dict[str, Any]:
+        return parse_analysis(self.text)
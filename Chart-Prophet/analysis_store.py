@@ -0,0 +1,265 @@
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import zstandard
+from sqlalchemy import delete, exists, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import AnalysisBlob, SessionLocal, Trade
+
+DEFAULT_CODEC = 'zstd'
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+LOOKUP_CHUNK = 500
+BACKFILL_BATCH_ROWS = 1000
+DEFAULT_CACHE_SIZE = 256
+
+
+def content_hash(analysis: str) -> str:
+    return hashlib.sha256(analysis.encode('utf-8')).hexdigest()
+
+
+def encode_analysis(analysis: str, codec: Optional[str] = None) -> Tuple[str, bytes]:
+    raw = analysis.encode('utf-8')
+    codec = codec or DEFAULT_CODEC
+    if codec == 'zstd':
+        packed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        packed = zlib.compress(raw, ZLIB_LEVEL)
+    if len(packed) >= len(raw):
+        return 'none', raw
+    return codec, packed
+
+
+def decode_analysis(codec: str, data: bytes) -> str:
+    if codec == 'zstd':
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        raw = zlib.decompress(data)
+    elif codec == 'none':
+        raw = data
+    else:
+        raise RuntimeError(f'Unknown analysis codec: {codec}')
+    return bytes(raw).decode('utf-8')
+
+
+class TextCache:
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'decompressed_bytes': 0, 'stored_blobs': 0, 'deduplicated': 0}
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, str]:
+        found = {}
+        with self._lock:
+            for analysis_id in ids:
+                analysis = self._entries.get(analysis_id)
+                if analysis is None:
+                    self._counters['misses'] += 1
+                    continue
+                self._entries.move_to_end(analysis_id)
+                self._counters['hits'] += 1
+                found[analysis_id] = analysis
+        return found
+
+    def put(self, analysis_id: int, analysis: str, decompressed: bool = False) -> None:
+        with self._lock:
+            if decompressed:
+                self._counters['decompressed_bytes'] += len(analysis)
+            if self.max_entries <= 0:
+                return
+            self._entries[analysis_id] = analysis
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'codec': DEFAULT_CODEC
+            }
+
+
+_cache = TextCache()
+
+
+def configure(cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+    global _cache
+    _cache = TextCache(cache_size)
+
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def _chunks(values: Sequence, size: int = LOOKUP_CHUNK) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _existing_ids(bind, hashes: Sequence[str]) -> Dict[str, int]:
+    found = {}
+    for chunk in _chunks(hashes):
+        rows = bind.execute(select(AnalysisBlob.content_hash, AnalysisBlob.id).where(AnalysisBlob.content_hash.in_(chunk)))
+        found.update({digest: analysis_id for digest, analysis_id in rows})
+    return found
+
+
+def _insert_missing(bind, rows: List[Dict[str, Any]]) -> None:
+    table = AnalysisBlob.__table__
+    dialect = bind.get_bind().dialect.name if hasattr(bind, 'get_bind') else bind.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+        bind.execute(statement.on_conflict_do_nothing(index_elements=[table.c.content_hash]), rows)
+        return
+    for row in rows:
+        if not _existing_ids(bind, [row['content_hash']]):
+            bind.execute(insert(table).values(**row))
+
+
+def store_analyses(bind, analyses: Sequence[Optional[str]]) -> List[Optional[int]]:
+    hashes = [content_hash(analysis) if analysis is not None else None for analysis in analyses]
+    unique = {digest: analysis for digest, analysis in zip(hashes, analyses) if digest is not None}
+    if not unique:
+        return [None] * len(hashes)
+
+    ids = _existing_ids(bind, list(unique))
+    missing = [digest for digest in unique if digest not in ids]
+    if missing:
+        rows = []
+        for digest in missing:
+            codec, data = encode_analysis(unique[digest])
+            rows.append({
+                'content_hash': digest,
+                'codec': codec,
+                'raw_size': len(unique[digest].encode('utf-8')),
+                'stored_size': len(data),
+                'data': data
+            })
+        _insert_missing(bind, rows)
+        ids.update(_existing_ids(bind, missing))
+        _cache.count('stored_blobs', len(missing))
+    _cache.count('deduplicated', sum(1 for digest in hashes if digest is not None) - len(missing))
+    return [ids.get(digest) if digest is not None else None for digest in hashes]
+
+
+def store_analysis(bind, analysis: Optional[str]) -> Optional[int]:
+    return store_analyses(bind, [analysis])[0]
+
+
+def load_analyses(bind, ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    wanted = list(dict.fromkeys(analysis_id for analysis_id in ids if analysis_id is not None))
+    found = _cache.get_many(wanted)
+    missing = [analysis_id for analysis_id in wanted if analysis_id not in found]
+    for chunk in _chunks(missing):
+        rows = bind.execute(select(AnalysisBlob.id, AnalysisBlob.codec, AnalysisBlob.data).where(AnalysisBlob.id.in_(chunk)))
+        for analysis_id, codec, data in rows:
+            analysis = decode_analysis(codec, data)
+            _cache.put(analysis_id, analysis, decompressed=True)
+            found[analysis_id] = analysis
+    return found
+
+
+def load_analysis(bind, analysis_id: Optional[int]) -> Optional[str]:
+    return load_analyses(bind, [analysis_id]).get(analysis_id)
+
+
+def backfill_analyses(connection, batch_rows: int = BACKFILL_BATCH_ROWS) -> int:
+    moved = 0
+    last_id = 0
+    statement = text(
+        'SELECT id, raw_analysis FROM trades WHERE id > :last_id AND raw_analysis IS NOT NULL '
+        'AND analysis_id IS NULL ORDER BY id LIMIT :batch_rows'
+    )
+    assign = text('UPDATE trades SET analysis_id = :blob_id WHERE id = :trade_id')
+    while True:
+        rows = connection.execute(statement, {'last_id': last_id, 'batch_rows': batch_rows}).all()
+        if not rows:
+            return moved
+        ids = store_analyses(connection, [analysis for _, analysis in rows])
+        connection.execute(assign, [{'trade_id': trade_id, 'blob_id': blob_id} for (trade_id, _), blob_id in zip(rows, ids)])
+        moved += len(rows)
+        last_id = rows[-1][0]
+
+
+def storage_report(bind) -> Dict[str, Any]:
+    blob_count, stored_bytes, unique_bytes = bind.execute(select(
+        func.count(AnalysisBlob.id),
+        func.coalesce(func.sum(AnalysisBlob.stored_size), 0),
+        func.coalesce(func.sum(AnalysisBlob.raw_size), 0)
+    )).one()
+    trade_count, logical_bytes = bind.execute(
+        select(func.count(Trade.id), func.coalesce(func.sum(AnalysisBlob.raw_size), 0))
+        .select_from(Trade).join(AnalysisBlob, Trade.analysis_id == AnalysisBlob.id)
+    ).one()
+    codecs = {
+        codec: {'blobs': count, 'raw_bytes': int(raw), 'stored_bytes': int(stored)}
+        for codec, count, raw, stored in bind.execute(
+            select(AnalysisBlob.codec, func.count(AnalysisBlob.id), func.sum(AnalysisBlob.raw_size), func.sum(AnalysisBlob.stored_size))
+            .group_by(AnalysisBlob.codec)
+        )
+    }
+    orphans = bind.execute(select(func.count(AnalysisBlob.id)).where(~_referenced())).scalar()
+    logical_bytes, stored_bytes, unique_bytes = int(logical_bytes), int(stored_bytes), int(unique_bytes)
+    return {
+        'trades_with_analysis': trade_count,
+        'blobs': blob_count,
+        'orphaned_blobs': orphans,
+        'logical_bytes': logical_bytes,
+        'unique_bytes': unique_bytes,
+        'stored_bytes': stored_bytes,
+        'saved_bytes': logical_bytes - stored_bytes,
+        'deduplication_ratio': round(logical_bytes / unique_bytes, 3) if unique_bytes else None,
+        'compression_ratio': round(unique_bytes / stored_bytes, 3) if stored_bytes else None,
+        'codecs': codecs
+    }
+
+
+def _referenced():
+    return exists().where(Trade.analysis_id == AnalysisBlob.id)
+
+
+def prune_orphans(bind) -> int:
+    result = bind.execute(delete(AnalysisBlob).where(~_referenced()))
+    _cache.clear()
+    return result.rowcount
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Report on or prune the deduplicated raw analysis store.')
+    parser.add_argument('command', choices=('report', 'prune'))
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == 'report':
+            print(json.dumps(storage_report(db), indent=2))
+            return 0
+        removed = prune_orphans(db)
+        db.commit()
+        print(f'removed {removed} unreferenced analysis blobs')
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models import Trade
+from trade_queries import QueryError, apply_trade_filters
+
+BREAKDOWN_FIELDS = ('recommendation', 'confidence_level', 'trend_direction', 'rsi_signal', 'macd_signal')
+DEFAULT_WINDOW = 20
+DEFAULT_POINTS = 500
+MAX_WINDOW = 1000
+MAX_POINTS = 5000
+
+
+def parse_count(args, name: str, default: int, maximum: int) -> int:
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        count = int(value)
+    except ValueError:
+        raise QueryError(f'{name} must be an integer')
+    if count < 1:
+        raise QueryError(f'{name} must be at least 1')
+    return min(count, maximum)
+
+
+def load_trade_frame(db, args) -> pd.DataFrame:
+    columns = ('id', 'created_at', 'outcome', 'profit_loss') + BREAKDOWN_FIELDS
+    statement = apply_trade_filters(
+        select(*(Trade.__table__.c[name] for name in columns)),
+        args,
+        include_outcome=False
+    ).order_by(Trade.created_at, Trade.id)
+    result = db.execute(statement)
+    frame = pd.DataFrame(result.all(), columns=list(columns))
+    frame['profit_loss'] = frame['profit_loss'].astype('float64')
+    frame['created_at'] = pd.to_datetime(frame['created_at'])
+    for name in ('outcome',) + BREAKDOWN_FIELDS:
+        frame[name] = frame[name].fillna('Unknown').astype('category')
+    return frame
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else np.nan
+
+
+def _sample(values: np.ndarray, timestamps: np.ndarray, points: int) -> Dict[str, list]:
+    if len(values) == 0:
+        return {'trade_index': [], 'created_at': [], 'value': []}
+    index = np.unique(np.linspace(0, len(values) - 1, min(points, len(values))).round().astype(np.int64))
+    return {
+        'trade_index': index.tolist(),
+        'created_at': [pd.Timestamp(stamp).isoformat() if not pd.isna(stamp) else None for stamp in timestamps[index]],
+        'value': [_round(value) for value in values[index]]
+    }
+
+
+def _streaks(wins: np.ndarray) -> Dict[str, Any]:
+    if len(wins) == 0:
+        return {'longest_win': 0, 'longest_loss': 0, 'current': 0, 'current_type': None}
+    boundaries = np.flatnonzero(np.diff(wins.astype(np.int8))) + 1
+    starts = np.concatenate(([0], boundaries))
+    lengths = np.diff(np.concatenate((starts, [len(wins)])))
+    kinds = wins[starts]
+    return {
+        'longest_win': int(lengths[kinds].max(initial=0)),
+        'longest_loss': int(lengths[~kinds].max(initial=0)),
+        'current': int(lengths[-1]),
+        'current_type': 'win' if kinds[-1] else 'loss'
+    }
+
+
+def _drawdown(equity: np.ndarray) -> np.ndarray:
+    return equity - np.maximum(np.maximum.accumulate(equity), 0.0)
+
+
+def summary_metrics(pnl: np.ndarray, wins: np.ndarray) -> Dict[str, Optional[float]]:
+    gross_profit = pnl[pnl > 0].sum()
+    gross_loss = -pnl[pnl < 0].sum()
+    downside = np.sqrt(np.mean(np.minimum(pnl, 0.0) ** 2)) if len(pnl) else np.nan
+    std = pnl.std(ddof=1) if len(pnl) > 1 else np.nan
+    mean = pnl.mean() if len(pnl) else np.nan
+    equity = np.cumsum(pnl)
+    return {
+        'resolved_trades': int(len(wins)),
+        'win_rate': _round(_ratio(wins.sum() * 100.0, len(wins)), 2),
+        'total_profit_loss': _round(pnl.sum(), 2),
+        'expectancy': _round(mean),
+        'average_win': _round(pnl[pnl > 0].mean() if gross_profit else np.nan),
+        'average_loss': _round(pnl[pnl < 0].mean() if gross_loss else np.nan),
+        'profit_factor': _round(_ratio(gross_profit, gross_loss)),
+        'sharpe': _round(_ratio(mean, std)),
+        'sortino': _round(_ratio(mean, downside)),
+        'max_drawdown': _round(_drawdown(equity).min(initial=0.0), 2),
+    }
+
+
+def breakdown(resolved: pd.DataFrame, field: str) -> Dict[str, Dict[str, Optional[float]]]:
+    groups = resolved[field]
+    pnl = resolved['pnl']
+    frame = pd.DataFrame({
+        'group': groups,
+        'win': resolved['win'].astype(np.int64),
+        'pnl': pnl,
+        'gross_profit': pnl.clip(lower=0),
+        'gross_loss': -pnl.clip(upper=0),
+        'downside_sq': pnl.clip(upper=0) ** 2,
+    })
+    frame['equity'] = frame.groupby('group', observed=True)['pnl'].cumsum()
+    frame['drawdown'] = frame['equity'] - frame.groupby('group', observed=True)['equity'].cummax().clip(lower=0)
+
+    grouped = frame.groupby('group', observed=True)
+    stats = grouped.agg(
+        trades=('win', 'size'),
+        wins=('win', 'sum'),
+        total=('pnl', 'sum'),
+        mean=('pnl', 'mean'),
+        std=('pnl', 'std'),
+        gross_profit=('gross_profit', 'sum'),
+        gross_loss=('gross_loss', 'sum'),
+        downside_sq=('downside_sq', 'mean'),
+        max_drawdown=('drawdown', 'min'),
+    )
+    stats['win_rate'] = stats['wins'] * 100.0 / stats['trades']
+    stats['profit_factor'] = stats['gross_profit'] / stats['gross_loss'].replace(0, np.nan)
+    stats['sharpe'] = stats['mean'] / stats['std'].replace(0, np.nan)
+    stats['sortino'] = stats['mean'] / np.sqrt(stats['downside_sq']).replace(0, np.nan)
+
+    return {
+        str(label): {
+            'resolved_trades': int(row.trades),
+            'win_rate': _round(row.win_rate, 2),
+            'total_profit_loss': _round(row.total, 2),
+            'expectancy': _round(row.mean),
+            'profit_factor': _round(row.profit_factor),
+            'sharpe': _round(row.sharpe),
+            'sortino': _round(row.sortino),
+            'max_drawdown': _round(min(row.max_drawdown, 0.0), 2),
+        }
+        for label, row in zip(stats.index, stats.itertuples())
+    }
+
+
+def performance_report(frame: pd.DataFrame, window: int = DEFAULT_WINDOW, points: int = DEFAULT_POINTS) -> Dict[str, Any]:
+    outcome = frame['outcome'].astype(str)
+    resolved_mask = outcome.isin(('win', 'loss')).to_numpy()
+    resolved = frame.loc[resolved_mask].assign(
+        win=(outcome[resolved_mask] == 'win').to_numpy(),
+        pnl=frame['profit_loss'].to_numpy()[resolved_mask]
+    )
+    resolved['pnl'] = resolved['pnl'].fillna(0.0)
+
+    wins = resolved['win'].to_numpy()
+    pnl = resolved['pnl'].to_numpy()
+    timestamps = resolved['created_at'].to_numpy()
+    equity = np.cumsum(pnl)
+
+    cumulative_wins = np.concatenate(([0], np.cumsum(wins)))
+    counts = np.minimum(np.arange(1, len(wins) + 1), window)
+    ends = np.arange(1, len(wins) + 1)
+    rolling_win_rate = (cumulative_wins[ends] - cumulative_wins[ends - counts]) * 100.0 / counts
+
+    return {
+        'total_trades': int(len(frame)),
+        'pending_trades': int(len(frame) - resolved_mask.sum()),
+        'summary': summary_metrics(pnl, wins),
+        'streaks': _streaks(wins),
+        'rolling_window': window,
+        'rolling_win_rate': _sample(rolling_win_rate, timestamps, points),
+        'equity_curve': _sample(equity, timestamps, points),
+        'drawdown_curve': _sample(_drawdown(equity), timestamps, points),
+        'breakdowns': {field: breakdown(resolved, field) for field in BREAKDOWN_FIELDS}
+    }
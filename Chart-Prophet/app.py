@@ -1,10 +1,35 @@
 import os
+import json
+import math
 import base64
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify
+import threading
+from flask import Flask, g, render_template, request, jsonify, Response, stream_with_context
+from sqlalchemy import delete
 from werkzeug.utils import secure_filename
-from chart_analyzer import ChartAnalyzer
-from models import Trade, SessionLocal, init_db
+import analysis_store
+import metrics
+from analysis_cache import AnalysisCache
+from analytics import DEFAULT_POINTS, DEFAULT_WINDOW, MAX_POINTS, MAX_WINDOW, load_trade_frame, parse_count, performance_report
+from batch_jobs import BatchCapacityError, BatchJobManager
+from calibration import CalibrationEngine
+from image_preprocessing import preprocess_image
+from indicators import OhlcError, analyze_candles, detect_candle_format, load_candles, parse_series_points, parse_settings
+from chart_analyzer import ChartAnalyzer, is_rate_limit_error
+from chart_digitizer import ChartDigitizer, DigitizeError, parse_digitize_options
+from http_cache import (
+    IMMUTABLE_CACHE_CONTROL, NO_STORE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, AssetVersions, ResponseCompressor,
+    watermark_validators
+)
+from migrations import run_migrations
+from model_backends import create_backend
+from models import Trade, SessionLocal, engine, init_db, pool_metrics
+from perceptual_hash import NearDuplicateIndex
+from profiling import ProfileStore, SamplingProfiler
+from rate_limit import CircuitBreaker, ModelGate, TokenBucket
+from trade_bulk import bulk_delete_trades, bulk_update_trades, parse_delete, parse_updates
+from trade_io import ImportFormatError, detect_format, export_chunks, export_csv, export_parquet, import_trades
+from trade_rollups import apply_trade_change, journal_watermark, rollup_key, rollup_stats, trade_contribution
+from trade_queries import QueryError, apply_trade_filters, compute_stats, paginate_trades, parse_fields, parse_limit, parse_sort
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
@@ -12,18 +37,227 @@ app.config['UPLOAD_FOLDER'] = 'uploads'
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '512'))
+ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', '86400'))
+ANALYSIS_CACHE_PERSIST = os.environ.get('ANALYSIS_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')
+STRUCTURED_OUTPUT = os.environ.get('STRUCTURED_OUTPUT', '').lower() in ('1', 'true', 'yes')
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', '6'))
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '100'))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', '4'))
+BATCH_MAX_JOBS = int(os.environ.get('BATCH_MAX_JOBS', '100'))
+MODEL_REQUESTS_PER_MINUTE = float(os.environ.get('MODEL_REQUESTS_PER_MINUTE', '60'))
+MODEL_BURST = os.environ.get('MODEL_BURST')
+MODEL_RATE_LIMIT_FILE = os.environ.get('MODEL_RATE_LIMIT_FILE')
+MODEL_MAX_QUEUE_WAIT = float(os.environ.get('MODEL_MAX_QUEUE_WAIT', '10'))
+MODEL_CIRCUIT_FAILURES = int(os.environ.get('MODEL_CIRCUIT_FAILURES', '5'))
+MODEL_CIRCUIT_RESET_SECONDS = float(os.environ.get('MODEL_CIRCUIT_RESET_SECONDS', '30'))
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', '5'))
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', '1536'))
+PREVIEW_MAX_DIMENSION = int(os.environ.get('PREVIEW_MAX_DIMENSION', '480'))
+TRADES_PAGE_SIZE = int(os.environ.get('TRADES_PAGE_SIZE', '50'))
+TRADES_MAX_PAGE_SIZE = int(os.environ.get('TRADES_MAX_PAGE_SIZE', '500'))
+TRADE_IMPORT_MAX_BYTES = int(os.environ.get('TRADE_IMPORT_MAX_BYTES', str(256 * 1024 * 1024)))
+DIGITIZE_MODE = os.environ.get('DIGITIZE_MODE', 'off').lower()
+DIGITIZE_WORKERS = int(os.environ.get('DIGITIZE_WORKERS', '0'))
+OHLC_MAX_CANDLES = int(os.environ.get('OHLC_MAX_CANDLES', '1000000'))
+OHLC_MAX_BYTES = int(os.environ.get('OHLC_MAX_BYTES', str(128 * 1024 * 1024)))
+CALIBRATION_BOOTSTRAP_SAMPLES = int(os.environ.get('CALIBRATION_BOOTSTRAP_SAMPLES', '1000'))
+CALIBRATION_CACHE_SIZE = int(os.environ.get('CALIBRATION_CACHE_SIZE', '32'))
+ANALYSIS_TEXT_CACHE_SIZE = int(os.environ.get('ANALYSIS_TEXT_CACHE_SIZE', '256'))
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'gemini').lower()
+MODEL_FAKE_LATENCY_MS = float(os.environ.get('MODEL_FAKE_LATENCY_MS', '800'))
+MODEL_FAKE_LATENCY_SIGMA = float(os.environ.get('MODEL_FAKE_LATENCY_SIGMA', '0.3'))
+MODEL_FAKE_ERROR_RATE = float(os.environ.get('MODEL_FAKE_ERROR_RATE', '0'))
+MODEL_FAKE_RATE_LIMIT_RATE = float(os.environ.get('MODEL_FAKE_RATE_LIMIT_RATE', '0'))
+MODEL_FAKE_SEED = os.environ.get('MODEL_FAKE_SEED')
+
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+analysis_store.configure(cache_size=ANALYSIS_TEXT_CACHE_SIZE)
 init_db()
+run_migrations()
+
+metrics.configure(enabled=METRICS_ENABLED)
+if METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+profiles = ProfileStore()
+
+analysis_cache = AnalysisCache(
+    max_entries=ANALYSIS_CACHE_SIZE,
+    ttl_seconds=ANALYSIS_CACHE_TTL,
+    persistent=ANALYSIS_CACHE_PERSIST
+)
+backend_options = {}
+if MODEL_BACKEND == 'fake':
+    backend_options = {
+        'latency_ms': MODEL_FAKE_LATENCY_MS,
+        'latency_sigma': MODEL_FAKE_LATENCY_SIGMA,
+        'error_rate': MODEL_FAKE_ERROR_RATE,
+        'rate_limit_rate': MODEL_FAKE_RATE_LIMIT_RATE,
+        'seed': int(MODEL_FAKE_SEED) if MODEL_FAKE_SEED else None
+    }
+model_gate = ModelGate(
+    TokenBucket(
+        MODEL_REQUESTS_PER_MINUTE,
+        burst=int(MODEL_BURST) if MODEL_BURST else None,
+        state_file=MODEL_RATE_LIMIT_FILE
+    ),
+    CircuitBreaker(failure_threshold=MODEL_CIRCUIT_FAILURES, reset_timeout=MODEL_CIRCUIT_RESET_SECONDS),
+    max_queue_wait=MODEL_MAX_QUEUE_WAIT,
+    is_saturation_error=is_rate_limit_error
+)
+analyzer = ChartAnalyzer(
+    cache=analysis_cache,
+    structured_output=STRUCTURED_OUTPUT,
+    backend=create_backend(MODEL_BACKEND, **backend_options),
+    gate=model_gate
+)
+near_duplicates = NearDuplicateIndex()
+digitizer = ChartDigitizer(max_workers=DIGITIZE_WORKERS or None)
+calibration = CalibrationEngine(
+    bootstrap_samples=CALIBRATION_BOOTSTRAP_SAMPLES,
+    cache_size=CALIBRATION_CACHE_SIZE
+)
+batch_jobs = BatchJobManager(
+    analyzer,
+    max_concurrency=BATCH_MAX_CONCURRENCY,
+    max_jobs=BATCH_MAX_JOBS
+)
+asset_versions = AssetVersions(app.static_folder)
+compressor = ResponseCompressor(
+    min_bytes=COMPRESS_MIN_BYTES,
+    gzip_level=COMPRESS_GZIP_LEVEL,
+    brotli_quality=COMPRESS_BROTLI_QUALITY
+)
 
-analyzer = ChartAnalyzer()
+def get_db():
+    if 'db' not in g:
+        g.db = SessionLocal()
+    return g.db
+
+@app.teardown_appcontext
+def close_db(exception):
+    db = g.pop('db', None)
+    if db is not None:
+        if exception is not None:
+            db.rollback()
+        db.close()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def stream_unsupported_mode(form):
+    if STRUCTURED_OUTPUT:
+        return 'structured output'
+    if form.get('match', 'exact') != 'exact':
+        return f"match={form.get('match')}"
+    if form.get('digitize', DIGITIZE_MODE) != 'off':
+        return f"digitize={form.get('digitize', DIGITIZE_MODE)}"
+    return None
+
+def prepare_upload(file):
+    with metrics.stage('upload_read'):
+        data = file.read()
+    metrics.observe_payload('upload', len(data))
+    with metrics.stage('preprocess'):
+        image = preprocess_image(
+            data,
+            file.content_type or 'image/png',
+            max_dimension=IMAGE_MAX_DIMENSION,
+            preview_dimension=PREVIEW_MAX_DIMENSION
+        )
+    metrics.observe_payload('model_image', len(image.data))
+    return image
+
+def journal_response(db, build):
+    with metrics.stage('watermark'):
+        etag, last_modified = watermark_validators(journal_watermark(db), request.full_path)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = f'private, {REVALIDATE_CACHE_CONTROL}'
+    return response
+
+def encode_preview(image):
+    with metrics.stage('base64_encode'):
+        return f"data:{image.preview_mime_type};base64,{base64.b64encode(image.preview).decode('utf-8')}"
+
+def collect_runtime_metrics():
+    for name, value in pool_metrics().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield 'chartprophet_db_pool', 'gauge', 'Connection pool checkout and usage figures', {'figure': name}, value
+    analyzer_stats = analyzer.stats()
+    limiter = analyzer_stats['limiter'] or {}
+    for name in ('queue_depth', 'queue_depth_high_water'):
+        if name in limiter:
+            yield 'chartprophet_model_limiter', 'gauge', 'Model rate limiter queue figures', {'figure': name}, limiter[name]
+    for name in ('admitted', 'rejected_queue_full', 'rejected_circuit_open', 'upstream_rate_limited'):
+        if name in limiter:
+            yield 'chartprophet_model_limiter_events_total', 'counter', 'Model calls admitted, rejected or rate limited upstream', {'event': name}, limiter[name]
+    if limiter:
+        yield 'chartprophet_model_circuit_open', 'gauge', 'Whether the model circuit breaker is open', {}, int(limiter['circuit']['state'] == 'open')
+    single_flight = analyzer_stats['single_flight']
+    for name in ('leaders', 'coalesced'):
+        yield 'chartprophet_single_flight_calls_total', 'counter', 'Model calls led or coalesced onto an identical call', {'role': name}, single_flight[name]
+    yield 'chartprophet_single_flight_in_flight', 'gauge', 'Model calls currently in flight', {}, single_flight['in_flight']
+    cache_stats = analysis_cache.stats()
+    for name in ('hits', 'misses', 'evictions'):
+        yield 'chartprophet_analysis_cache_events_total', 'counter', 'Analysis cache hits, misses and evictions', {'event': name}, cache_stats[name]
+    yield 'chartprophet_analysis_cache_size', 'gauge', 'Entries in the analysis cache', {}, cache_stats['size']
+    compression = compressor.stats()
+    for name in ('compressed', 'skipped_small', 'asset_cache_hits'):
+        yield 'chartprophet_http_compression_responses_total', 'counter', 'Responses compressed, skipped as too small or served from the asset cache', {'outcome': name}, compression[name]
+    for name in ('bytes_in', 'bytes_out'):
+        yield 'chartprophet_http_compression_bytes_total', 'counter', 'Response bytes before and after compression', {'direction': name[len('bytes_'):]}, compression[name]
+
+metrics.registry.collector(collect_runtime_metrics)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_token = metrics.begin_request(request.endpoint or 'unmatched')
+    if PROFILER_ENABLED and '1' in (request.args.get('profile'), request.headers.get('X-Profile')):
+        g.profiler = SamplingProfiler(threading.get_ident(), interval=PROFILER_INTERVAL_MS / 1000).start()
+
+@app.after_request
+def finish_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        response.headers['X-Profile-Id'] = profiles.add(request.endpoint or 'unmatched', profiler)
+    metrics.end_request(
+        g.pop('metrics_token', None),
+        request.method,
+        response.status_code,
+        None if response.is_streamed else response.calculate_content_length()
+    )
+    return response
+
+@app.teardown_request
+def discard_request_metrics(error=None):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+    metrics.discard_request(g.pop('metrics_token', None))
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    if endpoint == 'static' and 'v' not in values:
+        version = asset_versions.version(values.get('filename', ''))
+        if version:
+            values['v'] = version
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', stream_analysis=stream_unsupported_mode({}) is None)
 
 @app.route('/history')
 def history():
@@ -42,12 +276,76 @@ def analyze_chart():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type. Please upload PNG, JPG, JPEG, GIF, or WebP'}), 400
     
+    match_mode = request.form.get('match', 'exact')
+    if match_mode not in ('exact', 'similar'):
+        return jsonify({'error': "Invalid match mode. Use 'exact' or 'similar'"}), 400
+    
     try:
-        image_data = file.read()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
-        mime_type = file.content_type or 'image/png'
+        max_distance = int(request.form.get('max_distance', NEAR_DUPLICATE_MAX_DISTANCE))
+    except ValueError:
+        max_distance = -1
+    if max_distance < 0:
+        return jsonify({'error': 'Invalid max_distance. Use a non-negative integer'}), 400
+    
+    digitize_mode = request.form.get('digitize', DIGITIZE_MODE)
+    if digitize_mode not in ('off', 'local', 'summary'):
+        return jsonify({'error': "Invalid digitize mode. Use 'off', 'local' or 'summary'"}), 400
+    
+    try:
+        digitize_options = parse_digitize_options(request.form)
+    except DigitizeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        image = prepare_upload(file)
+        image_data = image.data
+        mime_type = image.mime_type
+        image_preview = encode_preview(image)
+        with metrics.stage('perceptual_hash'):
+            image_hash = near_duplicates.compute_hash(image_data)
         
-        analysis_result = analyzer.analyze_chart(image_data, mime_type)
+        if match_mode == 'similar' and image_hash is not None:
+            match = near_duplicates.find(image_hash, max_distance)
+            if match:
+                return jsonify({
+                    'success': True,
+                    'analysis': match['analysis'],
+                    'image_preview': image_preview,
+                    'preprocessing': image.stats(),
+                    'near_duplicate': {
+                        'fingerprint_id': match['fingerprint_id'],
+                        'distance': match['distance']
+                    }
+                })
+        
+        digitized = None
+        digitize_result = None
+        if digitize_mode != 'off':
+            try:
+                with metrics.stage('digitize'):
+                    digitized = digitizer.digitize(image_data, **digitize_options)
+                digitize_result = digitized.stats()
+            except DigitizeError as e:
+                digitize_result = {'error': str(e)}
+        
+        with metrics.stage('analyze'):
+            if digitized is None:
+                analysis_result = analyzer.analyze_chart(image_data, mime_type)
+            elif digitize_mode == 'local':
+                analysis_result = analyze_candles(digitized.candles, price_units=digitized.price_units)
+            else:
+                local_analysis = analyze_candles(digitized.candles, price_units=digitized.price_units)
+                digitize_result['indicators'] = local_analysis['indicators']
+                analysis_result = analyzer.analyze_summary(digitized.summary(local_analysis))
+        
+        if analysis_result.get('retry_after') is not None:
+            response = jsonify({
+                'success': False,
+                'error': analysis_result.get('message', 'Model API is busy'),
+                'retry_after': analysis_result['retry_after']
+            })
+            response.headers['Retry-After'] = str(max(1, math.ceil(analysis_result['retry_after'])))
+            return response, 503
         
         if analysis_result.get('error'):
             return jsonify({
@@ -56,64 +354,346 @@ def analyze_chart():
                 'analysis': analysis_result
             }), 500
         
+        if image_hash is not None and digitized is None:
+            near_duplicates.add(image_hash, analysis_result)
+        
+        with metrics.stage('json_encode'):
+            return jsonify({
+                'success': True,
+                'analysis': analysis_result,
+                'image_preview': image_preview,
+                'preprocessing': image.stats(),
+                'digitized': digitize_result
+            })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_chart_stream():
+    if 'chart' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    file = request.files['chart']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type. Please upload PNG, JPG, JPEG, GIF, or WebP'}), 400
+    
+    unsupported = stream_unsupported_mode(request.form)
+    if unsupported is not None:
+        return jsonify({'success': False, 'error': f'Streaming does not support {unsupported}; use /analyze'}), 409
+    
+    try:
+        image = prepare_upload(file)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def generate():
+        with metrics.request_scope('analyze_chart_stream'):
+            image_preview = encode_preview(image)
+            yield f"event: preview\ndata: {json.dumps({'image_preview': image_preview, 'preprocessing': image.stats()})}\n\n"
+            
+            try:
+                for event, payload in analyzer.analyze_chart_stream(image.data, image.mime_type):
+                    if event == 'section':
+                        field, value = payload
+                        yield f"event: section\ndata: {json.dumps({'field': field, 'value': value})}\n\n"
+                        continue
+                    
+                    if payload.get('error'):
+                        yield f"event: error\ndata: {json.dumps({'error': payload.get('message', 'Analysis failed'), 'analysis': payload})}\n\n"
+                        return
+                    
+                    image_hash = near_duplicates.compute_hash(image.data)
+                    if image_hash is not None:
+                        near_duplicates.add(image_hash, payload)
+                    yield f"event: complete\ndata: {json.dumps({'analysis': payload})}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'}
+    )
+
+@app.route('/analyze/digitize', methods=['POST'])
+def digitize_charts():
+    files = request.files.getlist('charts') or request.files.getlist('chart')
+    if not files:
+        return jsonify({'success': False, 'error': 'No files uploaded'}), 400
+    
+    if len(files) > BATCH_MAX_FILES:
+        return jsonify({'success': False, 'error': f'Too many files. Maximum is {BATCH_MAX_FILES}'}), 400
+    
+    for file in files:
+        if file.filename == '' or not allowed_file(file.filename):
+            return jsonify({'success': False, 'error': f"Invalid file '{file.filename}'. Please upload PNG, JPG, JPEG, GIF, or WebP"}), 400
+    
+    try:
+        options = parse_digitize_options(request.form)
+        settings = parse_settings(request.form)
+        series_points = parse_series_points(request.form)
+        
+        with metrics.stage('upload_read'):
+            images = [file.read() for file in files]
+        for data in images:
+            metrics.observe_payload('upload', len(data))
+        
+        with metrics.stage('digitize'):
+            digitized_charts = digitizer.digitize_many(images, **options)
+        
+        results = []
+        with metrics.stage('indicators'):
+            for file, (digitized, error) in zip(files, digitized_charts):
+                if error:
+                    results.append({'filename': file.filename, 'success': False, 'error': error})
+                    continue
+                results.append({
+                    'filename': file.filename,
+                    'success': True,
+                    'digitized': digitized.stats(),
+                    'analysis': analyze_candles(digitized.candles, settings, series_points, digitized.price_units)
+                })
+        
+        with metrics.stage('json_encode'):
+            return jsonify({'success': True, 'results': results})
+    except (DigitizeError, OhlcError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/analyze/ohlc', methods=['POST'])
+def analyze_ohlc():
+    request.max_content_length = OHLC_MAX_BYTES
+    
+    try:
+        settings = parse_settings(request.values)
+        series_points = parse_series_points(request.values)
+        
+        with metrics.stage('upload_read'):
+            if 'candles' in request.files:
+                file = request.files['candles']
+                file_format = detect_candle_format(file.filename or '', file.mimetype, request.values.get('format'))
+                data = file.read()
+            else:
+                file_format = detect_candle_format('', request.mimetype, request.values.get('format'))
+                data = request.get_data()
+        metrics.observe_payload('upload', len(data))
+        
+        if not data:
+            return jsonify({'success': False, 'error': 'No candles uploaded'}), 400
+        
+        with metrics.stage('parse'):
+            candles = load_candles(data, file_format, max_candles=OHLC_MAX_CANDLES)
+        
+        with metrics.stage('indicators'):
+            analysis = analyze_candles(candles, settings, series_points)
+        
+        with metrics.stage('json_encode'):
+            return jsonify({
+                'success': True,
+                'analysis': analysis,
+                'candles': candles.stats()
+            })
+    except OhlcError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    files = request.files.getlist('charts')
+    
+    if not files or all(f.filename == '' for f in files):
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    if len(files) > BATCH_MAX_FILES:
+        return jsonify({'error': f'Too many files. Upload at most {BATCH_MAX_FILES} charts per batch'}), 400
+    
+    invalid = [f.filename for f in files if not allowed_file(f.filename)]
+    if invalid:
+        return jsonify({
+            'error': 'Invalid file type. Please upload PNG, JPG, JPEG, GIF, or WebP',
+            'invalid_files': invalid
+        }), 400
+    
+    if not batch_jobs.has_capacity():
+        return jsonify({'success': False, 'error': f'{BATCH_MAX_JOBS} batch jobs are already queued or running; try again later'}), 429
+    
+    try:
+        charts = []
+        for f in files:
+            image = prepare_upload(f)
+            charts.append((secure_filename(f.filename), image.data, image.mime_type))
+        job = batch_jobs.submit(charts)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'total': len(charts),
+            'status_url': f'/analyze/batch/{job.id}',
+            'stream_url': f'/analyze/batch/{job.id}/stream'
+        }), 202
+    except BatchCapacityError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/analyze/batch/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    job = batch_jobs.get(job_id)
+    
+    if not job:
+        return jsonify({'success': False, 'error': 'Batch job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/analyze/batch/<job_id>/stream', methods=['GET'])
+def stream_batch_job(job_id):
+    job = batch_jobs.get(job_id)
+    
+    if not job:
+        return jsonify({'success': False, 'error': 'Batch job not found'}), 404
+    
+    def generate():
+        for item in job.iter_results():
+            if item is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: result\ndata: {json.dumps(item)}\n\n'
+        yield f'event: done\ndata: {json.dumps({"job_id": job.id, "total": len(job.items)})}\n\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'success': True,
+        'stats': analysis_cache.stats(),
+        'near_duplicates': near_duplicates.stats(),
+        'http': {'assets': asset_versions.stats(), 'compression': compressor.stats()},
+        'analyses': analysis_store.stats()
+    })
+
+@app.route('/api/analyses/storage', methods=['GET'])
+def get_analysis_storage():
+    db = get_db()
+    try:
         return jsonify({
             'success': True,
-            'analysis': analysis_result,
-            'image_preview': f'data:{mime_type};base64,{image_base64}'
+            'storage': analysis_store.storage_report(db),
+            'cache': analysis_store.stats()
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/analyzer/stats', methods=['GET'])
+def get_analyzer_stats():
+    return jsonify({
+        'success': True,
+        'stats': {**analyzer.stats(), 'digitizer': digitizer.stats()}
+    })
+
+@app.route('/api/db/pool', methods=['GET'])
+def get_pool_stats():
+    return jsonify({
+        'success': True,
+        'stats': pool_metrics()
+    })
+
 @app.route('/api/trades', methods=['GET'])
 def get_trades():
-    db = SessionLocal()
+    db = get_db()
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        indicator_type = request.args.get('indicator_type')
-        outcome = request.args.get('outcome')
+        fields = parse_fields(request.args.get('fields'))
+        sort_column, descending = parse_sort(request.args.get('sort'))
+        limit = parse_limit(request.args.get('limit'), TRADES_PAGE_SIZE, TRADES_MAX_PAGE_SIZE)
         
-        query = db.query(Trade)
+        def build():
+            query = apply_trade_filters(db.query(Trade), request.args)
+            trades, next_cursor = paginate_trades(
+                query,
+                sort_column,
+                descending,
+                limit,
+                cursor=request.args.get('cursor'),
+                fields=fields
+            )
+            
+            with metrics.stage('json_encode'):
+                return jsonify({
+                    'success': True,
+                    'trades': trades,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None,
+                    'limit': limit
+                })
         
-        if start_date:
-            query = query.filter(Trade.created_at >= datetime.fromisoformat(start_date))
-        if end_date:
-            end = datetime.fromisoformat(end_date) + timedelta(days=1)
-            query = query.filter(Trade.created_at < end)
-        if indicator_type and indicator_type != 'all':
-            query = query.filter(Trade.indicator_type == indicator_type)
-        if outcome and outcome != 'all':
-            query = query.filter(Trade.outcome == outcome)
+        return journal_response(db, build)
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/trades/import', methods=['POST'])
+def import_trades_file():
+    request.max_content_length = TRADE_IMPORT_MAX_BYTES
+    
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    
+    file = request.files['file']
+    on_error = request.form.get('on_error', 'abort')
+    if on_error not in ('abort', 'skip'):
+        return jsonify({'success': False, 'error': "Invalid on_error. Use 'abort' or 'skip'"}), 400
+    
+    db = get_db()
+    try:
+        file_format = detect_format(file.filename or '', request.form.get('format'))
+        result = import_trades(db, file.stream, file_format, skip_invalid=on_error == 'skip')
         
-        trades = query.order_by(Trade.created_at.desc()).all()
+        if result['rejected'] and on_error == 'abort':
+            db.rollback()
+            return jsonify({'success': False, 'error': 'Some rows are invalid; nothing was imported', **result}), 400
         
-        return jsonify({
-            'success': True,
-            'trades': [{
-                'id': t.id,
-                'created_at': t.created_at.isoformat() if t.created_at else None,
-                'symbol': t.symbol,
-                'recommendation': t.recommendation,
-                'confidence_level': t.confidence_level,
-                'trend_direction': t.trend_direction,
-                'outcome': t.outcome,
-                'profit_loss': t.profit_loss,
-                'indicator_type': t.indicator_type,
-                'rsi_signal': t.rsi_signal,
-                'macd_signal': t.macd_signal,
-                'entry_price': t.entry_price,
-                'exit_price': t.exit_price,
-                'notes': t.notes
-            } for t in trades]
-        })
+        db.commit()
+        return jsonify({'success': True, **result})
+    except ImportFormatError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
+        db.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        db.close()
+
+@app.route('/api/trades/export', methods=['GET'])
+def export_trades_file():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        file_format = detect_format('', request.args.get('format', 'csv'))
+    except (QueryError, ImportFormatError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    chunks = export_chunks(get_db(), request.args, fields)
+    if file_format == 'parquet':
+        body, mimetype = export_parquet(chunks, fields), 'application/vnd.apache.parquet'
+    else:
+        body, mimetype = export_csv(chunks, fields), 'text/csv'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=trades.{file_format}'}
+    )
 
 @app.route('/api/trades', methods=['POST'])
 def save_trade():
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.json
         
@@ -130,33 +710,71 @@ def save_trade():
             entry_price=data.get('entry_price'),
             exit_price=data.get('exit_price'),
             notes=data.get('notes'),
-            raw_analysis=data.get('raw_analysis')
+            analysis_id=analysis_store.store_analysis(db, data.get('raw_analysis'))
         )
         
         db.add(trade)
+        db.flush()
+        apply_trade_change(db, None, trade_contribution(trade))
+        trade_id = trade.id
         db.commit()
-        db.refresh(trade)
         
         return jsonify({
             'success': True,
-            'trade_id': trade.id
+            'trade_id': trade_id
         })
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        db.close()
+
+@app.route('/api/trades/bulk/update', methods=['POST'])
+def bulk_update():
+    db = get_db()
+    try:
+        results = bulk_update_trades(db, parse_updates(request.json))
+        db.commit()
+        
+        return jsonify({
+            'success': True,
+            'updated': sum(1 for r in results if r['status'] == 'updated'),
+            'results': results
+        })
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/trades/bulk/delete', methods=['POST'])
+def bulk_delete():
+    db = get_db()
+    try:
+        ids, filters = parse_delete(request.json)
+        results = bulk_delete_trades(db, ids=ids, filters=filters)
+        db.commit()
+        
+        return jsonify({
+            'success': True,
+            'deleted': sum(1 for r in results if r['status'] == 'deleted'),
+            'results': results
+        })
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/trades/<int:trade_id>', methods=['PUT'])
 def update_trade(trade_id):
-    db = SessionLocal()
+    db = get_db()
     try:
         data = request.json
-        trade = db.query(Trade).filter(Trade.id == trade_id).first()
+        trade = db.query(Trade).filter(Trade.id == trade_id).with_for_update().first()
         
         if not trade:
             return jsonify({'success': False, 'error': 'Trade not found'}), 404
         
+        before = trade_contribution(trade)
         if 'outcome' in data:
             trade.outcome = data['outcome']
         if 'profit_loss' in data:
@@ -166,112 +784,117 @@ def update_trade(trade_id):
         if 'notes' in data:
             trade.notes = data['notes']
         
+        apply_trade_change(db, before, trade_contribution(trade))
         db.commit()
         
         return jsonify({'success': True})
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        db.close()
 
 @app.route('/api/trades/<int:trade_id>', methods=['DELETE'])
 def delete_trade(trade_id):
-    db = SessionLocal()
+    db = get_db()
     try:
-        trade = db.query(Trade).filter(Trade.id == trade_id).first()
+        deleted = db.execute(
+            delete(Trade)
+            .where(Trade.id == trade_id)
+            .returning(Trade.created_at, Trade.indicator_type, Trade.outcome, Trade.profit_loss)
+        ).first()
         
-        if not trade:
+        if not deleted:
             return jsonify({'success': False, 'error': 'Trade not found'}), 404
         
-        db.delete(trade)
+        created_at, indicator_type, outcome, profit_loss = deleted
+        apply_trade_change(db, (rollup_key(created_at, indicator_type, outcome), profit_loss or 0.0), None)
         db.commit()
         
         return jsonify({'success': True})
     except Exception as e:
         db.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        db.close()
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    db = SessionLocal()
+    db = get_db()
+    try:
+        def build():
+            with metrics.stage('query'):
+                stats = rollup_stats(db, request.args)
+                if stats is None:
+                    stats = compute_stats(db, request.args)
+            
+            with metrics.stage('json_encode'):
+                return jsonify({
+                    'success': True,
+                    'stats': stats
+                })
+        
+        return journal_response(db, build)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/stats/performance', methods=['GET'])
+def get_performance():
+    db = get_db()
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        indicator_type = request.args.get('indicator_type')
-        
-        query = db.query(Trade)
-        
-        if start_date:
-            query = query.filter(Trade.created_at >= datetime.fromisoformat(start_date))
-        if end_date:
-            end = datetime.fromisoformat(end_date) + timedelta(days=1)
-            query = query.filter(Trade.created_at < end)
-        if indicator_type and indicator_type != 'all':
-            query = query.filter(Trade.indicator_type == indicator_type)
-        
-        trades = query.all()
-        
-        total_trades = len(trades)
-        winning_trades = sum(1 for t in trades if t.outcome == 'win')
-        losing_trades = sum(1 for t in trades if t.outcome == 'loss')
-        pending_trades = sum(1 for t in trades if t.outcome is None or t.outcome == 'pending')
-        
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        total_profit_loss = sum(t.profit_loss or 0 for t in trades)
-        
-        performance_by_date = {}
-        for trade in trades:
-            if trade.created_at:
-                date_key = trade.created_at.strftime('%Y-%m-%d')
-                if date_key not in performance_by_date:
-                    performance_by_date[date_key] = {'wins': 0, 'losses': 0, 'pending': 0, 'profit_loss': 0}
-                if trade.outcome == 'win':
-                    performance_by_date[date_key]['wins'] += 1
-                elif trade.outcome == 'loss':
-                    performance_by_date[date_key]['losses'] += 1
-                else:
-                    performance_by_date[date_key]['pending'] += 1
-                performance_by_date[date_key]['profit_loss'] += trade.profit_loss or 0
-        
-        performance_by_indicator = {}
-        for trade in trades:
-            ind = trade.indicator_type or 'Unknown'
-            if ind not in performance_by_indicator:
-                performance_by_indicator[ind] = {'wins': 0, 'losses': 0, 'total': 0}
-            performance_by_indicator[ind]['total'] += 1
-            if trade.outcome == 'win':
-                performance_by_indicator[ind]['wins'] += 1
-            elif trade.outcome == 'loss':
-                performance_by_indicator[ind]['losses'] += 1
+        window = parse_count(request.args, 'window', DEFAULT_WINDOW, MAX_WINDOW)
+        points = parse_count(request.args, 'points', DEFAULT_POINTS, MAX_POINTS)
+        report = performance_report(load_trade_frame(db, request.args), window, points)
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'pending_trades': pending_trades,
-                'win_rate': round(win_rate, 2),
-                'total_profit_loss': round(total_profit_loss, 2),
-                'performance_by_date': performance_by_date,
-                'performance_by_indicator': performance_by_indicator
-            }
+            'performance': report
         })
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        db.close()
+
+@app.route('/api/stats/calibration', methods=['GET'])
+def get_calibration():
+    db = get_db()
+    try:
+        return jsonify({
+            'success': True,
+            'calibration': calibration.report(db, request.args),
+            'engine': calibration.stats()
+        })
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    profile = profiles.get(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(profile['collapsed'], mimetype='text/plain')
+    return jsonify({'success': True, 'profile': profile})
 
 @app.after_request
-def add_header(response):
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+def apply_cache_policy(response):
+    asset = None
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename', '')
+        version = asset_versions.version(filename)
+        asset = (filename, version) if version else None
+        if version and request.args.get('v') == version and response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    elif 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = NO_STORE_CACHE_CONTROL
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+    with metrics.stage('compress'):
+        return compressor.compress(request, response, asset)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,134 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MIN_RETRY_BACKOFF = 0.5
+
+
+class BatchCapacityError(Exception):
+    pass
+
+
+class BatchJob:
+    def __init__(self, filenames: List[str]):
+        self.id = uuid.uuid4().hex
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.items = [{
+            'index': index,
+            'filename': filename,
+            'status': 'queued',
+            'analysis': None,
+            'error': None
+        } for index, filename in enumerate(filenames)]
+        self.completion_order: List[int] = []
+        self.condition = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return len(self.completion_order) == len(self.items)
+
+    def mark_running(self, index: int) -> None:
+        with self.condition:
+            self.items[index]['status'] = 'running'
+
+    def mark_finished(self, index: int, analysis: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self.condition:
+            item = self.items[index]
+            item['status'] = 'failed' if error else 'completed'
+            item['analysis'] = analysis
+            item['error'] = error
+            self.completion_order.append(index)
+            if self.done:
+                self.finished_at = datetime.utcnow()
+            self.condition.notify_all()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.condition:
+            counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+            for item in self.items:
+                counts[item['status']] += 1
+            return {
+                'job_id': self.id,
+                'status': 'completed' if self.done else 'running',
+                'created_at': self.created_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'total': len(self.items),
+                'counts': counts,
+                'items': [dict(item) for item in self.items]
+            }
+
+    def iter_results(self, timeout: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        sent = 0
+        while True:
+            with self.condition:
+                if sent == len(self.completion_order) and not self.done:
+                    self.condition.wait(timeout)
+                pending = [dict(self.items[index]) for index in self.completion_order[sent:]]
+                finished = self.done
+            if not pending and not finished:
+                yield None
+            for item in pending:
+                yield item
+            sent += len(pending)
+            if finished and sent == len(self.items):
+                return
+
+
+class BatchJobManager:
+    def __init__(self, analyzer, max_concurrency: int = 4, max_jobs: int = 100, max_admission_attempts: int = 10):
+        self.analyzer = analyzer
+        self.max_concurrency = max_concurrency
+        self.max_jobs = max_jobs
+        self.max_admission_attempts = max_admission_attempts
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='batch-analyze')
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return self._unfinished_jobs() < self.max_jobs
+
+    def submit(self, charts: List[Tuple[str, bytes, str]]) -> BatchJob:
+        job = BatchJob([filename for filename, _, _ in charts])
+        with self._lock:
+            if self._unfinished_jobs() >= self.max_jobs:
+                raise BatchCapacityError(f'{self.max_jobs} batch jobs are already queued or running; try again later')
+            self._jobs[job.id] = job
+            self._evict_finished_jobs()
+        for index, (_, image_data, mime_type) in enumerate(charts):
+            self._executor.submit(self._run_item, job, index, image_data, mime_type)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run_item(self, job: BatchJob, index: int, image_data: bytes, mime_type: str) -> None:
+        try:
+            job.mark_running(index)
+            for _ in range(self.max_admission_attempts):
+                analysis = self.analyzer.analyze_chart(image_data, mime_type)
+                if analysis.get('retry_after') is None:
+                    break
+                time.sleep(max(analysis['retry_after'], MIN_RETRY_BACKOFF))
+            if analysis.get('error'):
+                job.mark_finished(index, analysis, analysis.get('message', 'Analysis failed'))
+            else:
+                job.mark_finished(index, analysis, None)
+        except Exception as e:
+            job.mark_finished(index, None, str(e))
+
+    def _unfinished_jobs(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _evict_finished_jobs(self) -> None:
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
@@ -0,0 +1,118 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import Column, Index, MetaData, Table, Text, select
+
+import analysis_store
+from models import AnalysisBlob, SessionLocal, Trade, TradeDailyRollup, engine
+
+RESPONSES = Path(__file__).resolve().parent.parent / 'recorded_responses'
+legacy_metadata = MetaData()
+legacy_trades = Table(
+    'trades_inline_benchmark', legacy_metadata,
+    *(Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+      for column in Trade.__table__.columns if column.name != 'analysis_id'),
+    Column('raw_analysis', Text, nullable=True),
+    Index('ix_trades_inline_benchmark_created_at_id', 'created_at', 'id')
+)
+
+
+def analysis_pool(distinct: int):
+    templates = [path.read_text() for path in sorted(RESPONSES.glob('*.md'))]
+    return [f'{templates[index % len(templates)]}\n\nChart #{index}' for index in range(distinct)]
+
+
+def reset() -> None:
+    tables = [Trade.__table__, AnalysisBlob.__table__, TradeDailyRollup.__table__]
+    legacy_metadata.drop_all(bind=engine)
+    Trade.metadata.drop_all(bind=engine, tables=tables)
+    Trade.metadata.create_all(bind=engine, tables=tables)
+    legacy_metadata.create_all(bind=engine)
+
+
+def seed(rows: int, distinct: int) -> float:
+    reset()
+    rng = random.Random(rows)
+    pool = analysis_pool(distinct)
+    start = datetime(2024, 1, 1)
+    stored = 0.0
+    with engine.begin() as connection:
+        for offset in range(0, rows, 10000):
+            batch = [{
+                'created_at': start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                'symbol': rng.choice(('AAPL', 'TSLA', 'SPY', 'BTC')),
+                'recommendation': rng.choice(('BUY', 'SELL', 'HOLD')),
+                'outcome': rng.choice(('win', 'loss', 'pending')),
+                'profit_loss': round(rng.uniform(-500, 500), 2),
+                'indicator_type': rng.choice(('RSI', 'MACD', 'Combined')),
+                'raw_analysis': rng.choice(pool)
+            } for _ in range(min(10000, rows - offset))]
+            connection.execute(legacy_trades.insert(), batch)
+
+            started = time.perf_counter()
+            ids = analysis_store.store_analyses(connection, [row.pop('raw_analysis') for row in batch])
+            connection.execute(Trade.__table__.insert(), [{**row, 'analysis_id': analysis_id} for row, analysis_id in zip(batch, ids)])
+            stored += time.perf_counter() - started
+    return stored
+
+
+def timed(function, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def full_scan(table) -> None:
+    with engine.connect() as connection:
+        connection.execute(select(table)).all()
+
+
+def legacy_page(limit: int) -> None:
+    with engine.connect() as connection:
+        connection.execute(select(legacy_trades).order_by(legacy_trades.c.created_at.desc()).limit(limit)).all()
+
+
+def stored_page(limit: int) -> list:
+    table = Trade.__table__
+    with engine.connect() as connection:
+        rows = connection.execute(select(table).order_by(table.c.created_at.desc()).limit(limit)).all()
+        analyses = analysis_store.load_analyses(connection, (row.analysis_id for row in rows))
+        return [analyses.get(row.analysis_id) for row in rows]
+
+
+def main():
+    sizes = [int(size) for size in os.environ.get('BENCH_SIZES', '10000,100000').split(',')]
+    copies = int(os.environ.get('BENCH_COPIES', '4'))
+    print(f'database: {engine.url.render_as_string(hide_password=True)}, codec: {analysis_store.DEFAULT_CODEC}')
+    for rows in sizes:
+        store_seconds = seed(rows, max(1, rows // copies))
+        db = SessionLocal()
+        try:
+            report = analysis_store.storage_report(db)
+        finally:
+            db.close()
+        print(f'\n{rows} trades, about {copies} trades per distinct analysis')
+        print(f"  analysis text {report['logical_bytes'] / 2**20:8.1f} MiB -> stored {report['stored_bytes'] / 2**20:6.2f} MiB "
+              f"(dedup {report['deduplication_ratio']}x, compression {report['compression_ratio']}x), "
+              f'store {store_seconds:.2f}s')
+        print(f'  full trade scan     inline {timed(lambda: full_scan(legacy_trades)) * 1000:8.1f} ms   '
+              f'stored {timed(lambda: full_scan(Trade.__table__)) * 1000:8.1f} ms')
+        analysis_store.configure(cache_size=0)
+        cold = timed(lambda: stored_page(50))
+        analysis_store.configure()
+        print(f'  page of 50 + text   inline {timed(lambda: legacy_page(50)) * 1000:8.1f} ms   '
+              f'stored {cold * 1000:8.1f} ms cold, {timed(lambda: stored_page(50)) * 1000:.1f} ms warm')
+    legacy_metadata.drop_all(bind=engine)
+
+
+if __name__ == '__main__':
+    main()
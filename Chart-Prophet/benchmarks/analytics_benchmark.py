@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = tempfile.mkdtemp(prefix='analytics-benchmark-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/trades.db')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from analytics import BREAKDOWN_FIELDS, load_trade_frame, performance_report
+from models import Base, SessionLocal, Trade, engine
+
+CHOICES = {
+    'recommendation': ('BUY', 'SELL', 'HOLD'),
+    'confidence_level': ('High', 'Medium', 'Low', 'Unknown'),
+    'trend_direction': ('Bullish', 'Bearish', 'Sideways', 'Unknown'),
+    'rsi_signal': ('Overbought', 'Oversold', 'Neutral', 'Unknown'),
+    'macd_signal': ('Bullish Crossover', 'Bearish Crossover', 'Neutral', 'Unknown'),
+}
+
+
+def journal(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(rows)
+    outcome = rng.choice(np.array(['win', 'loss', 'pending']), size=rows, p=[0.45, 0.4, 0.15])
+    profit_loss = np.where(outcome == 'win', rng.uniform(0, 500, rows), rng.uniform(-400, 0, rows))
+    frame = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'created_at': pd.Timestamp('2020-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 5 * 365 * 86400, rows)), unit='s'),
+        'outcome': pd.Categorical(outcome),
+        'profit_loss': np.where(outcome == 'pending', np.nan, profit_loss),
+    })
+    for name in BREAKDOWN_FIELDS:
+        frame[name] = pd.Categorical(rng.choice(np.array(CHOICES[name]), size=rows))
+    return frame
+
+
+def timed(function, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def load_seconds(frame: pd.DataFrame) -> float:
+    Base.metadata.drop_all(bind=engine, tables=[Trade.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Trade.__table__])
+    records = frame.drop(columns='id').assign(
+        symbol='SPY',
+        created_at=frame['created_at'].dt.to_pydatetime(),
+        profit_loss=frame['profit_loss'].astype(object).where(frame['profit_loss'].notna(), None)
+    )
+    for name in ('outcome',) + BREAKDOWN_FIELDS:
+        records[name] = records[name].astype(str)
+    with engine.begin() as connection:
+        connection.execute(insert(Trade.__table__), records.to_dict('records'))
+
+    db = SessionLocal()
+    try:
+        return timed(lambda: load_trade_frame(db, {}), repeat=1)
+    finally:
+        db.close()
+
+
+def main():
+    sizes = [int(size) for size in os.environ.get('BENCH_SIZES', '100000,1000000,3000000').split(',')]
+    load_rows = int(os.environ.get('BENCH_LOAD_ROWS', '100000'))
+
+    print(f"{'trades':>10} {'report':>9} {'ns/trade':>9}")
+    for rows in sizes:
+        frame = journal(rows)
+        elapsed = timed(lambda: performance_report(frame))
+        print(f'{rows:>10} {elapsed:8.3f}s {elapsed * 1e9 / rows:9.0f}')
+
+    if load_rows:
+        elapsed = load_seconds(journal(load_rows))
+        print(f'single-query load of {load_rows} trades from {engine.url.render_as_string(hide_password=True)}: '
+              f'{elapsed:.3f}s ({elapsed * 1e9 / load_rows:.0f} ns/trade)')
+
+
+if __name__ == '__main__':
+    main()
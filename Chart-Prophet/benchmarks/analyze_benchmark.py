@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = tempfile.mkdtemp(prefix='analyze-benchmark-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/app.db')
+os.environ.setdefault('MODEL_BACKEND', 'fake')
+os.environ.setdefault('MODEL_FAKE_SEED', '42')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from PIL import Image
+
+started = time.perf_counter()
+from app import analyzer, app
+startup = time.perf_counter() - started
+
+
+def chart_images(count: int, seed: int, size=(1200, 800)):
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 255, size=(size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).resize(size, Image.NEAREST).save(buffer, 'PNG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def post(client, path: str, image: bytes, name: str):
+    started = time.perf_counter()
+    response = client.post(path, data={'chart': (io.BytesIO(image), name)})
+    if path.endswith('/stream'):
+        b''.join(response.response)
+    return response.status_code, time.perf_counter() - started
+
+
+def run(path: str, images, concurrency: int):
+    clients = [app.test_client() for _ in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda item: post(clients[item[0] % concurrency], path, item[1], f'chart-{item[0]}.png'),
+            enumerate(images)
+        ))
+    elapsed = time.perf_counter() - started
+    latencies = np.array([latency for _, latency in results]) * 1000
+    statuses = Counter(status for status, _ in results)
+    print(f'  {path:<16} c={concurrency:<3} {len(images) / elapsed:7.1f} req/s  '
+          f'p50 {np.percentile(latencies, 50):6.0f}ms  p95 {np.percentile(latencies, 95):6.0f}ms  '
+          f'p99 {np.percentile(latencies, 99):6.0f}ms  status {dict(statuses)}')
+
+
+def main():
+    requests = int(os.environ.get('BENCH_REQUESTS', '200'))
+    levels = [int(level) for level in os.environ.get('BENCH_CONCURRENCY', '1,4,16').split(',')]
+
+    print(f'backend: {analyzer.backend.stats()}')
+    print(f'app import: {startup:.2f}s')
+    seed = 0
+    for concurrency in levels:
+        for path in ('/analyze', '/analyze/stream'):
+            seed += 1
+            run(path, chart_images(requests, seed), concurrency)
+
+
+if __name__ == '__main__':
+    main()
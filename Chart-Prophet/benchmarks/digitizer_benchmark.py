@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+
+from chart_digitizer import ChartDigitizer, digitize_chart
+
+THEMES = {
+    'light': {'background': (255, 255, 255), 'grid': (235, 235, 235), 'text': (40, 40, 40),
+              'up': (80, 175, 76), 'down': (54, 67, 244)},
+    'dark': {'background': (35, 25, 20), 'grid': (55, 45, 40), 'text': (200, 200, 200),
+             'up': (154, 166, 38), 'down': (80, 83, 239)},
+}
+
+
+def random_ohlc(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.012, count)))
+    opens = np.concatenate(([closes[0] * (1 + rng.normal(0, 0.005))], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.008, count))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.008, count))
+    volumes = rng.uniform(0.2, 1.0, count)
+    return opens, highs, lows, closes, volumes
+
+
+def render_chart(count: int = 150, seed: int = 0, theme: str = 'light', volume: bool = False, line: bool = False,
+                 size=(1920, 1080)):
+    colors = THEMES[theme]
+    width, height = size
+    opens, highs, lows, closes, volumes = random_ohlc(count, seed)
+    image = np.full((height, width, 3), colors['background'], dtype=np.uint8)
+    left, right, top, bottom = 10, width - 90, 10, height - 40
+    price_bottom = bottom - (int((bottom - top) * 0.2) if volume else 0)
+    for y in np.linspace(top, price_bottom, 9).astype(int):
+        cv2.line(image, (left, y), (right, y), colors['grid'], 1)
+    cv2.line(image, (right, top), (right, bottom), colors['text'], 1)
+    cv2.line(image, (left, bottom), (right, bottom), colors['text'], 1)
+
+    price_high, price_low = highs.max(), lows.min()
+    margin = 20
+    scale = (price_bottom - top - 2 * margin) / (price_high - price_low)
+    to_row = lambda price: int(round(top + margin + (price_high - price) * scale))
+    for price in np.linspace(price_low, price_high, 8):
+        cv2.putText(image, f'{price:.2f}', (right + 8, to_row(price) + 5), cv2.FONT_HERSHEY_SIMPLEX, 0.45, colors['text'], 1)
+
+    step = (right - left - 20) / count
+    body = max(1, int(step * 0.7))
+    centres = []
+    for index in range(count):
+        x = int(left + 10 + index * step + step / 2)
+        centres.append(x)
+        if line:
+            continue
+        color = colors['up'] if closes[index] >= opens[index] else colors['down']
+        cv2.line(image, (x, to_row(highs[index])), (x, to_row(lows[index])), color, 1)
+        top_row, bottom_row = sorted((to_row(opens[index]), to_row(closes[index])))
+        cv2.rectangle(image, (x - body // 2, top_row), (x - body // 2 + body - 1, bottom_row), color, -1)
+        if volume:
+            bar = int(volumes[index] * (bottom - price_bottom - 10))
+            cv2.rectangle(image, (x - body // 2, bottom - 1 - bar), (x - body // 2 + body - 1, bottom - 1), color, -1)
+    if line:
+        points = np.array([[x, to_row(close)] for x, close in zip(centres, closes)], dtype=np.int32)
+        cv2.polylines(image, [points], False, (243, 150, 33), 2, cv2.LINE_AA)
+
+    ok, encoded = cv2.imencode('.png', image)
+    truth = {'open': opens, 'high': highs, 'low': lows, 'close': closes, 'price_high': price_high, 'price_low': price_low}
+    return encoded.tobytes(), truth
+
+
+def accuracy(digitized, truth):
+    candles = digitized.candles
+    span = truth['price_high'] - truth['price_low']
+    if len(candles) != len(truth['close']):
+        return f'{len(candles)} of {len(truth["close"])} candles'
+    errors = {name: np.abs(getattr(candles, f'{name}s') - truth[name]).mean() / span * 100
+              for name in ('open', 'high', 'low', 'close')}
+    return ' '.join(f'{name} {error:.2f}%' for name, error in errors.items())
+
+
+def main():
+    repeat = int(os.environ.get('BENCH_REPEAT', '10'))
+    print('single 1920x1080 charts (best of %d), mean absolute error as %% of the price range:' % repeat)
+    cases = [
+        ('light candles', {}),
+        ('dark candles', {'theme': 'dark'}),
+        ('candles + volume pane', {'volume': True}),
+        ('dense candles (400)', {'count': 400}),
+        ('line chart', {'line': True}),
+    ]
+    for name, options in cases:
+        data, truth = render_chart(seed=1, **options)
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            digitized = digitize_chart(data, price_high=truth['price_high'], price_low=truth['price_low'])
+            best = min(best, time.perf_counter() - started)
+        stages = ', '.join(f'{stage} {ms:.1f}' for stage, ms in digitized.stats()['timings_ms'].items())
+        detail = accuracy(digitized, truth) if digitized.kind == 'candles' else f'{len(digitized.candles)} buckets'
+        print(f'  {name:<24} {best * 1000:7.1f} ms  [{stages}]  {digitized.kind}: {detail}')
+
+    batch = int(os.environ.get('BENCH_BATCH', '32'))
+    images = [render_chart(seed=seed)[0] for seed in range(batch)]
+    print(f'\nbatch of {batch} charts:')
+    for workers in sorted({1, os.cpu_count() or 1}):
+        digitizer = ChartDigitizer(max_workers=workers)
+        digitizer.digitize_many(images[:workers])
+        started = time.perf_counter()
+        results = digitizer.digitize_many(images)
+        elapsed = time.perf_counter() - started
+        failed = sum(1 for _, error in results if error)
+        print(f'  {workers} worker(s): {elapsed:.2f}s, {batch / elapsed:.1f} charts/s, {failed} failed')
+
+
+if __name__ == '__main__':
+    main()
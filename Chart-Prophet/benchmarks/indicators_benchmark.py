@@ -0,0 +1,188 @@
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from indicators import (
+    Candles, atr, bollinger, ema, fibonacci_retracements, floor_pivots, load_candles, rsi, sma, swing_pivots, analyze_candles,
+    macd
+)
+
+NAN = float('nan')
+
+
+def random_candles(rows: int, seed: int = 0) -> Candles:
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    highs = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.005, rows))
+    lows = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.005, rows))
+    timestamps = np.datetime64('2020-01-01T00:00') + np.arange(rows).astype('timedelta64[m]')
+    return Candles(opens, highs, lows, closes, rng.uniform(1e3, 1e6, rows), timestamps)
+
+
+def reference_sma(values, period):
+    return [NAN] * (period - 1) + [math.fsum(values[i - period + 1:i + 1]) / period for i in range(period - 1, len(values))]
+
+
+def reference_smoothed(values, period, alpha):
+    result = [NAN] * len(values)
+    start = next(i for i, value in enumerate(values) if not math.isnan(value))
+    first = start + period - 1
+    if first >= len(values):
+        return result
+    result[first] = math.fsum(values[start:first + 1]) / period
+    for i in range(first + 1, len(values)):
+        result[i] = alpha * values[i] + (1 - alpha) * result[i - 1]
+    return result
+
+
+def reference_ema(values, period):
+    return reference_smoothed(values, period, 2 / (period + 1))
+
+
+def reference_rsi(closes, period):
+    gains = [max(closes[i] - closes[i - 1], 0.0) for i in range(1, len(closes))]
+    losses = [max(closes[i - 1] - closes[i], 0.0) for i in range(1, len(closes))]
+    average_gain = reference_smoothed(gains, period, 1 / period)
+    average_loss = reference_smoothed(losses, period, 1 / period)
+    result = [NAN]
+    for gain, loss in zip(average_gain, average_loss):
+        if math.isnan(gain):
+            result.append(NAN)
+        elif loss == 0:
+            result.append(50.0 if gain == 0 else 100.0)
+        else:
+            result.append(100 - 100 / (1 + gain / loss))
+    return result
+
+
+def reference_macd(closes, fast, slow, signal):
+    line = [a - b for a, b in zip(reference_ema(closes, fast), reference_ema(closes, slow))]
+    signal_line = reference_ema(line, signal)
+    return line, signal_line, [a - b for a, b in zip(line, signal_line)]
+
+
+def reference_bollinger(closes, period, width):
+    middle = reference_sma(closes, period)
+    deviation = [NAN] * (period - 1) + [statistics.pstdev(closes[i - period + 1:i + 1]) for i in range(period - 1, len(closes))]
+    return ([m - width * d for m, d in zip(middle, deviation)], middle, [m + width * d for m, d in zip(middle, deviation)])
+
+
+def reference_atr(highs, lows, closes, period):
+    ranges = [highs[0] - lows[0]] + [
+        max(highs[i] - lows[i], abs(highs[i] - closes[i - 1]), abs(lows[i] - closes[i - 1])) for i in range(1, len(closes))
+    ]
+    return reference_smoothed(ranges, period, 1 / period)
+
+
+def reference_pivots(highs, lows, window):
+    pivot_highs = [i for i in range(window, len(highs) - window) if highs[i] == max(highs[i - window:i + window + 1])]
+    pivot_lows = [i for i in range(window, len(lows) - window) if lows[i] == min(lows[i - window:i + window + 1])]
+    return pivot_highs, pivot_lows
+
+
+def check(name: str, actual, expected, tolerance: float = 1e-9) -> None:
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    if actual.shape != expected.shape or not np.allclose(actual, expected, rtol=tolerance, atol=tolerance, equal_nan=True):
+        difference = np.nanmax(np.abs(actual - expected)) if actual.shape == expected.shape else 'shape mismatch'
+        raise SystemExit(f'{name}: does not match the reference implementation (max difference {difference})')
+    print(f'  {name:<28} ok')
+
+
+def check_reference_values(rows: int) -> None:
+    candles = random_candles(rows, seed=7)
+    highs, lows, closes = candles.highs.tolist(), candles.lows.tolist(), candles.closes.tolist()
+    print(f'reference checks on {rows} candles:')
+    for period in (1, 2, 20, 200):
+        check(f'sma({period})', sma(candles.closes, period), reference_sma(closes, period))
+    for period in (1, 12, 26):
+        check(f'ema({period})', ema(candles.closes, period), reference_ema(closes, period))
+    for period in (2, 14):
+        check(f'rsi({period})', rsi(candles.closes, period), reference_rsi(closes, period))
+    for name, actual, expected in zip(('macd line', 'macd signal', 'macd histogram'), macd(candles.closes, 12, 26, 9),
+                                      reference_macd(closes, 12, 26, 9)):
+        check(name, actual, expected)
+    for name, actual, expected in zip(('bollinger lower', 'bollinger middle', 'bollinger upper'),
+                                      bollinger(candles.closes, 20, 2.0), reference_bollinger(closes, 20, 2.0)):
+        check(name, actual, expected)
+    check('atr(14)', atr(candles.highs, candles.lows, candles.closes, 14), reference_atr(highs, lows, closes, 14))
+
+    pivot_highs, pivot_lows = swing_pivots(candles.highs, candles.lows, 5)
+    expected_highs, expected_lows = reference_pivots(highs, lows, 5)
+    check('swing pivot highs', pivot_highs, expected_highs)
+    check('swing pivot lows', pivot_lows, expected_lows)
+
+    fibonacci = fibonacci_retracements(candles.highs, candles.lows, 100)
+    swing_high, swing_low = max(highs[-100:]), min(lows[-100:])
+    rising = lows[-100:].index(swing_low) <= highs[-100:].index(swing_high)
+    check('fibonacci retracements', [level['price'] for level in fibonacci['levels']], [
+        swing_high - (swing_high - swing_low) * ratio if rising else swing_low + (swing_high - swing_low) * ratio
+        for ratio in (0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0)
+    ])
+    pivots = floor_pivots(10.0, 8.0, 9.5)
+    check('floor pivots', [pivots[name] for name in ('pivot', 'r1', 's1', 'r2', 's2')], [
+        27.5 / 3, 2 * 27.5 / 3 - 8.0, 2 * 27.5 / 3 - 10.0, 27.5 / 3 + 2.0, 27.5 / 3 - 2.0
+    ])
+
+    rising_closes = np.arange(1.0, 41.0)
+    check('rsi of a rising series', rsi(rising_closes, 14)[14:], np.full(26, 100.0))
+    check('rsi of a flat series', rsi(np.full(40, 5.0), 14)[14:], np.full(26, 50.0))
+    check('sma of 1..10 (period 5)', sma(np.arange(1.0, 11.0), 5)[4:], [3.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+
+
+def timed(function, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def csv_payload(candles: Candles) -> bytes:
+    frame = pd.DataFrame({
+        'timestamp': candles.timestamps,
+        'open': candles.opens,
+        'high': candles.highs,
+        'low': candles.lows,
+        'close': candles.closes,
+        'volume': candles.volumes
+    })
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def json_payload(candles: Candles) -> bytes:
+    stamps = candles.timestamps.astype('datetime64[ms]').astype(np.int64)
+    rows = np.column_stack((stamps, candles.opens, candles.highs, candles.lows, candles.closes, candles.volumes)).tolist()
+    return json.dumps({'candles': rows}).encode('utf-8')
+
+
+def main():
+    check_reference_values(int(os.environ.get('BENCH_REFERENCE_ROWS', '2000')))
+
+    sizes = [int(size) for size in os.environ.get('BENCH_SIZES', '1000,10000,100000,1000000').split(',')]
+    print(f"\n{'candles':>10} {'analysis':>10} {'ns/candle':>10} {'csv parse':>10} {'json parse':>11}")
+    for rows in sizes:
+        candles = random_candles(rows)
+        elapsed = timed(lambda: analyze_candles(candles))
+        csv_data = csv_payload(candles)
+        json_data = json_payload(candles)
+        csv_elapsed = timed(lambda: load_candles(io.BytesIO(csv_data).getvalue(), 'csv'), repeat=2)
+        json_elapsed = timed(lambda: load_candles(json_data, 'json'), repeat=2)
+        print(f'{rows:>10} {elapsed * 1000:8.2f}ms {elapsed * 1e9 / rows:10.0f} '
+              f'{csv_elapsed * 1000:8.1f}ms {json_elapsed * 1000:9.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
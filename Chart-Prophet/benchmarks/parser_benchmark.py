@@ -0,0 +1,197 @@
+import os
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analysis_parser import parse_analysis
+
+RESPONSES_DIR = Path(__file__).resolve().parent.parent / 'recorded_responses'
+
+
+class LegacyParser:
+    def _parse_analysis(self, raw_text: str) -> Dict[str, Any]:
+        result = {
+            "overall_recommendation": self._extract_recommendation(raw_text),
+            "confidence_level": self._extract_field(raw_text, ["confidence", "confidence level"]),
+            "trend_direction": self._extract_field(raw_text, ["trend direction", "trend"]),
+            "support_levels": self._extract_list(raw_text, "support"),
+            "resistance_levels": self._extract_list(raw_text, "resistance"),
+            "rsi_analysis": self._extract_indicator(raw_text, "rsi"),
+            "macd_analysis": self._extract_indicator(raw_text, "macd"),
+            "fibonacci_levels": self._extract_fibonacci(raw_text),
+            "key_observations": self._extract_list(raw_text, "observation"),
+            "risk_factors": self._extract_list(raw_text, "risk"),
+            "entry_points": self._extract_list(raw_text, "entry"),
+            "exit_points": self._extract_list(raw_text, "exit"),
+            "summary": self._extract_summary(raw_text),
+            "raw_analysis": raw_text
+        }
+        return result
+
+    def _extract_recommendation(self, text: str) -> str:
+        text_upper = text.upper()
+        if "STRONG BUY" in text_upper:
+            return "STRONG BUY"
+        elif "STRONG SELL" in text_upper:
+            return "STRONG SELL"
+        elif "BUY" in text_upper and "SELL" not in text_upper[:text_upper.find("BUY")+50]:
+            return "BUY"
+        elif "SELL" in text_upper:
+            return "SELL"
+        elif "HOLD" in text_upper:
+            return "HOLD"
+        return "HOLD"
+
+    def _extract_field(self, text: str, keywords: list) -> str:
+        text_lower = text.lower()
+        for keyword in keywords:
+            if keyword in text_lower:
+                idx = text_lower.find(keyword)
+                snippet = text[idx:idx+100]
+                if "HIGH" in snippet.upper():
+                    return "HIGH"
+                elif "MEDIUM" in snippet.upper() or "MODERATE" in snippet.upper():
+                    return "MEDIUM"
+                elif "LOW" in snippet.upper():
+                    return "LOW"
+                elif "BULLISH" in snippet.upper():
+                    return "BULLISH"
+                elif "BEARISH" in snippet.upper():
+                    return "BEARISH"
+                elif "SIDEWAYS" in snippet.upper() or "NEUTRAL" in snippet.upper():
+                    return "SIDEWAYS"
+        return "N/A"
+
+    def _extract_list(self, text: str, keyword: str) -> List[str]:
+        lines = text.split('\n')
+        items = []
+        in_section = False
+        
+        for line in lines:
+            if keyword.lower() in line.lower() and ':' in line:
+                in_section = True
+                after_colon = line.split(':', 1)[-1].strip()
+                if after_colon:
+                    items.append(after_colon)
+                continue
+            
+            if in_section:
+                if line.strip().startswith('-') or line.strip().startswith('*') or line.strip().startswith('•'):
+                    items.append(line.strip().lstrip('-*• '))
+                elif line.strip() and line.strip()[0].isdigit():
+                    items.append(line.strip().lstrip('0123456789. '))
+                elif line.strip() == '' or (line.strip() and line.strip()[0] == '#'):
+                    in_section = False
+        
+        return items[:5] if items else ["Not identified in chart"]
+
+    def _extract_indicator(self, text: str, indicator: str) -> Dict[str, str]:
+        text_lower = text.lower()
+        result = {
+            "name": indicator.upper(),
+            "value": "N/A",
+            "signal": "NEUTRAL",
+            "description": "Not visible or cannot be determined"
+        }
+        
+        if indicator in text_lower:
+            idx = text_lower.find(indicator)
+            snippet = text[idx:idx+300]
+            
+            if "OVERBOUGHT" in snippet.upper():
+                result["signal"] = "OVERBOUGHT"
+            elif "OVERSOLD" in snippet.upper():
+                result["signal"] = "OVERSOLD"
+            elif "BULLISH" in snippet.upper():
+                result["signal"] = "BULLISH"
+            elif "BEARISH" in snippet.upper():
+                result["signal"] = "BEARISH"
+            
+            lines = snippet.split('\n')
+            for line in lines[:3]:
+                if line.strip():
+                    result["description"] = line.strip()[:200]
+                    break
+        
+        return result
+
+    def _extract_fibonacci(self, text: str) -> List[Dict[str, str]]:
+        fib_levels = []
+        standard_levels = ["0%", "23.6%", "38.2%", "50%", "61.8%", "78.6%", "100%"]
+        
+        for level in standard_levels:
+            if level in text:
+                idx = text.find(level)
+                snippet = text[idx:idx+150]
+                significance = "Key level"
+                if "support" in snippet.lower():
+                    significance = "Acting as support"
+                elif "resistance" in snippet.lower():
+                    significance = "Acting as resistance"
+                
+                fib_levels.append({
+                    "level": level,
+                    "price": "See chart",
+                    "significance": significance
+                })
+        
+        if not fib_levels:
+            fib_levels.append({
+                "level": "N/A",
+                "price": "N/A",
+                "significance": "Fibonacci levels not visible on chart"
+            })
+        
+        return fib_levels
+
+    def _extract_summary(self, text: str) -> str:
+        text_lower = text.lower()
+        if "summary" in text_lower:
+            idx = text_lower.find("summary")
+            snippet = text[idx:]
+            lines = snippet.split('\n')
+            summary_parts = []
+            for line in lines[1:4]:
+                if line.strip() and not line.strip().startswith('#'):
+                    summary_parts.append(line.strip())
+            if summary_parts:
+                return ' '.join(summary_parts)[:500]
+        
+        sentences = text.replace('\n', ' ').split('.')
+        return '. '.join(sentences[:3]) + '.' if sentences else "Analysis complete."
+
+
+def load_corpus() -> List[str]:
+    return [path.read_text() for path in sorted(RESPONSES_DIR.glob('*.md'))]
+
+
+def time_parser(parse, corpus: List[str], rounds: int) -> float:
+    best = min(timeit.repeat(lambda: [parse(text) for text in corpus], number=rounds, repeat=5))
+    return best / (rounds * len(corpus))
+
+
+def main():
+    rounds = int(os.environ.get('BENCH_ROUNDS', '500'))
+    corpus = load_corpus()
+    legacy = LegacyParser()
+
+    legacy_time = time_parser(legacy._parse_analysis, corpus, rounds)
+    single_pass_time = time_parser(parse_analysis, corpus, rounds)
+
+    print(f'responses: {len(corpus)}, rounds: {rounds}')
+    print(f'legacy parser:      {legacy_time * 1e6:8.1f} us/response')
+    print(f'single-pass parser: {single_pass_time * 1e6:8.1f} us/response')
+    print(f'speedup:            {legacy_time / single_pass_time:8.2f}x')
+
+    for text in corpus:
+        old = legacy._parse_analysis(text)
+        new = parse_analysis(text)
+        changed = [key for key in new if key != 'raw_analysis' and old.get(key) != new[key]]
+        print(f'  {new["overall_recommendation"]:<11} fields differing from legacy: {", ".join(changed) or "none"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+BENCH_DIR = tempfile.mkdtemp(prefix='stats-benchmark-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/trades.db')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import Base, SessionLocal, Trade, engine
+from trade_queries import apply_trade_filters, compute_stats
+
+INDICATORS = ('RSI', 'MACD', 'Fibonacci', 'Combined', None)
+OUTCOMES = ('win', 'loss', 'pending', None)
+
+
+def legacy_stats(db, args) -> Dict[str, Any]:
+    trades = apply_trade_filters(db.query(Trade), args, include_outcome=False).all()
+
+    total_trades = len(trades)
+    winning_trades = sum(1 for t in trades if t.outcome == 'win')
+    losing_trades = sum(1 for t in trades if t.outcome == 'loss')
+    pending_trades = sum(1 for t in trades if t.outcome is None or t.outcome == 'pending')
+    win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+    total_profit_loss = sum(t.profit_loss or 0 for t in trades)
+
+    performance_by_date = {}
+    for trade in trades:
+        if trade.created_at:
+            date_key = trade.created_at.strftime('%Y-%m-%d')
+            if date_key not in performance_by_date:
+                performance_by_date[date_key] = {'wins': 0, 'losses': 0, 'pending': 0, 'profit_loss': 0}
+            if trade.outcome == 'win':
+                performance_by_date[date_key]['wins'] += 1
+            elif trade.outcome == 'loss':
+                performance_by_date[date_key]['losses'] += 1
+            else:
+                performance_by_date[date_key]['pending'] += 1
+            performance_by_date[date_key]['profit_loss'] += trade.profit_loss or 0
+
+    performance_by_indicator = {}
+    for trade in trades:
+        ind = trade.indicator_type or 'Unknown'
+        if ind not in performance_by_indicator:
+            performance_by_indicator[ind] = {'wins': 0, 'losses': 0, 'total': 0}
+        performance_by_indicator[ind]['total'] += 1
+        if trade.outcome == 'win':
+            performance_by_indicator[ind]['wins'] += 1
+        elif trade.outcome == 'loss':
+            performance_by_indicator[ind]['losses'] += 1
+
+    return {
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'pending_trades': pending_trades,
+        'win_rate': round(win_rate, 2),
+        'total_profit_loss': round(total_profit_loss, 2),
+        'performance_by_date': performance_by_date,
+        'performance_by_indicator': performance_by_indicator
+    }
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(bind=engine, tables=[Trade.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Trade.__table__])
+    rng = random.Random(rows)
+    start = datetime(2022, 1, 1)
+    batch = []
+    with engine.begin() as connection:
+        for _ in range(rows):
+            batch.append({
+                'created_at': start + timedelta(minutes=rng.randrange(3 * 365 * 24 * 60)),
+                'symbol': rng.choice(('AAPL', 'TSLA', 'SPY', 'BTC')),
+                'recommendation': rng.choice(('BUY', 'SELL', 'HOLD')),
+                'outcome': rng.choice(OUTCOMES),
+                'profit_loss': rng.choice((None, round(rng.uniform(-500, 500), 2))),
+                'indicator_type': rng.choice(INDICATORS),
+            })
+            if len(batch) == 10000:
+                connection.execute(Trade.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Trade.__table__.insert(), batch)
+
+
+def measure(function, args):
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = function(db, args)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, elapsed, peak
+    finally:
+        db.close()
+
+
+def same_stats(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    scalars = ('total_trades', 'winning_trades', 'losing_trades', 'pending_trades', 'win_rate', 'total_profit_loss')
+    if any(a[key] != b[key] for key in scalars) or a['performance_by_indicator'] != b['performance_by_indicator']:
+        return False
+    if a['performance_by_date'].keys() != b['performance_by_date'].keys():
+        return False
+    for day, bucket in a['performance_by_date'].items():
+        other = b['performance_by_date'][day]
+        if any(bucket[key] != other[key] for key in ('wins', 'losses', 'pending')):
+            return False
+        if abs(bucket['profit_loss'] - other['profit_loss']) > 1e-6:
+            return False
+    return True
+
+
+def main():
+    sizes = [int(size) for size in os.environ.get('BENCH_SIZES', '10000,100000,1000000').split(',')]
+    args = {'indicator_type': 'all'}
+
+    print(f'database: {engine.url.render_as_string(hide_password=True)}')
+    for rows in sizes:
+        seed(rows)
+        legacy, legacy_time, legacy_peak = measure(legacy_stats, args)
+        aggregated, sql_time, sql_peak = measure(compute_stats, args)
+        print(f'{rows:>9} rows  legacy {legacy_time:8.3f}s {legacy_peak / 2**20:8.1f} MiB  '
+              f'sql {sql_time:8.3f}s {sql_peak / 2**20:6.2f} MiB  '
+              f'speedup {legacy_time / sql_time:6.1f}x  match {same_stats(legacy, aggregated)}')
+
+
+if __name__ == '__main__':
+    main()
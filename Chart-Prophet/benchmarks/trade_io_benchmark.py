@@ -0,0 +1,112 @@
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH_DIR = tempfile.mkdtemp(prefix='trade-io-benchmark-')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{BENCH_DIR}/trades.db')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from models import Base, SessionLocal, Trade, TradeDailyRollup, engine
+from trade_io import export_chunks, export_csv, export_parquet, import_trades, pq
+from trade_queries import TRADE_FIELDS
+from trade_rollups import verify_rollups
+
+
+def broker_export(rows: int) -> pd.DataFrame:
+    rng = random.Random(rows)
+    start = datetime(2023, 1, 1)
+    return pd.DataFrame({
+        'created_at': [(start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))).isoformat() for _ in range(rows)],
+        'symbol': [rng.choice(('AAPL', 'TSLA', 'SPY', 'BTC')) for _ in range(rows)],
+        'recommendation': [rng.choice(('BUY', 'SELL', 'HOLD')) for _ in range(rows)],
+        'indicator_type': [rng.choice(('RSI', 'MACD', 'Fibonacci', 'Combined')) for _ in range(rows)],
+        'outcome': [rng.choice(('win', 'loss', 'pending', '')) for _ in range(rows)],
+        'profit_loss': [rng.choice(('', f'{rng.uniform(-500, 500):.2f}')) for _ in range(rows)],
+        'entry_price': [f'{rng.uniform(10, 500):.2f}' for _ in range(rows)],
+        'notes': ['imported from broker' for _ in range(rows)],
+    })
+
+
+def reset() -> None:
+    tables = [Trade.__table__, TradeDailyRollup.__table__]
+    Base.metadata.drop_all(bind=engine, tables=tables)
+    Base.metadata.create_all(bind=engine, tables=tables)
+
+
+def timed(label: str, function):
+    trace_memory = os.environ.get('BENCH_TRACE_MEMORY', '').lower() in ('1', 'true', 'yes')
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'  {label:<16} {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MiB')
+    else:
+        print(f'  {label:<16} {elapsed:7.2f}s')
+    return result
+
+
+def run_import(data: bytes, file_format: str) -> dict:
+    db = SessionLocal()
+    try:
+        result = import_trades(db, io.BytesIO(data), file_format)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+def run_export(writer) -> int:
+    db = SessionLocal()
+    try:
+        return sum(len(part) for part in writer(export_chunks(db, {}), TRADE_FIELDS))
+    finally:
+        db.close()
+
+
+def main():
+    sizes = [int(size) for size in os.environ.get('BENCH_SIZES', '10000,100000').split(',')]
+    formats = ['csv', 'parquet'] if pq is not None else ['csv']
+
+    print(f'database: {engine.url.render_as_string(hide_password=True)}')
+    for rows in sizes:
+        frame = broker_export(rows)
+        payloads = {'csv': frame.to_csv(index=False).encode('utf-8')}
+        if 'parquet' in formats:
+            buffer = io.BytesIO()
+            frame.to_parquet(buffer, index=False)
+            payloads['parquet'] = buffer.getvalue()
+
+        for file_format in formats:
+            print(f'{rows} rows, {file_format} upload of {len(payloads[file_format]) / 2**20:.1f} MiB')
+            reset()
+            result = timed('import', lambda: run_import(payloads[file_format], file_format))
+            db = SessionLocal()
+            try:
+                stored = db.query(Trade).count()
+                drift = len(verify_rollups(db))
+            finally:
+                db.close()
+            print(f"  imported {result['imported']} rejected {result['rejected']} stored {stored} rollup drift {drift}")
+
+        size = timed('export csv', lambda: run_export(export_csv))
+        print(f'  exported {size / 2**20:.1f} MiB of CSV')
+        if 'parquet' in formats:
+            size = timed('export parquet', lambda: run_export(export_parquet))
+            print(f'  exported {size / 2**20:.1f} MiB of Parquet')
+
+
+if __name__ == '__main__':
+    main()
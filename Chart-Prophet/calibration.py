@@ -0,0 +1,219 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models import Trade
+from trade_queries import QueryError
+from trade_rollups import Watermark, journal_watermark
+
+PREDICTION_FIELDS = ('recommendation', 'confidence_level', 'rsi_signal', 'macd_signal')
+FRAME_COLUMNS = ('id', 'created_at', 'updated_at', 'indicator_type', 'outcome', 'profit_loss') + PREDICTION_FIELDS
+CONFIDENCE_ORDER = ('LOW', 'MEDIUM', 'HIGH')
+OUTCOME_COLUMNS = ('win', 'loss', 'pending')
+DIRECTIONS = {('BUY', 'win'): 'UP', ('BUY', 'loss'): 'DOWN', ('SELL', 'win'): 'DOWN', ('SELL', 'loss'): 'UP'}
+FILTER_KEYS = ('start_date', 'end_date', 'indicator_type')
+BOOTSTRAP_MAX_RESAMPLE = 2000
+
+
+def _round(value: float, digits: int = 4) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def bootstrap_intervals(wins: np.ndarray, pnl: np.ndarray, samples: int, confidence: float,
+                        rng: np.random.Generator) -> Tuple[List[Optional[float]], List[Optional[float]]]:
+    n = len(wins)
+    if n == 0:
+        return [None, None], [None, None]
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    accuracy = rng.binomial(n, wins.mean(), samples) * 100.0 / n
+
+    resample = min(n, BOOTSTRAP_MAX_RESAMPLE)
+    mean = pnl.mean()
+    means = pnl[rng.integers(0, n, size=(samples, resample))].mean(axis=1)
+    means = mean + (means - mean) * np.sqrt(resample / n)
+
+    return (
+        [_round(value, 2) for value in np.quantile(accuracy, quantiles)],
+        [_round(value) for value in np.quantile(means, quantiles)]
+    )
+
+
+def _labels(values: pd.Series) -> pd.Series:
+    return values.astype('string').str.strip().str.upper().replace('', pd.NA).fillna('UNKNOWN')
+
+
+def label_metrics(resolved: pd.DataFrame, field: str, samples: int, confidence: float,
+                  rng: np.random.Generator) -> Dict[str, Dict[str, Any]]:
+    grouped = resolved.groupby(field, observed=True).agg(
+        trades=('win', 'size'),
+        wins=('win', 'sum'),
+        total=('pnl', 'sum'),
+        mean=('pnl', 'mean'),
+    )
+    metrics = {}
+    for label, group in resolved.groupby(field, observed=True):
+        row = grouped.loc[label]
+        accuracy_ci, pnl_ci = bootstrap_intervals(
+            group['win'].to_numpy(), group['pnl'].to_numpy(), samples, confidence, rng
+        )
+        metrics[str(label)] = {
+            'resolved_trades': int(row['trades']),
+            'wins': int(row['wins']),
+            'losses': int(row['trades'] - row['wins']),
+            'accuracy': _round(row['wins'] * 100.0 / row['trades'], 2),
+            'accuracy_ci': accuracy_ci,
+            'total_profit_loss': _round(row['total'], 2),
+            'average_profit_loss': _round(row['mean']),
+            'average_profit_loss_ci': pnl_ci,
+        }
+    return metrics
+
+
+def confusion_matrix(frame: pd.DataFrame, field: str) -> Dict[str, Dict[str, int]]:
+    table = pd.crosstab(frame[field], frame['outcome']).reindex(columns=list(OUTCOME_COLUMNS), fill_value=0)
+    return {str(label): {outcome: int(count) for outcome, count in row.items()} for label, row in table.iterrows()}
+
+
+def direction_confusion(resolved: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+    keys = pd.Series(list(zip(resolved['recommendation'], resolved['outcome'])), index=resolved.index, dtype=object)
+    actual = keys.map(DIRECTIONS)
+    known = actual.notna()
+    table = pd.crosstab(resolved.loc[known, 'recommendation'], actual[known])
+    table = table.reindex(index=['BUY', 'SELL'], columns=['UP', 'DOWN'], fill_value=0)
+    return {label: {direction: int(count) for direction, count in row.items()} for label, row in table.iterrows()}
+
+
+def calibration_report(frame: pd.DataFrame, samples: int = 1000, confidence: float = 0.95,
+                       seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    outcome = frame['outcome'].astype('string').str.strip().str.lower()
+    frame = frame.assign(
+        outcome=outcome.where(outcome.isin(OUTCOME_COLUMNS), 'pending').fillna('pending').astype(str),
+        **{field: _labels(frame[field]).astype(str) for field in PREDICTION_FIELDS}
+    )
+    resolved = frame.loc[frame['outcome'].isin(('win', 'loss'))].assign(
+        win=lambda part: (part['outcome'] == 'win').astype(np.int64),
+        pnl=lambda part: part['profit_loss'].astype('float64').fillna(0.0)
+    )
+
+    by_prediction = {
+        field: label_metrics(resolved, field, samples, confidence, rng) for field in PREDICTION_FIELDS
+    }
+    buckets = [
+        dict(by_prediction['confidence_level'][level], confidence_level=level)
+        for level in CONFIDENCE_ORDER if level in by_prediction['confidence_level']
+    ]
+    accuracies = [bucket['accuracy'] for bucket in buckets]
+
+    return {
+        'trades': int(len(frame)),
+        'resolved_trades': int(len(resolved)),
+        'bootstrap_samples': samples,
+        'confidence': confidence,
+        'by_prediction': by_prediction,
+        'confusion': {field: confusion_matrix(frame, field) for field in PREDICTION_FIELDS},
+        'direction_confusion': direction_confusion(resolved),
+        'confidence_calibration': {
+            'buckets': buckets,
+            'monotonic': all(low <= high for low, high in zip(accuracies, accuracies[1:]))
+        }
+    }
+
+
+def filter_frame(frame: pd.DataFrame, args) -> pd.DataFrame:
+    mask = np.ones(len(frame), dtype=bool)
+    try:
+        if args.get('start_date'):
+            mask &= (frame['created_at'] >= datetime.fromisoformat(args['start_date'])).to_numpy()
+        if args.get('end_date'):
+            end = datetime.fromisoformat(args['end_date']) + timedelta(days=1)
+            mask &= (frame['created_at'] < end).to_numpy()
+    except ValueError:
+        raise QueryError('start_date and end_date must be ISO 8601 dates')
+    indicator_type = args.get('indicator_type')
+    if indicator_type and indicator_type != 'all':
+        mask &= (frame['indicator_type'] == indicator_type).to_numpy()
+    return frame.loc[mask]
+
+
+class CalibrationEngine:
+    def __init__(self, bootstrap_samples: int = 1000, confidence: float = 0.95,
+                 cache_size: int = 32, overlap_seconds: int = 300):
+        self.bootstrap_samples = bootstrap_samples
+        self.confidence = confidence
+        self.cache_size = cache_size
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self._frame: Optional[pd.DataFrame] = None
+        self._synced_to: Optional[datetime] = None
+        self._watermark: Optional[Watermark] = None
+        self._reports: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def watermark(self, db) -> Watermark:
+        return journal_watermark(db)
+
+    def _load(self, db, since: Optional[datetime] = None) -> pd.DataFrame:
+        statement = select(*(Trade.__table__.c[name] for name in FRAME_COLUMNS))
+        if since is not None:
+            statement = statement.where(Trade.updated_at >= since)
+        frame = pd.DataFrame(db.execute(statement).all(), columns=list(FRAME_COLUMNS)).set_index('id')
+        frame['created_at'] = pd.to_datetime(frame['created_at'])
+        return frame
+
+    def sync(self, db, watermark: Watermark) -> None:
+        latest, count, _ = watermark
+        if self._frame is not None and self._synced_to is not None and latest is not None:
+            changed = self._load(db, self._synced_to - self.overlap)
+            frame = pd.concat([self._frame.drop(changed.index, errors='ignore'), changed])
+            self.incremental_loads += 1
+            if len(frame) == count:
+                self._frame = frame
+                self._synced_to = latest
+                return
+        self._frame = self._load(db)
+        self._synced_to = latest
+        self.full_loads += 1
+
+    def report(self, db, args) -> Dict[str, Any]:
+        key = tuple(args.get(name) or '' for name in FILTER_KEYS)
+        with self._lock:
+            watermark = self.watermark(db)
+            if watermark != self._watermark:
+                self._reports.clear()
+                self.sync(db, watermark)
+                self._watermark = watermark
+            elif key in self._reports:
+                self._reports.move_to_end(key)
+                return self._reports[key]
+
+            report = calibration_report(
+                filter_frame(self._frame, args),
+                samples=self.bootstrap_samples,
+                confidence=self.confidence,
+                seed=watermark[1]
+            )
+            report['watermark'] = {
+                'updated_at': watermark[0].isoformat() if watermark[0] else None,
+                'trade_count': watermark[1],
+                'version': watermark[2]
+            }
+            self._reports[key] = report
+            while len(self._reports) > self.cache_size:
+                self._reports.popitem(last=False)
+            return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'cached_reports': len(self._reports),
+                'tracked_trades': 0 if self._frame is None else len(self._frame),
+                'full_loads': self.full_loads,
+                'incremental_loads': self.incremental_loads
+            }
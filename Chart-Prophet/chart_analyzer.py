@@ -1,21 +1,15 @@
-import os
-from google import genai
-from google.genai import types
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
-from typing import Dict, Any, List
-from pydantic import BaseModel
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import json
-
-AI_INTEGRATIONS_GEMINI_API_KEY = os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY")
-AI_INTEGRATIONS_GEMINI_BASE_URL = os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL")
-
-client = genai.Client(
-    api_key=AI_INTEGRATIONS_GEMINI_API_KEY,
-    http_options={
-        'api_version': '',
-        'base_url': AI_INTEGRATIONS_GEMINI_BASE_URL
-    }
-)
+import threading
+import time
+import metrics
+from analysis_cache import AnalysisCache, make_cache_key
+from analysis_parser import StreamingAnalysisParser, parse_analysis
+from model_backends import GeminiBackend, ModelBackend
+from rate_limit import ModelGate, ModelUnavailable
+from single_flight import FlightAbandoned, SingleFlight
 
 class TechnicalIndicator(BaseModel):
     name: str
@@ -53,8 +47,36 @@ def is_rate_limit_error(exception: BaseException) -> bool:
         or (hasattr(exception, 'status') and getattr(exception, 'status', None) == 429)
     )
 
+def should_retry(exception: BaseException) -> bool:
+    return not isinstance(exception, ModelUnavailable) and is_rate_limit_error(exception)
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        value = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+ANALYSIS_FIELD_ADAPTERS = {name: TypeAdapter(field.annotation) for name, field in TradingAnalysis.model_fields.items()}
+
 class ChartAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[AnalysisCache] = None, structured_output: bool = False,
+                 backend: Optional[ModelBackend] = None, gate: Optional[ModelGate] = None):
+        self.backend = backend or GeminiBackend()
+        self.gate = gate
+        self.single_flight = SingleFlight()
+        self.model_name = self.backend.model_name
+        self.cache = cache
+        self.structured_output = structured_output
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'structured_requests': 0,
+            'structured_fallbacks': 0,
+            'summary_requests': 0,
+        }
         self.analysis_prompt = """You are an expert technical analyst and professional trader. Analyze this trading chart image and provide a comprehensive technical analysis.
 
 Please analyze the chart and provide:
@@ -95,192 +117,257 @@ Please analyze the chart and provide:
 
 Be specific with price levels where visible. If certain indicators are not visible on the chart, make reasonable inferences based on price action and patterns."""
 
+        self.structured_prompt = """You are an expert technical analyst and professional trader. Analyze this trading chart image and return the analysis as JSON matching the provided schema.
+
+- overall_recommendation: BUY, SELL, HOLD, STRONG BUY or STRONG SELL. Be decisive.
+- confidence_level: HIGH, MEDIUM or LOW.
+- trend_direction: BULLISH, BEARISH or SIDEWAYS.
+- support_levels, resistance_levels, entry_points, exit_points: up to 5 short entries each, with prices where visible.
+- rsi_analysis, macd_analysis: name, approximate value, signal (OVERBOUGHT, OVERSOLD, BULLISH, BEARISH or NEUTRAL) and a one-sentence description.
+- fibonacci_levels: the standard levels (0%, 23.6%, 38.2%, 50%, 61.8%, 78.6%, 100%) with price and whether each acts as support or resistance.
+- key_observations, risk_factors: up to 5 short entries each.
+- summary: 2-3 sentences.
+
+Keep every entry brief. If an indicator is not visible on the chart, infer it from price action."""
+
+        self.summary_prompt = """You are an expert technical analyst and professional trader. The chart below was digitized from a screenshot into an approximate price series, and its indicators were computed exactly from that series. Rely on these numbers rather than guessing, and provide a comprehensive technical analysis.
+
+Please provide:
+
+1. **Overall Recommendation**: Should the trader BUY, SELL, or HOLD? Be decisive.
+
+2. **Confidence Level**: Rate your confidence as HIGH, MEDIUM, or LOW.
+
+3. **Trend Direction**: Is the current trend BULLISH, BEARISH, or SIDEWAYS?
+
+4. **Support Levels**: Key support price levels.
+
+5. **Resistance Levels**: Key resistance price levels.
+
+6. **RSI Analysis**:
+   - Current value
+   - Signal (OVERBOUGHT, OVERSOLD, or NEUTRAL)
+   - Interpretation
+
+7. **MACD Analysis**:
+   - Current signal (BULLISH, BEARISH, or NEUTRAL)
+   - Whether there's a crossover
+   - Interpretation
+
+8. **Fibonacci Retracement Levels**: 0%, 23.6%, 38.2%, 50%, 61.8%, 78.6%, 100% with prices, and which act as support/resistance.
+
+9. **Key Observations**: Important patterns or notable features in the series.
+
+10. **Risk Factors**: What could go wrong with this trade? Mention that the series was read from an image if that matters.
+
+11. **Entry Points**: Suggested price levels to enter a position.
+
+12. **Exit Points**: Suggested price levels for take-profit or stop-loss.
+
+13. **Summary**: A concise 2-3 sentence summary of your analysis.
+
+Chart data:"""
+
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=2, min=4, max=60),
-        retry=retry_if_exception(is_rate_limit_error),
+        retry=retry_if_exception(should_retry),
+        before_sleep=metrics.record_retry,
         reraise=True
     )
-    def _call_gemini(self, image_data: bytes, mime_type: str) -> str:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[
-                types.Part(text=self.analysis_prompt),
-                types.Part(
-                    inline_data=types.Blob(
-                        mime_type=mime_type,
-                        data=image_data
-                    )
-                )
-            ]
-        )
-        return response.text or ""
+    def _call_model(self, image_data: Optional[bytes], mime_type: str, structured: bool = False,
+                    prompt: Optional[str] = None) -> str:
+        return self._gated(lambda: self.backend.generate(
+            prompt or (self.structured_prompt if structured else self.analysis_prompt),
+            image_data,
+            mime_type,
+            response_schema=TradingAnalysis if structured else None
+        ))
 
-    def analyze_chart(self, image_data: bytes, mime_type: str = "image/png") -> Dict[str, Any]:
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=2, min=4, max=60),
+        retry=retry_if_exception(should_retry),
+        before_sleep=metrics.record_retry,
+        reraise=True
+    )
+    def _open_model_stream(self, image_data: bytes, mime_type: str) -> Tuple[str, Iterator[str]]:
+        def open_stream() -> Tuple[str, Iterator[str]]:
+            stream = iter(self.backend.generate_stream(self.analysis_prompt, image_data, mime_type))
+            return next(stream, ""), stream
+        return self._gated(open_stream)
+
+    def _gated(self, function):
+        with metrics.stage("model_call"):
+            if self.gate is None:
+                return self._timed(function)
+            return self.gate.call(lambda: self._timed(function))
+
+    def _timed(self, function):
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            raw_analysis = self._call_gemini(image_data, mime_type)
-            
-            structured_result = self._parse_analysis(raw_analysis)
-            
-            return structured_result
-            
+            result = function()
+            outcome = "ok"
+            return result
         except Exception as e:
-            return {
-                "error": True,
-                "message": str(e),
-                "overall_recommendation": "UNABLE TO ANALYZE",
-                "confidence_level": "N/A",
-                "trend_direction": "UNKNOWN",
-                "raw_analysis": str(e)
-            }
+            outcome = "rate_limited" if is_rate_limit_error(e) else "error"
+            raise
+        finally:
+            metrics.observe_model_call(self.backend.name, outcome, time.perf_counter() - started)
 
-    def _parse_analysis(self, raw_text: str) -> Dict[str, Any]:
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
         result = {
-            "overall_recommendation": self._extract_recommendation(raw_text),
-            "confidence_level": self._extract_field(raw_text, ["confidence", "confidence level"]),
-            "trend_direction": self._extract_field(raw_text, ["trend direction", "trend"]),
-            "support_levels": self._extract_list(raw_text, "support"),
-            "resistance_levels": self._extract_list(raw_text, "resistance"),
-            "rsi_analysis": self._extract_indicator(raw_text, "rsi"),
-            "macd_analysis": self._extract_indicator(raw_text, "macd"),
-            "fibonacci_levels": self._extract_fibonacci(raw_text),
-            "key_observations": self._extract_list(raw_text, "observation"),
-            "risk_factors": self._extract_list(raw_text, "risk"),
-            "entry_points": self._extract_list(raw_text, "entry"),
-            "exit_points": self._extract_list(raw_text, "exit"),
-            "summary": self._extract_summary(raw_text),
-            "raw_analysis": raw_text
+            "error": True,
+            "message": str(error),
+            "overall_recommendation": "UNABLE TO ANALYZE",
+            "confidence_level": "N/A",
+            "trend_direction": "UNKNOWN",
+            "raw_analysis": str(error)
         }
+        if isinstance(error, ModelUnavailable):
+            result["retry_after"] = error.retry_after
         return result
 
-    def _extract_recommendation(self, text: str) -> str:
-        text_upper = text.upper()
-        if "STRONG BUY" in text_upper:
-            return "STRONG BUY"
-        elif "STRONG SELL" in text_upper:
-            return "STRONG SELL"
-        elif "BUY" in text_upper and "SELL" not in text_upper[:text_upper.find("BUY")+50]:
-            return "BUY"
-        elif "SELL" in text_upper:
-            return "SELL"
-        elif "HOLD" in text_upper:
-            return "HOLD"
-        return "HOLD"
-
-    def _extract_field(self, text: str, keywords: list) -> str:
-        text_lower = text.lower()
-        for keyword in keywords:
-            if keyword in text_lower:
-                idx = text_lower.find(keyword)
-                snippet = text[idx:idx+100]
-                if "HIGH" in snippet.upper():
-                    return "HIGH"
-                elif "MEDIUM" in snippet.upper() or "MODERATE" in snippet.upper():
-                    return "MEDIUM"
-                elif "LOW" in snippet.upper():
-                    return "LOW"
-                elif "BULLISH" in snippet.upper():
-                    return "BULLISH"
-                elif "BEARISH" in snippet.upper():
-                    return "BEARISH"
-                elif "SIDEWAYS" in snippet.upper() or "NEUTRAL" in snippet.upper():
-                    return "SIDEWAYS"
-        return "N/A"
-
-    def _extract_list(self, text: str, keyword: str) -> List[str]:
-        lines = text.split('\n')
-        items = []
-        in_section = False
-        
-        for line in lines:
-            if keyword.lower() in line.lower() and ':' in line:
-                in_section = True
-                after_colon = line.split(':', 1)[-1].strip()
-                if after_colon:
-                    items.append(after_colon)
-                continue
+    def analyze_chart_stream(self, image_data: bytes, mime_type: str = "image/png") -> Iterator[Tuple[str, Any]]:
+        cache_key = make_cache_key(image_data, mime_type, self.analysis_prompt, self.model_name)
+        if self.cache is not None:
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                yield "complete", cached_result
+                return
+
+        flight, leader = self.single_flight.join(cache_key)
+        while not leader:
+            try:
+                yield "complete", flight.wait()
+                return
+            except FlightAbandoned:
+                flight, leader = self.single_flight.join(cache_key)
+
+        structured_result = None
+        try:
+            parser = StreamingAnalysisParser()
+            first_text, stream = self._open_model_stream(image_data, mime_type)
+            for field, value in parser.feed(first_text):
+                yield "section", (field, value)
+            for chunk in stream:
+                for field, value in parser.feed(chunk):
+                    yield "section", (field, value)
+
+            structured_result = parser.close()
+            if self.cache is not None:
+                self.cache.set(cache_key, structured_result)
+
+        except Exception as e:
+            structured_result = self._error_result(e)
+
+        finally:
+            if structured_result is None:
+                self.single_flight.abandon(cache_key, flight)
+            else:
+                self.single_flight.land(cache_key, flight, structured_result)
+
+        yield "complete", structured_result
+
+    def analyze_chart(self, image_data: bytes, mime_type: str = "image/png") -> Dict[str, Any]:
+        prompt = self.structured_prompt if self.structured_output else self.analysis_prompt
+        cache_key = make_cache_key(image_data, mime_type, prompt, self.model_name)
+        if self.cache is not None:
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
+
+        try:
+            result, _ = self.single_flight.do(cache_key, lambda: self._analyze_uncached(image_data, mime_type, cache_key))
+            return result
+        except Exception as e:
+            return self._error_result(e)
+
+    def _analyze_uncached(self, image_data: bytes, mime_type: str, cache_key: str) -> Dict[str, Any]:
+        try:
+            if self.structured_output:
+                structured_result = self._analyze_structured(image_data, mime_type)
+            else:
+                raw_analysis = self._call_model(image_data, mime_type)
+                structured_result = self._parse_analysis(raw_analysis)
             
-            if in_section:
-                if line.strip().startswith('-') or line.strip().startswith('*') or line.strip().startswith('•'):
-                    items.append(line.strip().lstrip('-*• '))
-                elif line.strip() and line.strip()[0].isdigit():
-                    items.append(line.strip().lstrip('0123456789. '))
-                elif line.strip() == '' or (line.strip() and line.strip()[0] == '#'):
-                    in_section = False
-        
-        return items[:5] if items else ["Not identified in chart"]
-
-    def _extract_indicator(self, text: str, indicator: str) -> Dict[str, str]:
-        text_lower = text.lower()
-        result = {
-            "name": indicator.upper(),
-            "value": "N/A",
-            "signal": "NEUTRAL",
-            "description": "Not visible or cannot be determined"
-        }
-        
-        if indicator in text_lower:
-            idx = text_lower.find(indicator)
-            snippet = text[idx:idx+300]
+            if self.cache is not None:
+                self.cache.set(cache_key, structured_result)
             
-            if "OVERBOUGHT" in snippet.upper():
-                result["signal"] = "OVERBOUGHT"
-            elif "OVERSOLD" in snippet.upper():
-                result["signal"] = "OVERSOLD"
-            elif "BULLISH" in snippet.upper():
-                result["signal"] = "BULLISH"
-            elif "BEARISH" in snippet.upper():
-                result["signal"] = "BEARISH"
+            return structured_result
             
-            lines = snippet.split('\n')
-            for line in lines[:3]:
-                if line.strip():
-                    result["description"] = line.strip()[:200]
-                    break
-        
+        except Exception as e:
+            return self._error_result(e)
+
+    def analyze_summary(self, summary: str) -> Dict[str, Any]:
+        cache_key = make_cache_key(summary.encode("utf-8"), "text/plain", self.summary_prompt, self.model_name)
+        if self.cache is not None:
+            cached_result = self.cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result
+
+        try:
+            result, _ = self.single_flight.do(cache_key, lambda: self._analyze_summary_uncached(summary, cache_key))
+            return result
+        except Exception as e:
+            return self._error_result(e)
+
+    def _analyze_summary_uncached(self, summary: str, cache_key: str) -> Dict[str, Any]:
+        with self._stats_lock:
+            self._stats['summary_requests'] += 1
+        try:
+            raw_analysis = self._call_model(None, "text/plain", prompt=f"{self.summary_prompt}\n{summary}")
+            result = self._parse_analysis(raw_analysis)
+            if self.cache is not None:
+                self.cache.set(cache_key, result)
+            return result
+        except Exception as e:
+            return self._error_result(e)
+
+    def _analyze_structured(self, image_data: bytes, mime_type: str) -> Dict[str, Any]:
+        with self._stats_lock:
+            self._stats['structured_requests'] += 1
+        raw_json = self._call_model(image_data, mime_type, structured=True)
+        try:
+            with metrics.stage("parse"):
+                analysis = TradingAnalysis.model_validate_json(raw_json)
+        except ValidationError:
+            with self._stats_lock:
+                self._stats['structured_fallbacks'] += 1
+            return self._parse_lenient(raw_json)
+        metrics.observe_payload("model_response", len(raw_json.encode("utf-8")))
+        result = analysis.model_dump()
+        result["raw_analysis"] = raw_json
         return result
 
-    def _extract_fibonacci(self, text: str) -> List[Dict[str, str]]:
-        fib_levels = []
-        standard_levels = ["0%", "23.6%", "38.2%", "50%", "61.8%", "78.6%", "100%"]
-        
-        for level in standard_levels:
-            if level in text:
-                idx = text.find(level)
-                snippet = text[idx:idx+150]
-                significance = "Key level"
-                if "support" in snippet.lower():
-                    significance = "Acting as support"
-                elif "resistance" in snippet.lower():
-                    significance = "Acting as resistance"
-                
-                fib_levels.append({
-                    "level": level,
-                    "price": "See chart",
-                    "significance": significance
-                })
-        
-        if not fib_levels:
-            fib_levels.append({
-                "level": "N/A",
-                "price": "N/A",
-                "significance": "Fibonacci levels not visible on chart"
-            })
-        
-        return fib_levels
-
-    def _extract_summary(self, text: str) -> str:
-        text_lower = text.lower()
-        if "summary" in text_lower:
-            idx = text_lower.find("summary")
-            snippet = text[idx:]
-            lines = snippet.split('\n')
-            summary_parts = []
-            for line in lines[1:4]:
-                if line.strip() and not line.strip().startswith('#'):
-                    summary_parts.append(line.strip())
-            if summary_parts:
-                return ' '.join(summary_parts)[:500]
-        
-        sentences = text.replace('\n', ' ').split('.')
-        return '. '.join(sentences[:3]) + '.' if sentences else "Analysis complete."
+    def _parse_lenient(self, raw_text: str) -> Dict[str, Any]:
+        result = self._parse_analysis(raw_text)
+        with metrics.stage("parse"):
+            extracted = extract_json_object(raw_text) or {}
+            for name, adapter in ANALYSIS_FIELD_ADAPTERS.items():
+                if name not in extracted:
+                    continue
+                try:
+                    result[name] = adapter.dump_python(adapter.validate_python(extracted[name]))
+                except ValidationError:
+                    continue
+        return result
+
+    def _parse_analysis(self, raw_text: str) -> Dict[str, Any]:
+        metrics.observe_payload("model_response", len(raw_text.encode("utf-8")))
+        with metrics.stage("parse"):
+            return parse_analysis(raw_text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        requests = stats['structured_requests']
+        return {
+            **stats,
+            'structured_output': self.structured_output,
+            'structured_fallback_rate': round(stats['structured_fallbacks'] / requests * 100, 2) if requests else 0,
+            'backend': self.backend.stats(),
+            'limiter': self.gate.stats() if self.gate is not None else None,
+            'single_flight': self.single_flight.stats(),
+        }
@@ -0,0 +1,429 @@
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from indicators import Candles
+
+BULL_HSV_RANGE = ((35, 70, 60), (100, 255, 255))
+BEAR_HSV_RANGES = (((0, 70, 60), (12, 255, 255)), ((165, 70, 60), (180, 255, 255)))
+VIVID_HSV_RANGE = ((0, 70, 60), (180, 255, 255))
+BACKGROUND_TOLERANCE = 40
+AXIS_LINE_FRACTION = 0.6
+MIN_CANDLES = 10
+MAX_WIDTH_RATIO = 4.0
+LINE_BUCKET_PIXELS = 4
+VOLUME_BASELINE_SHARE = 0.6
+VOLUME_PANE_MAX_FRACTION = 0.4
+LABEL_STRIP_MIN_WIDTH = 24
+SCALE_MIN_R2 = 0.999
+SUMMARY_CLOSES = 30
+
+_tesseract_found: Optional[bool] = None
+
+
+class DigitizeError(ValueError):
+    pass
+
+
+class DigitizedChart:
+    def __init__(self, candles: Candles, kind: str, image_size: Tuple[int, int], plot_area: Tuple[int, int, int, int],
+                 calibration: Dict[str, Any], volume_pane: bool, dropped_runs: int, timings: Dict[str, float]):
+        self.candles = candles
+        self.kind = kind
+        self.image_size = image_size
+        self.plot_area = plot_area
+        self.calibration = calibration
+        self.volume_pane = volume_pane
+        self.dropped_runs = dropped_runs
+        self.timings = timings
+
+    @property
+    def price_units(self) -> str:
+        return 'price' if self.calibration['calibrated'] else 'plot_percent'
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'kind': self.kind,
+            'candles': len(self.candles),
+            'image_size': list(self.image_size),
+            'plot_area': list(self.plot_area),
+            'calibration': self.calibration,
+            'price_units': self.price_units,
+            'volume_pane': self.volume_pane,
+            'dropped_runs': self.dropped_runs,
+            'timings_ms': {name: round(value * 1000, 2) for name, value in self.timings.items()}
+        }
+
+    def summary(self, analysis: Dict[str, Any], closes: int = SUMMARY_CLOSES) -> str:
+        candles = self.candles
+        indicators = analysis['indicators']
+        units = '' if self.calibration['calibrated'] else ' (uncalibrated: percent of plot height)'
+        first, last = float(candles.closes[0]), float(candles.closes[-1])
+        change = (last - first) / abs(first) * 100 if first else 0.0
+        value = lambda name, digits=4: 'N/A' if indicators.get(name) is None else f'{indicators[name]:.{digits}f}'
+        fibonacci = indicators['fibonacci']
+        return '\n'.join([
+            f'Chart digitized from a {self.image_size[0]}x{self.image_size[1]} screenshot into {len(candles)} approximate '
+            f'{"candles" if self.kind == "candles" else "line-chart buckets"}, oldest first. '
+            f'Price scale: {self.calibration["method"]}{units}.',
+            f'Range: high {candles.highs.max():.4f}, low {candles.lows.min():.4f}; first close {first:.4f}, '
+            f'last close {last:.4f} ({change:+.2f}%).',
+            f'Last {min(closes, len(candles))} closes: ' + ', '.join(f'{close:.4f}' for close in candles.closes[-closes:]),
+            f"RSI({indicators['settings']['rsi_period']}) {value('rsi', 2)}; MACD line {value('macd')}, "
+            f"signal {value('macd_signal')}, histogram {value('macd_histogram')}.",
+            f"SMA({indicators['settings']['trend_fast']}) {value('sma_fast')}, SMA({indicators['settings']['trend_slow']}) "
+            f"{value('sma_slow')}; Bollinger {value('bb_lower')} / {value('bb_middle')} / {value('bb_upper')}; "
+            f"ATR {value('atr')}.",
+            f"Latest swing {fibonacci['direction']} from {fibonacci['swing_low']:.4f} to {fibonacci['swing_high']:.4f}; "
+            'retracements ' + ', '.join(f"{level['level']} {level['price']}" for level in fibonacci['levels']) + '.',
+            f"Support: {', '.join(analysis['support_levels']) or 'none found'}. "
+            f"Resistance: {', '.join(analysis['resistance_levels']) or 'none found'}.",
+            f"Rule-based read: {analysis['overall_recommendation']} ({analysis['confidence_level']}), "
+            f"trend {analysis['trend_direction']}."
+        ])
+
+
+def parse_digitize_options(args) -> Dict[str, Any]:
+    options = {}
+    for name in ('price_high', 'price_low'):
+        value = args.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            options[name] = float(value.replace(',', '') if isinstance(value, str) else value)
+        except ValueError:
+            raise DigitizeError(f'{name} must be a number')
+    if len(options) == 1:
+        raise DigitizeError('price_high and price_low must be given together')
+    if options and options['price_high'] <= options['price_low']:
+        raise DigitizeError('price_high must be above price_low')
+    return options
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is not None:
+        return image
+    try:
+        with Image.open(io.BytesIO(data)) as pil_image:
+            return cv2.cvtColor(np.asarray(pil_image.convert('RGB')), cv2.COLOR_RGB2BGR)
+    except OSError:
+        raise DigitizeError('Could not decode the chart image')
+
+
+def _foreground(image: np.ndarray) -> np.ndarray:
+    border = np.concatenate((image[0], image[-1], image[:, 0], image[:, -1]))
+    background = np.median(border, axis=0)
+    lower = tuple(float(value) for value in np.clip(background - BACKGROUND_TOLERANCE, 0, 255))
+    upper = tuple(float(value) for value in np.clip(background + BACKGROUND_TOLERANCE, 0, 255))
+    return cv2.inRange(image, lower, upper) == 0
+
+
+def _plot_area(foreground: np.ndarray) -> Tuple[Tuple[int, int, int, int], Optional[Tuple[int, int, int, int]]]:
+    height, width = foreground.shape
+    columns = np.flatnonzero(foreground.mean(axis=0) > AXIS_LINE_FRACTION)
+    rows = np.flatnonzero(foreground.mean(axis=1) > AXIS_LINE_FRACTION)
+    left_lines, right_lines = columns[columns < width // 2], columns[columns >= width // 2]
+    top_lines, bottom_lines = rows[rows < height // 2], rows[rows >= height // 2]
+    x0 = int(left_lines.max()) + 1 if len(left_lines) else 0
+    x1 = int(right_lines.min()) if len(right_lines) else width
+    y0 = int(top_lines.max()) + 1 if len(top_lines) else 0
+    y1 = int(bottom_lines.min()) if len(bottom_lines) else height
+
+    strip = None
+    if width - x1 >= LABEL_STRIP_MIN_WIDTH:
+        strip = (x1 + 1, y0, width, y1)
+    elif x0 >= LABEL_STRIP_MIN_WIDTH:
+        strip = (0, y0, x0 - 1, y1)
+    return (x0, y0, x1, y1), strip
+
+
+def _runs(columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    edges = np.diff(np.concatenate(([0], columns.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _first_rows(present: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return present.argmax(axis=0), len(present) - 1 - present[::-1].argmax(axis=0)
+
+
+def _volume_pane(present: np.ndarray, low_rows: np.ndarray) -> Optional[Tuple[int, int]]:
+    baseline = int(np.bincount(low_rows).argmax())
+    if np.mean(np.abs(low_rows - baseline) <= 1) < VOLUME_BASELINE_SHARE:
+        return None
+    gaps = np.flatnonzero(~present[:baseline].any(axis=1))
+    if not len(gaps):
+        return None
+    top = int(gaps[-1]) + 1
+    if baseline - top > VOLUME_PANE_MAX_FRACTION * len(present):
+        return None
+    return top, baseline
+
+
+def _candle_rows(bull: np.ndarray, bear: np.ndarray) -> Optional[Dict[str, Any]]:
+    colored = bull | bear
+    starts, ends = _runs(colored.any(axis=0))
+    if len(starts) < MIN_CANDLES:
+        return None
+    widths = ends - starts
+    wide = widths > MAX_WIDTH_RATIO * max(float(np.median(widths)), 1.0)
+    for start, end in zip(starts[wide], ends[wide]):
+        colored[:, start:end] = False
+    starts, ends = starts[~wide], ends[~wide]
+    if len(starts) < MIN_CANDLES:
+        return None
+
+    present = np.add.reduceat(colored.view(np.uint8), starts, axis=1, dtype=np.int32) > 0
+    body = colored[:, starts] | colored[:, ends - 1]
+    high_rows, low_rows = _first_rows(present)
+    volumes = None
+    pane = _volume_pane(present, low_rows)
+    if pane is not None:
+        top, baseline = pane
+        volumes = present[top:baseline + 1].sum(axis=0).astype(np.float64)
+        present, body = present[:top], body[:top]
+        keep = present.any(axis=0)
+        present, body, starts, ends, volumes = present[:, keep], body[:, keep], starts[keep], ends[keep], volumes[keep]
+        if len(starts) < MIN_CANDLES:
+            return None
+        high_rows, low_rows = _first_rows(present)
+
+    has_body = body.any(axis=0)
+    body_top, body_bottom = _first_rows(body)
+    body_top = np.where(has_body, body_top, high_rows)
+    body_bottom = np.where(has_body, body_bottom, low_rows)
+    bull_columns = bull.sum(axis=0)
+    bear_columns = bear.sum(axis=0)
+    rising = np.add.reduceat(bull_columns, starts) >= np.add.reduceat(bear_columns, starts)
+    return {
+        'open': np.where(rising, body_bottom, body_top).astype(np.float64),
+        'high': high_rows.astype(np.float64),
+        'low': low_rows.astype(np.float64),
+        'close': np.where(rising, body_top, body_bottom).astype(np.float64),
+        'volume': volumes,
+        'volume_pane': pane is not None,
+        'dropped': int(wide.sum())
+    }
+
+
+def _line_rows(mask: np.ndarray, bucket: int = LINE_BUCKET_PIXELS) -> Optional[Dict[str, Any]]:
+    counts = mask.sum(axis=0)
+    columns = np.flatnonzero(counts)
+    if len(columns) < MIN_CANDLES * bucket:
+        return None
+    rows = np.arange(mask.shape[0], dtype=np.float64)
+    centres = (rows @ mask[:, columns]) / counts[columns]
+    buckets = (columns - columns[0]) // bucket
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(columns)]))
+    return {
+        'open': centres[starts],
+        'high': np.minimum.reduceat(centres, starts),
+        'low': np.maximum.reduceat(centres, starts),
+        'close': centres[ends - 1],
+        'volume': None,
+        'volume_pane': False,
+        'dropped': 0
+    }
+
+
+def _dominant_hue(hsv: np.ndarray, vivid: np.ndarray) -> Optional[np.ndarray]:
+    hues = hsv[..., 0][vivid > 0]
+    if not len(hues):
+        return None
+    hue = int(np.bincount(hues, minlength=181).argmax())
+    return cv2.inRange(hsv, (max(hue - 10, 0), 70, 60), (min(hue + 10, 180), 255, 255)) > 0
+
+
+def fit_price_scale(labels: Sequence[Tuple[float, float]]) -> Optional[Tuple[float, float, float]]:
+    points = np.array(labels, dtype=np.float64).reshape(-1, 2)
+    while len(points) >= 2:
+        rows, prices = points[:, 0], points[:, 1]
+        if np.ptp(rows) == 0:
+            return None
+        slope, intercept = np.polyfit(rows, prices, 1)
+        residuals = prices - (slope * rows + intercept)
+        total = float(((prices - prices.mean()) ** 2).sum())
+        r2 = 1 - float((residuals ** 2).sum()) / total if total else 0.0
+        if slope < 0 and r2 >= SCALE_MIN_R2:
+            return float(slope), float(intercept), r2
+        if len(points) <= 3:
+            return None
+        points = np.delete(points, int(np.abs(residuals).argmax()), axis=0)
+    return None
+
+
+def ocr_available() -> bool:
+    global _tesseract_found
+    if _tesseract_found is None:
+        try:
+            pytesseract.get_tesseract_version()
+            _tesseract_found = True
+        except pytesseract.TesseractNotFoundError:
+            _tesseract_found = False
+    return _tesseract_found
+
+
+def read_axis_labels(image: np.ndarray, strip: Optional[Tuple[int, int, int, int]]) -> List[Tuple[float, float]]:
+    if strip is None or not ocr_available():
+        return []
+    x0, y0, x1, y1 = strip
+    gray = cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+    if gray.mean() < 128:
+        gray = 255 - gray
+    gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    try:
+        data = pytesseract.image_to_data(
+            gray,
+            config='--psm 6 -c tessedit_char_whitelist=0123456789.,-',
+            output_type=pytesseract.Output.DICT
+        )
+    except pytesseract.TesseractError:
+        return []
+    labels = []
+    for text, top, height in zip(data['text'], data['top'], data['height']):
+        try:
+            value = float(text.replace(',', '').strip())
+        except ValueError:
+            continue
+        labels.append((y0 + (top + height / 2) / 2, value))
+    return labels
+
+
+def _calibrate(rows: Dict[str, Any], plot_area: Tuple[int, int, int, int], labels: List[Tuple[float, float]],
+               price_high: Optional[float], price_low: Optional[float]) -> Tuple[float, float, Dict[str, Any]]:
+    x0, y0, x1, y1 = plot_area
+    if price_high is not None and price_low is not None:
+        top, bottom = float(rows['high'].min()), float(rows['low'].max())
+        slope = (price_low - price_high) / max(bottom - top, 1.0)
+        return slope, price_high - slope * top, {'method': 'price_high/price_low', 'calibrated': True}
+    fitted = fit_price_scale([(row - y0, price) for row, price in labels])
+    if fitted is not None:
+        slope, intercept, r2 = fitted
+        return slope, intercept, {'method': 'axis labels', 'calibrated': True, 'labels': len(labels), 'r2': round(r2, 6)}
+    height = max(y1 - y0, 1)
+    return -100.0 / height, 100.0, {'method': 'plot height', 'calibrated': False, 'ocr_available': ocr_available()}
+
+
+def digitize_chart(data: bytes, price_high: Optional[float] = None, price_low: Optional[float] = None) -> DigitizedChart:
+    timings = {}
+    started = time.perf_counter()
+    image = decode_image(data)
+    timings['decode'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    height, width = image.shape[:2]
+    foreground = _foreground(image)
+    plot_area, strip = _plot_area(foreground)
+    x0, y0, x1, y1 = plot_area
+    hsv = cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+    bull = cv2.inRange(hsv, *BULL_HSV_RANGE) > 0
+    bear = (cv2.inRange(hsv, *BEAR_HSV_RANGES[0]) | cv2.inRange(hsv, *BEAR_HSV_RANGES[1])) > 0
+    timings['detect'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    kind = 'candles'
+    rows = _candle_rows(bull, bear)
+    if rows is None:
+        kind = 'line'
+        line_mask = _dominant_hue(hsv, cv2.inRange(hsv, *VIVID_HSV_RANGE))
+        if line_mask is None:
+            line_mask = foreground[y0:y1, x0:x1].copy()
+            line_mask[foreground[y0:y1, x0:x1].mean(axis=1) > AXIS_LINE_FRACTION / 2] = False
+        rows = _line_rows(line_mask)
+    if rows is None:
+        raise DigitizeError('No candles or line series found in the chart image')
+    timings['extract'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    labels = read_axis_labels(image, strip) if price_high is None else []
+    slope, intercept, calibration = _calibrate(rows, plot_area, labels, price_high, price_low)
+    timings['calibrate'] = time.perf_counter() - started
+
+    prices = {name: slope * rows[name] + intercept for name in ('open', 'high', 'low', 'close')}
+    candles = Candles(prices['open'], prices['high'], prices['low'], prices['close'], rows['volume'])
+    return DigitizedChart(candles, kind, (width, height), plot_area, calibration, rows['volume_pane'],
+                          rows['dropped'], timings)
+
+
+def _digitize_job(job: Tuple[bytes, Dict[str, Any]]) -> Tuple[Optional[DigitizedChart], Optional[str]]:
+    data, options = job
+    try:
+        return digitize_chart(data, **options), None
+    except DigitizeError as e:
+        return None, str(e)
+
+
+def _init_worker() -> None:
+    cv2.setNumThreads(1)
+
+
+class ChartDigitizer:
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            'charts': 0,
+            'failures': 0,
+            'pooled_charts': 0,
+            'seconds_total': 0.0,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._pool
+
+    def _record(self, results: List[Tuple[Optional[DigitizedChart], Optional[str]]], seconds: float, pooled: bool) -> None:
+        with self._lock:
+            self._counters['charts'] += len(results)
+            self._counters['failures'] += sum(1 for _, error in results if error)
+            self._counters['pooled_charts'] += len(results) if pooled else 0
+            self._counters['seconds_total'] += seconds
+
+    def digitize(self, data: bytes, **options) -> DigitizedChart:
+        started = time.perf_counter()
+        result = _digitize_job((data, options))
+        self._record([result], time.perf_counter() - started, pooled=False)
+        if result[1] is not None:
+            raise DigitizeError(result[1])
+        return result[0]
+
+    def digitize_many(self, images: Sequence[bytes], **options) -> List[Tuple[Optional[DigitizedChart], Optional[str]]]:
+        started = time.perf_counter()
+        jobs = [(data, options) for data in images]
+        pooled = len(jobs) > 1 and self.max_workers > 1
+        if pooled:
+            chunksize = max(1, len(jobs) // (self.max_workers * 4))
+            results = list(self._get_pool().map(_digitize_job, jobs, chunksize=chunksize))
+        else:
+            results = [_digitize_job(job) for job in jobs]
+        self._record(results, time.perf_counter() - started, pooled)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            'seconds_total': round(counters['seconds_total'], 4),
+            'avg_ms': round(counters['seconds_total'] / counters['charts'] * 1000, 2) if counters['charts'] else 0.0,
+            'max_workers': self.max_workers,
+            'pool_started': self._pool is not None,
+            'ocr_available': ocr_available()
+        }
@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import timezone
+from typing import Any, Dict, Optional, Tuple
+
+from werkzeug.security import safe_join
+
+from trade_rollups import Watermark
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+NO_STORE_CACHE_CONTROL = 'no-cache, no-store, must-revalidate'
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html', 'text/plain', 'text/csv'
+))
+ASSET_HASH_LENGTH = 12
+
+
+class AssetVersions:
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.hashed = 0
+        self._versions: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename: str) -> Optional[str]:
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        try:
+            status = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._versions.get(filename)
+        if cached is not None and cached[:2] == (status.st_mtime_ns, status.st_size):
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1 << 16), b''):
+                digest.update(block)
+        version = digest.hexdigest()[:ASSET_HASH_LENGTH]
+        with self._lock:
+            self._versions[filename] = (status.st_mtime_ns, status.st_size, version)
+            self.hashed += 1
+        return version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'assets': len(self._versions),
+                'hashed': self.hashed,
+                'versions': {filename: version for filename, (_, _, version) in self._versions.items()}
+            }
+
+
+def watermark_validators(watermark: Watermark, *parts: str) -> Tuple[str, Any]:
+    latest, count, version = watermark
+    key = '\x1f'.join((latest.isoformat() if latest else '', str(count), str(version)) + parts)
+    etag = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    last_modified = latest.replace(tzinfo=timezone.utc) if latest and latest.tzinfo is None else latest
+    return etag, last_modified
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class ResponseCompressor:
+    def __init__(self, min_bytes: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._counts = {'compressed': 0, 'skipped_small': 0, 'asset_cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self._assets: Dict[Tuple[str, str], Tuple[str, bytes, int]] = {}
+        self._lock = threading.Lock()
+
+    def compress(self, request, response, asset: Optional[Tuple[str, str]] = None):
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        if response.is_streamed and not (asset and response.direct_passthrough):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        cached = None
+        if asset is not None:
+            filename, version = asset
+            with self._lock:
+                cached = self._assets.get((filename, encoding))
+            if cached is not None and cached[0] != version:
+                cached = None
+        if cached is not None:
+            _, compressed, original_size = cached
+            with self._lock:
+                self._counts['asset_cache_hits'] += 1
+        else:
+            body = b''.join(response.iter_encoded()) if response.direct_passthrough else response.get_data()
+            original_size = len(body)
+            if original_size < self.min_bytes:
+                if response.direct_passthrough:
+                    self._replace_body(response, body)
+                with self._lock:
+                    self._counts['skipped_small'] += 1
+                return response
+            compressed = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+            if asset is not None:
+                with self._lock:
+                    self._assets[(asset[0], encoding)] = (asset[1], compressed, original_size)
+
+        self._replace_body(response, compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+        with self._lock:
+            self._counts['compressed'] += 1
+            self._counts['bytes_in'] += original_size
+            self._counts['bytes_out'] += len(compressed)
+        return response
+
+    @staticmethod
+    def _replace_body(response, body: bytes) -> None:
+        close = getattr(response.response, 'close', None)
+        if close is not None:
+            close()
+        response.direct_passthrough = False
+        response.set_data(body)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            **counts,
+            'min_bytes': self.min_bytes,
+            'cached_assets': len(self._assets),
+            'brotli_available': brotli is not None,
+            'ratio': round(counts['bytes_out'] / counts['bytes_in'], 4) if counts['bytes_in'] else None
+        }
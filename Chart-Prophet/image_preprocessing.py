@@ -0,0 +1,191 @@
+import io
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageOps
+
+MODEL_MAX_DIMENSION = 1536
+PREVIEW_MAX_DIMENSION = 480
+TRIM_TOLERANCE = 12
+TRIM_PADDING = 8
+JPEG_FALLBACK_THRESHOLD = 256 * 1024
+EXIF_ORIENTATION = 0x0112
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = frozenset((b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'))
+JPEG_METADATA_MARKERS = frozenset((0xE1, 0xED, 0xFE))
+
+
+class PreprocessedImage:
+    def __init__(self, data: bytes, mime_type: str, preview: bytes, preview_mime_type: str,
+                 original_bytes: int, original_size: Optional[Tuple[int, int]] = None,
+                 processed_size: Optional[Tuple[int, int]] = None, processed: bool = True,
+                 reencoded: bool = True):
+        self.data = data
+        self.mime_type = mime_type
+        self.preview = preview
+        self.preview_mime_type = preview_mime_type
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.processed_size = processed_size
+        self.processed = processed
+        self.reencoded = reencoded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'reencoded': self.reencoded,
+            'original_bytes': self.original_bytes,
+            'processed_bytes': len(self.data),
+            'bytes_saved': self.original_bytes - len(self.data),
+            'preview_bytes': len(self.preview),
+            'original_size': list(self.original_size) if self.original_size else None,
+            'processed_size': list(self.processed_size) if self.processed_size else None,
+            'mime_type': self.mime_type
+        }
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def trim_margins(image: Image.Image, tolerance: int = TRIM_TOLERANCE, padding: int = TRIM_PADDING) -> Image.Image:
+    factor = max(1, max(image.size) // 1024)
+    probe = image.reduce(factor) if factor > 1 else image
+    background = Image.new(probe.mode, probe.size, image.getpixel((0, 0)))
+    difference = ImageChops.difference(probe, background)
+    red, green, blue = difference.split()
+    content = ImageChops.lighter(ImageChops.lighter(red, green), blue)
+    bbox = content.point(lambda value: 255 if value > tolerance else 0).getbbox()
+    if bbox is None:
+        return image
+
+    left = max(0, bbox[0] * factor - padding)
+    top = max(0, bbox[1] * factor - padding)
+    right = min(image.width, bbox[2] * factor + padding)
+    bottom = min(image.height, bbox[3] * factor + padding)
+    if (left, top, right, bottom) == (0, 0, image.width, image.height):
+        return image
+    return image.crop((left, top, right, bottom))
+
+
+def _encode(image: Image.Image) -> Tuple[bytes, str]:
+    palette = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    png = io.BytesIO()
+    palette.save(png, format='PNG', compress_level=6)
+    encoded, mime_type = png.getvalue(), 'image/png'
+
+    if len(encoded) > JPEG_FALLBACK_THRESHOLD:
+        jpeg = io.BytesIO()
+        image.save(jpeg, format='JPEG', quality=88, optimize=True)
+        if jpeg.tell() < len(encoded):
+            encoded, mime_type = jpeg.getvalue(), 'image/jpeg'
+
+    return encoded, mime_type
+
+
+def _strip_png_metadata(data: bytes) -> Optional[bytes]:
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    kept = [PNG_SIGNATURE]
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[offset:offset + 8])
+        end = offset + 12 + length
+        if end > len(data):
+            return None
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            kept.append(data[offset:end])
+        offset = end
+        if chunk_type == b'IEND':
+            return b''.join(kept)
+    return None
+
+
+def _strip_jpeg_metadata(data: bytes) -> Optional[bytes]:
+    if not data.startswith(b'\xff\xd8'):
+        return None
+    kept = [data[:2]]
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0xDA:
+            kept.append(data[offset:])
+            return b''.join(kept)
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        end = offset + 2 + length
+        if end > len(data):
+            return None
+        if marker not in JPEG_METADATA_MARKERS:
+            kept.append(data[offset:end])
+        offset = end
+    return None
+
+
+def strip_metadata(data: bytes, image_format: Optional[str]) -> Optional[bytes]:
+    if image_format == 'PNG':
+        return _strip_png_metadata(data)
+    if image_format == 'JPEG':
+        return _strip_jpeg_metadata(data)
+    return None
+
+
+def make_preview(image: Image.Image, max_dimension: int = PREVIEW_MAX_DIMENSION) -> bytes:
+    preview = image.copy()
+    preview.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    preview.save(output, format='JPEG', quality=70, optimize=True)
+    return output.getvalue()
+
+
+def preprocess_image(image_data: bytes, mime_type: str, max_dimension: int = MODEL_MAX_DIMENSION,
+                     preview_dimension: int = PREVIEW_MAX_DIMENSION, trim: bool = True) -> PreprocessedImage:
+    try:
+        with Image.open(io.BytesIO(image_data)) as source:
+            source.seek(0)
+            original_size = source.size
+            original_format = source.format
+            unchanged = (source.getexif().get(EXIF_ORIENTATION, 1) == 1
+                         and source.mode not in ('RGBA', 'LA', 'PA') and 'transparency' not in source.info)
+            image = _flatten(ImageOps.exif_transpose(source))
+    except Exception:
+        return PreprocessedImage(
+            data=image_data,
+            mime_type=mime_type,
+            preview=image_data,
+            preview_mime_type=mime_type,
+            original_bytes=len(image_data),
+            processed=False
+        )
+
+    if trim:
+        image = trim_margins(image)
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    data, processed_mime_type = _encode(image)
+    reencoded = True
+    if unchanged and image.size == original_size and len(data) >= len(image_data):
+        stripped = strip_metadata(image_data, original_format)
+        if stripped is not None:
+            data, processed_mime_type, reencoded = stripped, Image.MIME[original_format], False
+
+    return PreprocessedImage(
+        data=data,
+        mime_type=processed_mime_type,
+        preview=make_preview(image, preview_dimension),
+        preview_mime_type='image/jpeg',
+        original_bytes=len(image_data),
+        original_size=original_size,
+        processed_size=image.size,
+        reencoded=reencoded
+    )
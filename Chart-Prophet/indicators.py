@@ -0,0 +1,590 @@
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from numpy.lib.stride_tricks import sliding_window_view
+
+from analysis_parser import STANDARD_FIB_LEVELS, format_analysis
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+TIME_COLUMNS = ('timestamp', 'time', 'date', 'datetime')
+COLUMN_ALIASES = {'o': 'open', 't': 'timestamp', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'}
+ARRAY_COLUMNS = {
+    4: PRICE_COLUMNS,
+    5: ('timestamp',) + PRICE_COLUMNS,
+    6: ('timestamp',) + PRICE_COLUMNS + ('volume',),
+}
+FIB_RATIOS = np.array([0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0])
+DEFAULT_SETTINGS = {
+    'rsi_period': 14,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'bb_period': 20,
+    'atr_period': 14,
+    'trend_fast': 50,
+    'trend_slow': 200,
+    'fib_lookback': 100,
+    'pivot_window': 5,
+    'level_lookback': 250,
+}
+DEFAULT_BB_WIDTH = 2.0
+MAX_PERIOD = 500
+MAX_LOOKBACK = 100000
+MAX_SERIES_POINTS = 5000
+PRICE_UNITS = ('price', 'plot_percent')
+LEVEL_COUNT = 3
+MACD_FLAT_TOLERANCE = 1e-9
+SERIES_FIELDS = (
+    'close', 'sma_fast', 'sma_slow', 'ema_fast', 'ema_slow', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_lower', 'bb_middle', 'bb_upper', 'atr',
+)
+
+
+class OhlcError(ValueError):
+    pass
+
+
+class Candles:
+    def __init__(self, opens: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray,
+                 volumes: Optional[np.ndarray] = None, timestamps: Optional[np.ndarray] = None, reordered: bool = False):
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.volumes = volumes
+        self.timestamps = timestamps
+        self.reordered = reordered
+
+    def __len__(self) -> int:
+        return len(self.closes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'count': len(self),
+            'first': _isoformat(self.timestamps[0]) if self.timestamps is not None else None,
+            'last': _isoformat(self.timestamps[-1]) if self.timestamps is not None else None,
+            'has_volume': self.volumes is not None,
+            'reordered': self.reordered
+        }
+
+
+def _isoformat(stamp) -> str:
+    return pd.Timestamp(stamp).isoformat()
+
+
+def detect_candle_format(filename: str, mime_type: Optional[str] = None, requested: Optional[str] = None) -> str:
+    if requested:
+        file_format = requested.lower()
+    elif filename and '.' in filename:
+        file_format = filename.rsplit('.', 1)[-1].lower()
+    else:
+        file_format = 'json' if mime_type and 'json' in mime_type else 'csv'
+    if file_format not in ('csv', 'json'):
+        raise OhlcError("Unsupported candle format. Use 'csv' or 'json'")
+    return file_format
+
+
+def _json_frame(payload: Any) -> pd.DataFrame:
+    if isinstance(payload, dict) and 'candles' in payload:
+        payload = payload['candles']
+    if isinstance(payload, dict):
+        try:
+            return pd.DataFrame(payload)
+        except ValueError as e:
+            raise OhlcError(f'Candle columns must be arrays of equal length: {e}')
+    if not isinstance(payload, list):
+        raise OhlcError('JSON candles must be a list of candles, a dict of columns, or {"candles": ...}')
+    if payload and isinstance(payload[0], (list, tuple)):
+        width = len(payload[0])
+        if width not in ARRAY_COLUMNS or any(len(row) != width for row in payload):
+            raise OhlcError('Array candles must all be [open, high, low, close], [time, open, high, low, close] '
+                            'or [time, open, high, low, close, volume]')
+        return pd.DataFrame(payload, columns=list(ARRAY_COLUMNS[width]))
+    if any(not isinstance(row, dict) for row in payload):
+        raise OhlcError('Every JSON candle must be an object or an array')
+    return pd.DataFrame.from_records(payload)
+
+
+def _timestamps(values: pd.Series) -> np.ndarray:
+    if is_numeric_dtype(values):
+        unit = 'ms' if values.abs().max() > 1e11 else 's'
+        stamps = pd.to_datetime(values, unit=unit, utc=True, errors='coerce')
+    else:
+        try:
+            stamps = pd.to_datetime(values, utc=True, format='ISO8601')
+        except ValueError:
+            stamps = pd.to_datetime(values, errors='coerce', utc=True, format='mixed')
+    if stamps.isna().any():
+        raise OhlcError(f'Candle {int(np.argmax(stamps.isna().to_numpy())) + 1} has an invalid timestamp')
+    return stamps.dt.tz_convert(None).to_numpy()
+
+
+def candles_from_frame(frame: pd.DataFrame, max_candles: Optional[int] = None) -> Candles:
+    frame = frame.rename(columns=lambda name: COLUMN_ALIASES.get(str(name).strip().lower(), str(name).strip().lower()))
+    missing = [name for name in PRICE_COLUMNS if name not in frame]
+    if missing:
+        raise OhlcError(f"Missing candle columns: {', '.join(missing)}")
+    if len(frame) < 2:
+        raise OhlcError('At least 2 candles are required')
+    if max_candles is not None and len(frame) > max_candles:
+        raise OhlcError(f'At most {max_candles} candles are accepted per request')
+
+    prices = frame[list(PRICE_COLUMNS)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    invalid = ~np.isfinite(prices).all(axis=1)
+    if invalid.any():
+        raise OhlcError(f'Candle {int(np.argmax(invalid)) + 1} has a missing or non-numeric price')
+    inverted = prices[:, 1] < prices[:, 2]
+    if inverted.any():
+        raise OhlcError(f'Candle {int(np.argmax(inverted)) + 1} has a high below its low')
+
+    volumes = None
+    if 'volume' in frame:
+        volumes = pd.to_numeric(frame['volume'], errors='coerce').to_numpy(dtype=np.float64)
+
+    timestamps = None
+    reordered = False
+    time_column = next((name for name in TIME_COLUMNS if name in frame), None)
+    if time_column is not None:
+        timestamps = _timestamps(frame[time_column])
+        if (timestamps[1:] < timestamps[:-1]).any():
+            order = np.argsort(timestamps, kind='stable')
+            timestamps = timestamps[order]
+            prices = prices[order]
+            volumes = volumes[order] if volumes is not None else None
+            reordered = True
+
+    return Candles(
+        np.ascontiguousarray(prices[:, 0]),
+        np.ascontiguousarray(prices[:, 1]),
+        np.ascontiguousarray(prices[:, 2]),
+        np.ascontiguousarray(prices[:, 3]),
+        volumes,
+        timestamps,
+        reordered
+    )
+
+
+def load_candles(data: bytes, file_format: str, max_candles: Optional[int] = None) -> Candles:
+    if file_format == 'json':
+        try:
+            frame = _json_frame(json.loads(data))
+        except json.JSONDecodeError as e:
+            raise OhlcError(f'Invalid JSON: {e}')
+    else:
+        try:
+            frame = pd.read_csv(io.BytesIO(data))
+        except (ValueError, pd.errors.ParserError) as e:
+            raise OhlcError(f'Invalid CSV: {e}')
+    return candles_from_frame(frame, max_candles)
+
+
+def _parse_int(args, name: str, default: int, minimum: int, maximum: int) -> int:
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise OhlcError(f'{name} must be an integer')
+    if not minimum <= number <= maximum:
+        raise OhlcError(f'{name} must be between {minimum} and {maximum}')
+    return number
+
+
+def parse_settings(args) -> Dict[str, Any]:
+    settings = {
+        name: _parse_int(args, name, default, 1, MAX_LOOKBACK if name.endswith('lookback') else MAX_PERIOD)
+        for name, default in DEFAULT_SETTINGS.items()
+    }
+    if settings['macd_fast'] >= settings['macd_slow']:
+        raise OhlcError('macd_fast must be shorter than macd_slow')
+    if settings['trend_fast'] >= settings['trend_slow']:
+        raise OhlcError('trend_fast must be shorter than trend_slow')
+    try:
+        settings['bb_width'] = float(args.get('bb_width') or DEFAULT_BB_WIDTH)
+    except ValueError:
+        raise OhlcError('bb_width must be a number')
+    if not 0 < settings['bb_width'] <= 10:
+        raise OhlcError('bb_width must be between 0 and 10')
+    return settings
+
+
+def parse_series_points(args) -> int:
+    return _parse_int(args, 'series', 0, 0, MAX_SERIES_POINTS)
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    result = np.full(len(values), np.nan)
+    if period > len(values):
+        return result
+    sums = np.cumsum(values, dtype=np.float64)
+    result[period - 1] = sums[period - 1]
+    result[period:] = sums[period:] - sums[:-period]
+    result[period - 1:] /= period
+    return result
+
+
+def _smoothed(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    result = np.full(len(values), np.nan)
+    finite = np.isfinite(values)
+    start = int(finite.argmax())
+    if not finite[start]:
+        return result
+    first = start + period - 1
+    if first >= len(values):
+        return result
+    seeded = values[first:].astype(np.float64)
+    seeded[0] = values[start:first + 1].mean()
+    result[first:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return result
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    return _smoothed(values, period, 2.0 / (period + 1))
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    return _smoothed(values, period, 1.0 / period)
+
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    result = np.full(len(closes), np.nan)
+    change = np.diff(closes)
+    gains = wilder(np.clip(change, 0, None), period)
+    losses = wilder(np.clip(-change, 0, None), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = 100.0 - 100.0 / (1.0 + gains / losses)
+    result[1:][(gains == 0) & (losses == 0)] = 50.0
+    return result
+
+
+def macd(closes: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    line = ema(closes, fast) - ema(closes, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(closes: np.ndarray, period: int = 20, width: float = DEFAULT_BB_WIDTH) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    middle = sma(closes, period)
+    deviation = np.full(len(closes), np.nan)
+    if period <= len(closes):
+        count = len(closes) - period + 1
+        squares = np.zeros(count)
+        for offset in range(period):
+            residual = closes[offset:offset + count] - middle[period - 1:]
+            squares += residual * residual
+        deviation[period - 1:] = np.sqrt(squares / period)
+    return middle - width * deviation, middle, middle + width * deviation
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    ranges = highs - lows
+    ranges[1:] = np.maximum.reduce([ranges[1:], np.abs(highs[1:] - closes[:-1]), np.abs(lows[1:] - closes[:-1])])
+    return ranges
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+    return wilder(true_range(highs, lows, closes), period)
+
+
+def fibonacci_retracements(highs: np.ndarray, lows: np.ndarray, lookback: int = 100) -> Dict[str, Any]:
+    highs = highs[-lookback:]
+    lows = lows[-lookback:]
+    high_index = int(np.argmax(highs))
+    low_index = int(np.argmin(lows))
+    swing_high = float(highs[high_index])
+    swing_low = float(lows[low_index])
+    rising = low_index <= high_index
+    span = swing_high - swing_low
+    prices = swing_high - span * FIB_RATIOS if rising else swing_low + span * FIB_RATIOS
+    return {
+        'direction': 'up' if rising else 'down',
+        'swing_high': swing_high,
+        'swing_low': swing_low,
+        'swing_high_age': len(highs) - 1 - high_index,
+        'swing_low_age': len(lows) - 1 - low_index,
+        'levels': [{'level': level, 'price': float(price)} for level, price in zip(STANDARD_FIB_LEVELS, prices)]
+    }
+
+
+def swing_pivots(highs: np.ndarray, lows: np.ndarray, window: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    size = 2 * window + 1
+    if len(highs) < size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    centre = slice(window, len(highs) - window)
+    pivot_highs = np.flatnonzero(highs[centre] >= sliding_window_view(highs, size).max(axis=1)) + window
+    pivot_lows = np.flatnonzero(lows[centre] <= sliding_window_view(lows, size).min(axis=1)) + window
+    return pivot_highs, pivot_lows
+
+
+def floor_pivots(high: float, low: float, close: float) -> Dict[str, float]:
+    pivot = (high + low + close) / 3
+    return {
+        'pivot': pivot,
+        'r1': 2 * pivot - low,
+        's1': 2 * pivot - high,
+        'r2': pivot + (high - low),
+        's2': pivot - (high - low)
+    }
+
+
+def support_resistance(candles: Candles, window: int = 5, lookback: int = 250,
+                       count: int = LEVEL_COUNT) -> Dict[str, Any]:
+    highs = candles.highs[-lookback:]
+    lows = candles.lows[-lookback:]
+    close = float(candles.closes[-1])
+    pivot_highs, pivot_lows = swing_pivots(highs, lows, window)
+    floors = floor_pivots(float(candles.highs[-1]), float(candles.lows[-1]), close)
+
+    swing_resistance = np.unique(highs[pivot_highs][highs[pivot_highs] > close])
+    swing_support = np.unique(lows[pivot_lows][lows[pivot_lows] < close])[::-1]
+    resistance = [(float(price), 'swing high') for price in swing_resistance[:count]]
+    support = [(float(price), 'swing low') for price in swing_support[:count]]
+    for name in ('r1', 'r2'):
+        if len(resistance) < count and floors[name] > close and all(floors[name] != price for price, _ in resistance):
+            resistance.append((floors[name], f'floor pivot {name.upper()}'))
+    for name in ('s1', 's2'):
+        if len(support) < count and floors[name] < close and all(floors[name] != price for price, _ in support):
+            support.append((floors[name], f'floor pivot {name.upper()}'))
+    return {
+        'support': sorted(support, reverse=True),
+        'resistance': sorted(resistance),
+        'floor_pivots': floors,
+        'swing_highs': len(pivot_highs),
+        'swing_lows': len(pivot_lows)
+    }
+
+
+def compute_indicators(candles: Candles, settings: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    closes = candles.closes
+    ema_fast = ema(closes, settings['macd_fast'])
+    ema_slow = ema(closes, settings['macd_slow'])
+    macd_line = ema_fast - ema_slow
+    signal_line = ema(macd_line, settings['macd_signal'])
+    lower, middle, upper = bollinger(closes, settings['bb_period'], settings['bb_width'])
+    return {
+        'close': closes,
+        'sma_fast': sma(closes, settings['trend_fast']),
+        'sma_slow': sma(closes, settings['trend_slow']),
+        'ema_fast': ema_fast,
+        'ema_slow': ema_slow,
+        'rsi': rsi(closes, settings['rsi_period']),
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_histogram': macd_line - signal_line,
+        'bb_lower': lower,
+        'bb_middle': middle,
+        'bb_upper': upper,
+        'atr': atr(candles.highs, candles.lows, closes, settings['atr_period'])
+    }
+
+
+def _value(value: float, digits: int = 4) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+def _price(value: Optional[float], units: str = 'price') -> str:
+    if value is None or not np.isfinite(value):
+        return 'N/A'
+    if units == 'plot_percent':
+        return f'{value:.2f}% of plot'
+    return f'${value:,.2f}' if abs(value) >= 1 else f'${value:.6g}'
+
+
+def _snap_flat(value: float, scale: float) -> float:
+    tolerance = MACD_FLAT_TOLERANCE * (abs(scale) or 1.0)
+    return 0.0 if np.isfinite(value) and np.isclose(value, 0.0, rtol=0.0, atol=tolerance) else value
+
+
+def _number(value: float, digits: int, signed: bool = False) -> str:
+    if not np.isfinite(value):
+        return 'N/A'
+    return f'{value:+.{digits}f}' if signed else f'{value:.{digits}f}'
+
+
+def _trend(close: float, fast: float, slow: float, fast_slope: float) -> str:
+    if np.isfinite(slow):
+        if close > fast > slow:
+            return 'BULLISH'
+        if close < fast < slow:
+            return 'BEARISH'
+        return 'SIDEWAYS'
+    if np.isfinite(fast) and np.isfinite(fast_slope):
+        if close > fast and fast_slope > 0:
+            return 'BULLISH'
+        if close < fast and fast_slope < 0:
+            return 'BEARISH'
+    return 'SIDEWAYS'
+
+
+def _series(values: Dict[str, np.ndarray], candles: Candles, points: int) -> Dict[str, List[Optional[float]]]:
+    series = {name: [_value(value, 6) for value in values[name][-points:]] for name in SERIES_FIELDS}
+    if candles.timestamps is not None:
+        series['timestamp'] = [_isoformat(stamp) for stamp in candles.timestamps[-points:]]
+    return series
+
+
+def analyze_candles(candles: Candles, settings: Optional[Dict[str, Any]] = None, series_points: int = 0,
+                    price_units: str = 'price') -> Dict[str, Any]:
+    if price_units not in PRICE_UNITS:
+        raise OhlcError(f"Unknown price units '{price_units}'. Use one of: {', '.join(PRICE_UNITS)}")
+    settings = {**DEFAULT_SETTINGS, 'bb_width': DEFAULT_BB_WIDTH, **(settings or {})}
+    format_price = lambda value: _price(value, price_units)
+    values = compute_indicators(candles, settings)
+    latest = {name: float(series[-1]) for name, series in values.items()}
+    close = latest['close']
+    previous_histogram = _snap_flat(float(values['macd_histogram'][-2]), close)
+    fast_slope = latest['sma_fast'] - float(values['sma_fast'][-2])
+
+    rsi_value = latest['rsi']
+    if not np.isfinite(rsi_value):
+        rsi_signal = 'NEUTRAL'
+        rsi_text = f"Needs more than {settings['rsi_period']} candles"
+    elif rsi_value >= 70:
+        rsi_signal = 'OVERBOUGHT'
+        rsi_text = f"RSI({settings['rsi_period']}) at {rsi_value:.1f} is above 70; momentum is stretched to the upside"
+    elif rsi_value <= 30:
+        rsi_signal = 'OVERSOLD'
+        rsi_text = f"RSI({settings['rsi_period']}) at {rsi_value:.1f} is below 30; momentum is stretched to the downside"
+    else:
+        rsi_signal = 'NEUTRAL'
+        rsi_text = f"RSI({settings['rsi_period']}) at {rsi_value:.1f} is between 30 and 70"
+
+    histogram = _snap_flat(latest['macd_histogram'], close)
+    macd_label = f"MACD({settings['macd_fast']},{settings['macd_slow']},{settings['macd_signal']})"
+    if not np.isfinite(histogram):
+        macd_signal = 'NEUTRAL'
+        macd_text = f"Needs at least {settings['macd_slow'] + settings['macd_signal'] - 1} candles"
+    else:
+        macd_signal = 'BULLISH' if histogram > 0 else 'BEARISH' if histogram < 0 else 'NEUTRAL'
+        crossed = histogram != 0 and np.isfinite(previous_histogram) and np.sign(histogram) != np.sign(previous_histogram)
+        position = 'above' if histogram > 0 else 'below' if histogram < 0 else 'level with'
+        macd_text = (f"{macd_label} line {latest['macd']:.4f} is {position} its signal line {latest['macd_signal']:.4f}"
+                     + ('; crossed over on the latest candle' if crossed else ''))
+
+    trend = _trend(close, latest['sma_fast'], latest['sma_slow'], fast_slope)
+    score = {'BULLISH': 1, 'BEARISH': -1}.get(trend, 0)
+    score += {'BULLISH': 1, 'BEARISH': -1}.get(macd_signal, 0)
+    score += {'OVERSOLD': 1, 'OVERBOUGHT': -1}.get(rsi_signal, 0)
+    recommendation = 'BUY' if score >= 2 else 'SELL' if score <= -2 else 'HOLD'
+    confidence = 'HIGH' if abs(score) == 3 else 'MEDIUM' if abs(score) == 2 else 'LOW'
+
+    fibonacci = fibonacci_retracements(candles.highs, candles.lows, settings['fib_lookback'])
+    levels = support_resistance(candles, settings['pivot_window'], settings['level_lookback'])
+    atr_value = latest['atr']
+    atr_percent = atr_value / close * 100 if np.isfinite(atr_value) and close else np.nan
+    lower, upper = latest['bb_lower'], latest['bb_upper']
+    band_width = upper - lower
+
+    observations = []
+    if np.isfinite(latest['sma_fast']):
+        slow_text = f" and the {settings['trend_slow']}-period SMA ({format_price(latest['sma_slow'])})" if np.isfinite(latest['sma_slow']) else ''
+        observations.append(f"Close {format_price(close)} versus the {settings['trend_fast']}-period SMA "
+                            f"({format_price(latest['sma_fast'])}){slow_text}")
+    if np.isfinite(band_width) and band_width > 0:
+        observations.append(f"Close sits at {(close - lower) / band_width * 100:.0f}% of the Bollinger band "
+                            f"({format_price(lower)} - {format_price(upper)})")
+    if np.isfinite(histogram) and np.isfinite(previous_histogram):
+        direction = 'rising' if histogram > previous_histogram else 'falling' if histogram < previous_histogram else 'flat'
+        observations.append(f"MACD histogram {direction} "
+                            f"({previous_histogram:+.4f} to {histogram:+.4f})")
+    if np.isfinite(atr_percent):
+        observations.append(f"ATR({settings['atr_period']}) is {format_price(atr_value)} ({atr_percent:.2f}% of the close)")
+    observations.append(f"Swing {'rally' if fibonacci['direction'] == 'up' else 'decline'} from "
+                        f"{format_price(fibonacci['swing_low'] if fibonacci['direction'] == 'up' else fibonacci['swing_high'])} to "
+                        f"{format_price(fibonacci['swing_high'] if fibonacci['direction'] == 'up' else fibonacci['swing_low'])} "
+                        f"over the last {min(len(candles), settings['fib_lookback'])} candles")
+
+    risks = []
+    if rsi_signal != 'NEUTRAL':
+        risks.append(f'RSI is {rsi_signal.lower()}; mean reversion can move against the trend')
+    if np.isfinite(band_width) and (close > upper or close < lower):
+        risks.append(f"Close is outside the Bollinger band ({settings['bb_width']:g} standard deviations)")
+    typical_atr = np.nanmedian(values['atr'] / candles.closes) * 100 if np.isfinite(atr_value) else np.nan
+    if np.isfinite(atr_percent) and np.isfinite(typical_atr) and typical_atr > 0 and atr_percent > 1.5 * typical_atr:
+        risks.append(f'Volatility is {atr_percent / typical_atr:.1f}x its typical level for this series')
+    if len(candles) < settings['trend_slow']:
+        risks.append(f"Only {len(candles)} candles; the {settings['trend_slow']}-period trend filter is unavailable")
+    if confidence == 'LOW':
+        risks.append('Trend, MACD and RSI disagree; the signal is weak')
+    if not risks:
+        risks.append('Indicators use price history only; news and fundamentals are not considered')
+
+    support = levels['support']
+    resistance = levels['resistance']
+    stop_distance = 1.5 * atr_value if np.isfinite(atr_value) and atr_value > 0 else np.nan
+    entries = [f'{format_price(close)} (last close)']
+    if recommendation == 'BUY' and support:
+        entries.append(f'{format_price(support[0][0])} on a pullback to support')
+    if recommendation == 'SELL' and resistance:
+        entries.append(f'{format_price(resistance[0][0])} on a rally to resistance')
+    exits = []
+    if recommendation == 'SELL':
+        if support:
+            exits.append(f'{format_price(support[0][0])} target at support')
+        elif close - 2 * stop_distance > 0:
+            exits.append(f'{format_price(close - 2 * stop_distance)} target (3 x ATR)')
+        if np.isfinite(stop_distance):
+            exits.append(f'{format_price(close + stop_distance)} stop (1.5 x ATR)')
+    else:
+        if resistance:
+            exits.append(f'{format_price(resistance[0][0])} target at resistance')
+        elif np.isfinite(stop_distance):
+            exits.append(f'{format_price(close + 2 * stop_distance)} target (3 x ATR)')
+        if close - stop_distance > 0:
+            exits.append(f'{format_price(close - stop_distance)} stop (1.5 x ATR)')
+
+    analysis = {
+        'overall_recommendation': recommendation,
+        'confidence_level': confidence,
+        'trend_direction': trend,
+        'support_levels': [f'{format_price(price)} ({source})' for price, source in support],
+        'resistance_levels': [f'{format_price(price)} ({source})' for price, source in resistance],
+        'rsi_analysis': {
+            'name': 'RSI',
+            'value': f'{rsi_value:.2f}' if np.isfinite(rsi_value) else 'N/A',
+            'signal': rsi_signal,
+            'description': rsi_text
+        },
+        'macd_analysis': {
+            'name': 'MACD',
+            'value': f"{latest['macd']:.4f}" if np.isfinite(latest['macd']) else 'N/A',
+            'signal': macd_signal,
+            'description': macd_text
+        },
+        'fibonacci_levels': [
+            {
+                'level': level['level'],
+                'price': format_price(level['price']),
+                'significance': 'Acting as support' if level['price'] < close else 'Acting as resistance'
+            }
+            for level in fibonacci['levels']
+        ],
+        'key_observations': observations,
+        'risk_factors': risks,
+        'entry_points': entries,
+        'exit_points': exits,
+        'summary': (f"{recommendation} with {confidence.lower()} confidence from {len(candles)} candles: "
+                    f"trend {trend.lower()}, RSI {_number(rsi_value, 1)} ({rsi_signal.lower()}), "
+                    f"MACD histogram {_number(histogram, 4, signed=True)}. Nearest support "
+                    f"{format_price(support[0][0]) if support else 'N/A'}, resistance "
+                    f"{format_price(resistance[0][0]) if resistance else 'N/A'}.")
+    }
+    analysis['raw_analysis'] = format_analysis(analysis)
+    analysis['indicators'] = {
+        **{name: _value(value, 6) for name, value in latest.items()},
+        'atr_percent': _value(atr_percent),
+        'fibonacci': {**fibonacci, 'levels': [{**level, 'price': _value(level['price'], 6)} for level in fibonacci['levels']]},
+        'floor_pivots': {name: _value(value, 6) for name, value in levels['floor_pivots'].items()},
+        'score': score,
+        'price_units': price_units,
+        'settings': settings
+    }
+    if series_points:
+        analysis['series'] = _series(values, candles, series_points)
+    return analysis
+
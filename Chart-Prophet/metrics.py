@@ -0,0 +1,288 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+SQL_OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'COPY')
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = dict(self._values)
+        return [(f'{self.name}_total', dict(zip(self.labelnames, key)), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        samples = []
+        for key, series in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', {**labels, 'le': _format_value(float(bound))}, cumulative))
+            samples.append((f'{self.name}_sum', labels, series[-1]))
+            samples.append((f'{self.name}_count', labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, function: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        self._collectors.append(function)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        described = set()
+        for function in self._collectors:
+            for name, kind, documentation, labels, value in function():
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {name} {documentation}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'chartprophet_http_request_duration_seconds', 'Time from request start until the handler returned',
+    ('endpoint', 'method', 'status')
+)
+STAGE_SECONDS = registry.histogram(
+    'chartprophet_stage_duration_seconds', 'Time spent in one stage of a request', ('endpoint', 'stage')
+)
+PAYLOAD_BYTES = registry.histogram(
+    'chartprophet_payload_bytes', 'Size of uploads, encoded images, model responses and JSON bodies',
+    ('endpoint', 'kind'), SIZE_BUCKETS
+)
+DB_QUERY_SECONDS = registry.histogram(
+    'chartprophet_db_query_duration_seconds', 'Database statement execution time', ('endpoint', 'operation')
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    'chartprophet_db_queries_per_request', 'Database statements executed per request', ('endpoint',), COUNT_BUCKETS
+)
+MODEL_CALL_SECONDS = registry.histogram(
+    'chartprophet_model_call_duration_seconds', 'Model API call time per attempt', ('backend', 'outcome')
+)
+MODEL_RETRIES = registry.counter(
+    'chartprophet_model_retries', 'Model API attempts retried after a rate-limit error', ('backend', 'error')
+)
+
+
+class RequestMetrics:
+    __slots__ = ('endpoint', 'started_at', 'queries', 'db_seconds')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_state = {'enabled': True}
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar('chartprophet_request_metrics', default=None)
+_NULL_STAGE = nullcontext()
+
+
+def configure(enabled: bool = True) -> None:
+    _state['enabled'] = enabled
+
+
+def enabled() -> bool:
+    return _state['enabled']
+
+
+def current_endpoint() -> str:
+    current = _current.get()
+    return current.endpoint if current is not None else 'background'
+
+
+@contextmanager
+def _timed_stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, endpoint=current_endpoint(), stage=name)
+
+
+def stage(name: str):
+    if not _state['enabled']:
+        return _NULL_STAGE
+    return _timed_stage(name)
+
+
+@contextmanager
+def request_scope(endpoint: str, stage_name: str = 'stream_body'):
+    if not _state['enabled']:
+        yield
+        return
+    token = _current.set(RequestMetrics(endpoint))
+    try:
+        with _timed_stage(stage_name):
+            yield
+    finally:
+        _current.reset(token)
+
+
+def observe_payload(kind: str, size: Optional[int]) -> None:
+    if _state['enabled'] and size is not None:
+        PAYLOAD_BYTES.observe(size, endpoint=current_endpoint(), kind=kind)
+
+
+def observe_model_call(backend: str, outcome: str, seconds: float) -> None:
+    if _state['enabled']:
+        MODEL_CALL_SECONDS.observe(seconds, backend=backend, outcome=outcome)
+
+
+def record_retry(retry_state) -> None:
+    if not _state['enabled']:
+        return
+    analyzer = retry_state.args[0] if retry_state.args else None
+    backend = getattr(getattr(analyzer, 'backend', None), 'name', 'unknown')
+    error = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    MODEL_RETRIES.inc(backend=backend, error=type(error).__name__ if error is not None else 'unknown')
+
+
+def begin_request(endpoint: str):
+    if not _state['enabled']:
+        return None
+    return _current.set(RequestMetrics(endpoint))
+
+
+def end_request(token, method: str, status: int, response_bytes: Optional[int]) -> None:
+    if token is None:
+        return
+    try:
+        current = _current.get()
+        if current is None:
+            return
+        REQUEST_SECONDS.observe(time.perf_counter() - current.started_at,
+                                endpoint=current.endpoint, method=method, status=status)
+        DB_QUERIES_PER_REQUEST.observe(current.queries, endpoint=current.endpoint)
+        if response_bytes is not None:
+            PAYLOAD_BYTES.observe(response_bytes, endpoint=current.endpoint, kind='response')
+    finally:
+        _current.reset(token)
+
+
+def discard_request(token) -> None:
+    if token is not None:
+        _current.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _state['enabled']:
+        context._metrics_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, '_metrics_started_at', None)
+    if started_at is None:
+        return
+    elapsed = time.perf_counter() - started_at
+    operation = statement.split(None, 1)[0].upper() if statement.strip() else ''
+    current = _current.get()
+    if current is not None:
+        current.queries += 1
+        current.db_seconds += elapsed
+    DB_QUERY_SECONDS.observe(
+        elapsed,
+        endpoint=current.endpoint if current is not None else 'background',
+        operation=operation if operation in SQL_OPERATIONS else 'OTHER'
+    )
+
+
+def instrument_engine(engine) -> None:
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def render() -> str:
+    return registry.render()
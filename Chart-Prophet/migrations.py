@@ -0,0 +1,175 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+
+from analysis_store import backfill_analyses
+from models import AnalysisBlob, JournalVersion, SchemaMigration, SessionLocal, Trade, TradeDailyRollup, engine, init_db
+from trade_queries import apply_trade_filters, build_page_queries, compute_stats_query, encode_cursor
+from trade_rollups import rebuild_rollups
+
+MIGRATIONS: List[Tuple[str, str, Callable]] = []
+MIGRATION_LOCK_ID = 724_113_001
+
+
+def migration(version: str, description: str):
+    def register(function: Callable) -> Callable:
+        MIGRATIONS.append((version, description, function))
+        return function
+    return register
+
+
+@migration('0001', 'Composite indexes for trade history and stats filters')
+def add_trade_query_indexes(connection) -> None:
+    for name, columns in (
+        ('ix_trades_created_at_id', 'created_at, id'),
+        ('ix_trades_indicator_created_at', 'indicator_type, created_at, id'),
+        ('ix_trades_outcome_created_at', 'outcome, created_at, id'),
+    ):
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON trades ({columns})'))
+
+
+@migration('0002', 'Backfill trade_daily_rollups from trades')
+def backfill_trade_rollups(connection) -> None:
+    TradeDailyRollup.__table__.create(bind=connection, checkfirst=True)
+    rebuild_rollups(connection)
+
+
+@migration('0003', 'Track trade modification times for incremental readers')
+def add_trade_updated_at(connection) -> None:
+    columns = {column['name'] for column in inspect(connection).get_columns('trades')}
+    if 'updated_at' not in columns:
+        connection.execute(text('ALTER TABLE trades ADD COLUMN updated_at TIMESTAMP'))
+        connection.execute(text('UPDATE trades SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_trades_updated_at ON trades (updated_at)'))
+
+
+@migration('0004', 'Move raw analyses into the deduplicated, compressed analysis_blobs store')
+def move_raw_analyses(connection) -> None:
+    AnalysisBlob.__table__.create(bind=connection, checkfirst=True)
+    columns = {column['name'] for column in inspect(connection).get_columns('trades')}
+    if 'analysis_id' not in columns:
+        connection.execute(text('ALTER TABLE trades ADD COLUMN analysis_id INTEGER REFERENCES analysis_blobs (id)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_trades_analysis_id ON trades (analysis_id)'))
+    if 'raw_analysis' in columns:
+        backfill_analyses(connection)
+        connection.execute(text('ALTER TABLE trades DROP COLUMN raw_analysis'))
+
+
+@migration('0005', 'Journal version counter bumped by every trade write')
+def add_journal_version(connection) -> None:
+    JournalVersion.__table__.create(bind=connection, checkfirst=True)
+    if connection.execute(text('SELECT COUNT(*) FROM journal_version')).scalar() == 0:
+        connection.execute(text('INSERT INTO journal_version (id, version) VALUES (1, 0)'))
+
+
+def applied_versions(connection) -> Dict[str, Any]:
+    rows = connection.execute(text('SELECT version, applied_at FROM schema_migrations'))
+    return {version: applied_at for version, applied_at in rows}
+
+
+def run_migrations(bind=engine) -> List[str]:
+    SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    applied = []
+    for version, description, function in sorted(MIGRATIONS):
+        with bind.begin() as connection:
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text('SELECT pg_advisory_xact_lock(:lock_id)'), {'lock_id': MIGRATION_LOCK_ID})
+            if version in applied_versions(connection):
+                continue
+            function(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+            applied.append(version)
+    return applied
+
+
+def plan_check_queries(db) -> Dict[str, object]:
+    cursor = encode_cursor('created_at', True, datetime(2025, 1, 1), 1000)
+    page = lambda args, cursor=None: build_page_queries(
+        apply_trade_filters(db.query(Trade), args), 'created_at', True, cursor
+    )[0].limit(51)
+    return {
+        'trades: first page': page({}),
+        'trades: next page': page({}, cursor),
+        'trades: indicator filter': page({'indicator_type': 'RSI'}, cursor),
+        'trades: outcome filter': page({'outcome': 'win'}, cursor),
+        'trades: date range': page({'start_date': '2025-01-01', 'end_date': '2025-01-31'}),
+        'stats: date range': compute_stats_query(db, {'start_date': '2025-01-01', 'end_date': '2025-01-31'}),
+        'stats: indicator filter': compute_stats_query(db, {'indicator_type': 'RSI'}),
+        'calibration: changed trades': db.query(Trade.id).filter(Trade.updated_at >= datetime(2025, 1, 1)),
+    }
+
+
+def _sequential_scans(connection, sql: str) -> Tuple[List[str], str]:
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        scans, stack = [], [plan[0]['Plan']]
+        while stack:
+            node = stack.pop()
+            if node.get('Node Type') == 'Seq Scan':
+                scans.append(f"Seq Scan on {node.get('Relation Name')}")
+            stack.extend(node.get('Plans', []))
+        return scans, json.dumps(plan, indent=2)
+
+    details = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    scans = [detail for detail in details if detail.startswith('SCAN') and 'INDEX' not in detail]
+    return scans, '\n'.join(details)
+
+
+def check_query_plans(verbose: bool = False) -> bool:
+    db = SessionLocal()
+    ok = True
+    try:
+        for name, query in plan_check_queries(db).items():
+            sql = str(query.statement.compile(engine, compile_kwargs={'literal_binds': True}))
+            with engine.begin() as connection:
+                scans, plan = _sequential_scans(connection, sql)
+            ok = ok and not scans
+            print(f"{'FAIL' if scans else 'ok  '} {name}" + (f": {'; '.join(scans)}" if scans else ''))
+            if verbose or scans:
+                print('     ' + plan.replace('\n', '\n     '))
+    finally:
+        db.close()
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Apply schema migrations and check trade query plans.')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('upgrade', help='apply pending migrations')
+    subcommands.add_parser('status', help='list migrations and whether they are applied')
+    check = subcommands.add_parser('check-plans', help='fail if trade history/stats queries use sequential scans')
+    check.add_argument('--verbose', action='store_true', help='print every query plan')
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        init_db()
+        applied = run_migrations()
+        print(f"applied: {', '.join(applied)}" if applied else 'already up to date')
+        return 0
+
+    if args.command == 'status':
+        SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+        with engine.connect() as connection:
+            applied = applied_versions(connection)
+        for version, description, _ in sorted(MIGRATIONS):
+            applied_at = applied.get(version)
+            print(f"{version}  {str(applied_at or 'pending'):<26}  {description}")
+        return 0
+
+    init_db()
+    run_migrations()
+    return 0 if check_query_plans(args.verbose) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
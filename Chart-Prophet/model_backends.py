@@ -0,0 +1,241 @@
+import abc
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from analysis_parser import format_analysis
+
+AI_INTEGRATIONS_GEMINI_API_KEY = os.environ.get("AI_INTEGRATIONS_GEMINI_API_KEY")
+AI_INTEGRATIONS_GEMINI_BASE_URL = os.environ.get("AI_INTEGRATIONS_GEMINI_BASE_URL")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+
+RECORDED_RESPONSES_DIR = Path(__file__).resolve().parent / "recorded_responses"
+
+
+class ModelError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ModelBackend(abc.ABC):
+    name = "base"
+    model_name = "base"
+
+    @abc.abstractmethod
+    def generate(self, prompt: str, image_data: Optional[bytes], mime_type: str, response_schema: Any = None) -> str:
+        pass
+
+    def generate_stream(self, prompt: str, image_data: Optional[bytes], mime_type: str) -> Iterator[str]:
+        yield self.generate(prompt, image_data, mime_type)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model_name}
+
+
+class GeminiBackend(ModelBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL, api_key: Optional[str] = AI_INTEGRATIONS_GEMINI_API_KEY,
+                 base_url: Optional[str] = AI_INTEGRATIONS_GEMINI_BASE_URL):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._types = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google import genai
+                    from google.genai import types
+                    self._types = types
+                    self._client = genai.Client(
+                        api_key=self.api_key,
+                        http_options={
+                            'api_version': '',
+                            'base_url': self.base_url
+                        }
+                    )
+        return self._client
+
+    def _contents(self, prompt: str, image_data: Optional[bytes], mime_type: str) -> List[Any]:
+        types = self._types
+        contents = [types.Part(text=prompt)]
+        if image_data is not None:
+            contents.append(types.Part(
+                inline_data=types.Blob(
+                    mime_type=mime_type,
+                    data=image_data
+                )
+            ))
+        return contents
+
+    def generate(self, prompt: str, image_data: Optional[bytes], mime_type: str, response_schema: Any = None) -> str:
+        client = self._get_client()
+        config = None
+        if response_schema is not None:
+            config = self._types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema
+            )
+        response = client.models.generate_content(
+            model=self.model_name,
+            contents=self._contents(prompt, image_data, mime_type),
+            config=config
+        )
+        return response.text or ""
+
+    def generate_stream(self, prompt: str, image_data: Optional[bytes], mime_type: str) -> Iterator[str]:
+        client = self._get_client()
+        for chunk in client.models.generate_content_stream(
+            model=self.model_name,
+            contents=self._contents(prompt, image_data, mime_type)
+        ):
+            yield chunk.text or ""
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "client_initialized": self._client is not None}
+
+
+def _image_seed(image_data: Optional[bytes], prompt: str = "") -> int:
+    content = image_data if image_data is not None else prompt.encode("utf-8")
+    return int.from_bytes(hashlib.sha256(content).digest()[:8], "big")
+
+
+def _chunks(text: str, chunk_chars: int) -> Iterator[str]:
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+class ReplayBackend(ModelBackend):
+    name = "replay"
+    model_name = "replay"
+
+    def __init__(self, directory: Path = RECORDED_RESPONSES_DIR, chunk_chars: int = 200, chunk_delay: float = 0.0):
+        self.directory = Path(directory)
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.responses = [path.read_text(encoding="utf-8") for path in sorted(self.directory.glob("*.md"))]
+        self.structured_responses = [path.read_text(encoding="utf-8") for path in sorted(self.directory.glob("*.json"))]
+        if not self.responses:
+            raise ValueError(f"No recorded responses (*.md) in {self.directory}")
+
+    def generate(self, prompt: str, image_data: Optional[bytes], mime_type: str, response_schema: Any = None) -> str:
+        responses = self.structured_responses if response_schema is not None and self.structured_responses else self.responses
+        return responses[_image_seed(image_data, prompt) % len(responses)]
+
+    def generate_stream(self, prompt: str, image_data: Optional[bytes], mime_type: str) -> Iterator[str]:
+        for chunk in _chunks(self.generate(prompt, image_data, mime_type), self.chunk_chars):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "recorded_responses": len(self.responses)}
+
+
+class FakeBackend(ModelBackend):
+    name = "fake"
+    model_name = "fake"
+
+    def __init__(self, latency_ms: float = 800.0, latency_sigma: float = 0.3, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, chunk_chars: int = 200, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_chars = chunk_chars
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def _draw(self) -> tuple:
+        with self._lock:
+            self._counters["requests"] += 1
+            latency = self.latency_ms * self._random.lognormvariate(0.0, self.latency_sigma) / 1000.0
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self._counters["rate_limited"] += 1
+                return latency, ModelError("429 RESOURCE_EXHAUSTED: fake backend rate limit", status=429)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self._counters["errors"] += 1
+                return latency, ModelError("500 INTERNAL: fake backend error", status=500)
+            return latency, None
+
+    def _analysis(self, image_data: Optional[bytes], prompt: str) -> Dict[str, Any]:
+        picker = random.Random(_image_seed(image_data, prompt))
+        price = round(picker.uniform(20, 500), 2)
+        recommendation = picker.choice(("BUY", "SELL", "HOLD"))
+        return {
+            "overall_recommendation": recommendation,
+            "confidence_level": picker.choice(("HIGH", "MEDIUM", "LOW")),
+            "trend_direction": {"BUY": "BULLISH", "SELL": "BEARISH", "HOLD": "SIDEWAYS"}[recommendation],
+            "support_levels": [f"${price * 0.95:.2f}", f"${price * 0.9:.2f}"],
+            "resistance_levels": [f"${price * 1.05:.2f}", f"${price * 1.1:.2f}"],
+            "rsi_analysis": {
+                "name": "RSI",
+                "value": str(picker.randint(20, 80)),
+                "signal": picker.choice(("OVERBOUGHT", "OVERSOLD", "NEUTRAL")),
+                "description": "Synthetic RSI reading from the fake backend."
+            },
+            "macd_analysis": {
+                "name": "MACD",
+                "value": "N/A",
+                "signal": picker.choice(("BULLISH", "BEARISH", "NEUTRAL")),
+                "description": "Synthetic MACD reading from the fake backend."
+            },
+            "fibonacci_levels": [
+                {"level": level, "price": f"${price * (1 - ratio / 10):.2f}", "significance": "support"}
+                for level, ratio in (("38.2%", 0.382), ("50%", 0.5), ("61.8%", 0.618))
+            ],
+            "key_observations": ["Synthetic chart observation."],
+            "risk_factors": ["Synthetic risk factor."],
+            "entry_points": [f"${price:.2f}"],
+            "exit_points": [f"${price * 1.08:.2f}", f"${price * 0.93:.2f}"],
+            "summary": f"Fake {recommendation} analysis for load testing."
+        }
+
+    def generate(self, prompt: str, image_data: Optional[bytes], mime_type: str, response_schema: Any = None) -> str:
+        latency, error = self._draw()
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        analysis = self._analysis(image_data, prompt)
+        return json.dumps(analysis) if response_schema is not None else format_analysis(analysis)
+
+    def generate_stream(self, prompt: str, image_data: Optional[bytes], mime_type: str) -> Iterator[str]:
+        latency, error = self._draw()
+        if error is not None:
+            time.sleep(latency)
+            raise error
+        chunks = list(_chunks(format_analysis(self._analysis(image_data, prompt)), self.chunk_chars))
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **super().stats(),
+            **counters,
+            "latency_ms": self.latency_ms,
+            "latency_sigma": self.latency_sigma,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate
+        }
+
+
+def create_backend(name: str, **options) -> ModelBackend:
+    backends = {"gemini": GeminiBackend, "replay": ReplayBackend, "fake": FakeBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown model backend '{name}'. Use one of: {', '.join(backends)}")
+    return backends[name](**options)
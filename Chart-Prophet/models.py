@@ -1,15 +1,110 @@
 import os
+import threading
+import time
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, Column, ForeignKey, Integer, BigInteger, String, Float, Date, DateTime, Text, Boolean, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '0'))
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'checkout_wait_total_ms': 0.0,
+            'checkout_wait_max_ms': 0.0,
+            'in_use_high_water': 0,
+        }
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self._metrics['checkout_timeouts'] += 1
+            raise
+        waited_ms = (time.perf_counter() - started) * 1000
+        in_use = self.checkedout()
+        with self._metrics_lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['checkout_wait_total_ms'] += waited_ms
+            self._metrics['checkout_wait_max_ms'] = max(self._metrics['checkout_wait_max_ms'], waited_ms)
+            self._metrics['in_use_high_water'] = max(self._metrics['in_use_high_water'], in_use)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        pool._metrics_lock = self._metrics_lock
+        return pool
+
+    def metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics['checkouts']
+        return {
+            **metrics,
+            'checkout_wait_total_ms': round(metrics['checkout_wait_total_ms'], 3),
+            'checkout_wait_max_ms': round(metrics['checkout_wait_max_ms'], 3),
+            'checkout_wait_avg_ms': round(metrics['checkout_wait_total_ms'] / checkouts, 3) if checkouts else 0,
+            'pool_size': self.size(),
+            'max_overflow': self._max_overflow,
+            'in_use': self.checkedout(),
+            'idle': self.checkedin(),
+            'overflow': max(0, self.overflow()),
+        }
+
+def _engine_options(url):
+    if url.startswith('sqlite') and (':memory:' in url or url.rstrip('/') == 'sqlite:'):
+        return {}
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS and url.startswith('postgres'):
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+def pool_metrics():
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        return engine.pool.metrics()
+    return {'pool_class': type(engine.pool).__name__, 'status': engine.pool.status()}
 
-engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+class AnalysisBlob(Base):
+    __tablename__ = 'analysis_blobs'
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    codec = Column(String(8), nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    stored_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
 class Trade(Base):
     __tablename__ = 'trades'
     
@@ -27,14 +122,53 @@ class Trade(Base):
     entry_price = Column(Float, nullable=True)
     exit_price = Column(Float, nullable=True)
     notes = Column(Text, nullable=True)
-    raw_analysis = Column(Text, nullable=True)
+    analysis_id = Column(Integer, ForeignKey('analysis_blobs.id'), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_trades_created_at_id', 'created_at', 'id'),
+        Index('ix_trades_indicator_created_at', 'indicator_type', 'created_at', 'id'),
+        Index('ix_trades_outcome_created_at', 'outcome', 'created_at', 'id'),
+        Index('ix_trades_updated_at', 'updated_at'),
+        Index('ix_trades_analysis_id', 'analysis_id'),
+    )
+
+class TradeDailyRollup(Base):
+    __tablename__ = 'trade_daily_rollups'
+
+    day = Column(Date, primary_key=True)
+    indicator_type = Column(String(50), primary_key=True, default='')
+    outcome = Column(String(20), primary_key=True, default='')
+    trade_count = Column(Integer, nullable=False, default=0)
+    profit_loss_sum = Column(Float, nullable=False, default=0.0)
+
+class JournalVersion(Base):
+    __tablename__ = 'journal_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = 'analysis_cache'
+
+    cache_key = Column(String(64), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    result = Column(Text, nullable=False)
+
+class ChartFingerprint(Base):
+    __tablename__ = 'chart_fingerprints'
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    image_hash = Column(BigInteger, nullable=False, index=True)
+    result = Column(Text, nullable=False)
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+
+    version = Column(String(32), primary_key=True)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
@@ -0,0 +1,198 @@
+import io
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from models import ChartFingerprint, SessionLocal
+
+HASH_BITS = 64
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+
+
+def _load_grayscale(image_data: bytes) -> np.ndarray:
+    with Image.open(io.BytesIO(image_data)) as image:
+        image.seek(0)
+        return np.asarray(image.convert('L'), dtype=np.float32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image_data: bytes, hash_size: int = 8) -> int:
+    pixels = _load_grayscale(image_data)
+    resized = cv2.resize(pixels, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(resized[:, 1:] > resized[:, :-1])
+
+
+def phash(image_data: bytes, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    pixels = _load_grayscale(image_data)
+    size = hash_size * highfreq_factor
+    resized = cv2.resize(pixels, (size, size), interpolation=cv2.INTER_AREA)
+    low_freq = cv2.dct(resized)[:hash_size, :hash_size]
+    return _bits_to_int(low_freq > np.median(low_freq))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << HASH_BITS) if value & _SIGN_BIT else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+class BKTree:
+    def __init__(self):
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, image_hash: int, item_id: Any) -> None:
+        node = [image_hash, [item_id], {}]
+        self._size += 1
+        if self._root is None:
+            self._root = node
+            return
+
+        current = self._root
+        while True:
+            distance = hamming_distance(image_hash, current[0])
+            if distance == 0:
+                current[1].append(item_id)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def nearest(self, image_hash: int, max_distance: int) -> Optional[Tuple[int, Any]]:
+        if self._root is None:
+            return None
+
+        best = None
+        radius = max_distance
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(image_hash, node[0])
+            if distance <= radius and (best is None or distance < best[0]):
+                best = (distance, node[1][-1])
+                radius = distance
+                if distance == 0:
+                    break
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+
+        return best
+
+
+class NearDuplicateIndex:
+    def __init__(self, hash_function=phash):
+        self.hash_function = hash_function
+        self._tree = BKTree()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._counters = {
+            'lookups': 0,
+            'matches': 0,
+            'indexed': 0,
+            'errors': 0,
+        }
+
+    def compute_hash(self, image_data: bytes) -> Optional[int]:
+        try:
+            return self.hash_function(image_data)
+        except Exception:
+            return None
+
+    def find(self, image_hash: int, max_distance: int) -> Optional[Dict[str, Any]]:
+        self._ensure_loaded()
+        with self._lock:
+            self._counters['lookups'] += 1
+            match = self._tree.nearest(image_hash, max_distance)
+        if match is None:
+            return None
+
+        distance, fingerprint_id = match
+        db = SessionLocal()
+        try:
+            fingerprint = db.get(ChartFingerprint, fingerprint_id)
+            if fingerprint is None:
+                return None
+            analysis = json.loads(fingerprint.result)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._counters['matches'] += 1
+        return {
+            'fingerprint_id': fingerprint_id,
+            'distance': distance,
+            'analysis': analysis
+        }
+
+    def add(self, image_hash: int, analysis: Dict[str, Any]) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            if self._tree.nearest(image_hash, 0) is not None:
+                return
+
+        db = SessionLocal()
+        try:
+            fingerprint = ChartFingerprint(
+                image_hash=to_signed(image_hash),
+                result=json.dumps(analysis)
+            )
+            db.add(fingerprint)
+            db.flush()
+            fingerprint_id = fingerprint.id
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._counters['errors'] += 1
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._tree.add(image_hash, fingerprint_id)
+            self._counters['indexed'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                'size': len(self._tree),
+                'loaded': self._loaded
+            }
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            db = SessionLocal()
+            try:
+                rows = db.query(ChartFingerprint.id, ChartFingerprint.image_hash).yield_per(10000)
+                for fingerprint_id, image_hash in rows:
+                    self._tree.add(to_unsigned(image_hash), fingerprint_id)
+            finally:
+                db.close()
+            self._loaded = True
@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _frame_label(self, frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}'
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            self._stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> 'SamplingProfiler':
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+
+class ProfileStore:
+    def __init__(self, max_profiles: int = 20):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, profiler: SamplingProfiler) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._profiles[profile_id] = {
+                'endpoint': endpoint,
+                'samples': profiler.samples,
+                'interval': profiler.interval,
+                'duration': round(profiler.duration, 6),
+                'collapsed': profiler.collapsed()
+            }
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
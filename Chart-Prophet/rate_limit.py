@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class ModelUnavailable(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None, state_file: Optional[str] = None):
+        if state_file and fcntl is None:
+            raise ValueError('A shared rate limit file requires fcntl (POSIX only)')
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate * 10)))
+        self.state_file = state_file
+        self._tokens = self.capacity
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+        self._handle = None
+
+    def _reserve_locked(self, tokens: float, updated_at: float, max_wait: Optional[float]):
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+        wait = max(0.0, (1 - tokens) / self.rate)
+        if max_wait is not None and wait > max_wait:
+            return tokens, now, wait, False
+        return tokens - 1, now, wait, True
+
+    def _shared_state(self):
+        self._handle.seek(0)
+        try:
+            state = json.loads(self._handle.read() or '{}')
+        except ValueError:
+            state = {}
+        return state.get('tokens', self.capacity), state.get('updated_at', time.time())
+
+    def reserve(self, max_wait: Optional[float] = None):
+        with self._lock:
+            if not self.state_file:
+                self._tokens, self._updated_at, wait, admitted = self._reserve_locked(
+                    self._tokens, self._updated_at, max_wait
+                )
+                return wait, admitted
+
+            if self._handle is None:
+                self._handle = open(self.state_file, 'a+')
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+            try:
+                tokens, updated_at = self._shared_state()
+                tokens, updated_at, wait, admitted = self._reserve_locked(tokens, updated_at, max_wait)
+                self._handle.seek(0)
+                self._handle.truncate()
+                self._handle.write(json.dumps({'tokens': tokens, 'updated_at': updated_at}))
+                self._handle.flush()
+            finally:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            return wait, admitted
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_count = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.retry_after() > 0:
+                    raise ModelUnavailable('Model API is rate limited; circuit open', self.retry_after())
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise ModelUnavailable('Model API is recovering; probe request in flight', 1.0)
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened_count += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class ModelGate:
+    def __init__(self, bucket: TokenBucket, breaker: CircuitBreaker, max_queue_wait: float = 10.0,
+                 is_saturation_error: Optional[Callable[[BaseException], bool]] = None):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_queue_wait = max_queue_wait
+        self.is_saturation_error = is_saturation_error or (lambda exception: False)
+        self._lock = threading.Lock()
+        self._counters = {
+            'admitted': 0,
+            'rejected_queue_full': 0,
+            'rejected_circuit_open': 0,
+            'upstream_rate_limited': 0,
+            'queue_depth': 0,
+            'queue_depth_high_water': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def admit(self, max_wait: Optional[float] = None) -> float:
+        try:
+            self.breaker.before_call()
+        except ModelUnavailable:
+            self._count('rejected_circuit_open')
+            raise
+
+        wait, admitted = self.bucket.reserve(self.max_queue_wait if max_wait is None else max_wait)
+        if not admitted:
+            self.breaker.release()
+            self._count('rejected_queue_full')
+            raise ModelUnavailable('Model request queue is full', wait)
+
+        if wait > 0:
+            with self._lock:
+                self._counters['queue_depth'] += 1
+                self._counters['queue_depth_high_water'] = max(
+                    self._counters['queue_depth_high_water'], self._counters['queue_depth']
+                )
+            try:
+                time.sleep(wait)
+            finally:
+                self._count('queue_depth', -1)
+
+        with self._lock:
+            self._counters['admitted'] += 1
+            self._counters['wait_seconds_total'] += wait
+            self._counters['wait_seconds_max'] = max(self._counters['wait_seconds_max'], wait)
+        return wait
+
+    def call(self, function: Callable[[], Any], max_wait: Optional[float] = None) -> Any:
+        self.admit(max_wait)
+        try:
+            result = function()
+        except Exception as e:
+            if not self.is_saturation_error(e):
+                self.breaker.release()
+                raise
+            self._count('upstream_rate_limited')
+            if self.breaker.record_failure():
+                raise ModelUnavailable('Model API is rate limited; circuit open', self.breaker.retry_after()) from e
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        admitted = counters['admitted']
+        return {
+            **counters,
+            'wait_seconds_avg': round(counters['wait_seconds_total'] / admitted, 4) if admitted else 0.0,
+            'wait_seconds_total': round(counters['wait_seconds_total'], 4),
+            'wait_seconds_max': round(counters['wait_seconds_max'], 4),
+            'requests_per_minute': self.bucket.rate * 60,
+            'burst': self.bucket.capacity,
+            'shared': bool(self.bucket.state_file),
+            'max_queue_wait': self.max_queue_wait,
+            'circuit': {
+                'state': self.breaker.state,
+                'retry_after': round(self.breaker.retry_after(), 2) if self.breaker.state == CircuitBreaker.OPEN else 0,
+                'opened_count': self.breaker.opened_count,
+                'failure_threshold': self.breaker.failure_threshold,
+                'reset_timeout': self.breaker.reset_timeout
+            }
+        }
@@ -0,0 +1,82 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class FlightAbandoned(Exception):
+    pass
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return copy.deepcopy(self.result)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'leaders': 0,
+            'coalesced': 0,
+            'max_followers': 0,
+        }
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self._counters['coalesced'] += 1
+                self._counters['max_followers'] = max(self._counters['max_followers'], flight.followers)
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self._counters['leaders'] += 1
+            return flight, True
+
+    def land(self, key: str, flight: Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = copy.deepcopy(result) if flight.followers else result
+        flight.error = error
+        flight.done.set()
+
+    def abandon(self, key: str, flight: Flight) -> None:
+        self.land(key, flight, error=FlightAbandoned(key))
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        flight, leader = self.join(key)
+        while not leader:
+            try:
+                return flight.wait(), True
+            except FlightAbandoned:
+                flight, leader = self.join(key)
+        try:
+            result = function()
+        except BaseException as e:
+            self.land(key, flight, error=e)
+            raise
+        self.land(key, flight, result)
+        return result, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._flights)
+        calls = counters['leaders'] + counters['coalesced']
+        return {
+            **counters,
+            'in_flight': in_flight,
+            'coalesced_rate': round(counters['coalesced'] / calls * 100, 2) if calls else 0,
+        }
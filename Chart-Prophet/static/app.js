@@ -10,6 +10,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const resultsSection = document.getElementById('resultsSection');
     const newAnalysisBtn = document.getElementById('newAnalysisBtn');
 
+    const streamingEnabled = document.body.dataset.streamAnalysis !== 'off';
+
     let selectedFile = null;
 
     browseBtn.addEventListener('click', (e) => {
@@ -85,26 +87,104 @@ document.addEventListener('DOMContentLoaded', function() {
         formData.append('chart', selectedFile);
 
         try {
-            const response = await fetch('/analyze', {
-                method: 'POST',
-                body: formData
-            });
+            const streamed = streamingEnabled && await streamAnalysis(formData);
+            if (!streamed) {
+                const response = await fetch('/analyze', {
+                    method: 'POST',
+                    body: formData
+                });
 
-            const data = await response.json();
+                const data = await response.json();
 
-            if (data.error) {
-                throw new Error(data.error);
-            }
+                if (data.error) {
+                    throw new Error(data.error);
+                }
 
-            displayResults(data.analysis);
+                displayResults(data.analysis);
+            }
         } catch (error) {
             alert('Error analyzing chart: ' + error.message);
+            resultsSection.style.display = 'none';
             previewContainer.style.display = 'block';
         } finally {
             loadingSection.style.display = 'none';
         }
     });
 
+    async function streamAnalysis(formData) {
+        if (!window.ReadableStream || !window.TextDecoder) {
+            return false;
+        }
+
+        const response = await fetch('/analyze/stream', {
+            method: 'POST',
+            body: formData
+        });
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.ok || !response.body || !contentType.startsWith('text/event-stream')) {
+            if (response.status === 400) {
+                const data = await response.json();
+                throw new Error(data.error);
+            }
+            return false;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let shown = false;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                if (!message) {
+                    continue;
+                }
+
+                if (message.event === 'section') {
+                    if (!shown) {
+                        resetResults();
+                        showResults();
+                        shown = true;
+                    }
+                    renderField(message.data.field, message.data.value);
+                } else if (message.event === 'complete') {
+                    displayResults(message.data.analysis, shown);
+                    return true;
+                } else if (message.event === 'error') {
+                    throw new Error(message.data.error);
+                }
+            }
+        }
+
+        throw new Error('Analysis stream ended unexpectedly');
+    }
+
+    function parseEvent(chunk) {
+        let event = 'message';
+        const data = [];
+        chunk.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data.push(line.slice(5).trim());
+            }
+        });
+        if (data.length === 0) {
+            return null;
+        }
+        return { event: event, data: JSON.parse(data.join('\n')) };
+    }
+
     newAnalysisBtn.addEventListener('click', () => {
         selectedFile = null;
         fileInput.value = '';
@@ -113,77 +193,101 @@ document.addEventListener('DOMContentLoaded', function() {
         resultsSection.style.display = 'none';
     });
 
-    function displayResults(analysis) {
-        const recommendation = document.getElementById('recommendation');
-        const recommendationCard = document.getElementById('recommendationCard');
-        
-        recommendation.textContent = analysis.overall_recommendation || 'HOLD';
-        recommendation.className = 'recommendation-value';
-        
-        const rec = (analysis.overall_recommendation || '').toLowerCase();
-        if (rec.includes('buy')) {
-            recommendation.classList.add('buy');
-        } else if (rec.includes('sell')) {
-            recommendation.classList.add('sell');
-        } else {
-            recommendation.classList.add('hold');
-        }
-
-        const confidence = document.getElementById('confidence');
-        confidence.textContent = analysis.confidence_level || 'N/A';
+    const fieldRenderers = {
+        overall_recommendation: (value) => {
+            const recommendation = document.getElementById('recommendation');
+            recommendation.textContent = value || 'HOLD';
+            recommendation.className = 'recommendation-value';
 
-        const trend = document.getElementById('trend');
-        trend.textContent = analysis.trend_direction || 'N/A';
-        trend.className = 'meta-value';
-        if ((analysis.trend_direction || '').toLowerCase().includes('bullish')) {
-            trend.classList.add('bullish');
-        } else if ((analysis.trend_direction || '').toLowerCase().includes('bearish')) {
-            trend.classList.add('bearish');
-        }
-
-        const rsiBadge = document.getElementById('rsiBadge');
-        const rsiDesc = document.getElementById('rsiDescription');
-        if (analysis.rsi_analysis) {
-            rsiBadge.textContent = analysis.rsi_analysis.signal || 'NEUTRAL';
-            rsiBadge.className = 'indicator-badge ' + (analysis.rsi_analysis.signal || 'neutral').toLowerCase();
-            rsiDesc.textContent = analysis.rsi_analysis.description || 'RSI analysis not available';
+            const rec = (value || '').toLowerCase();
+            if (rec.includes('buy')) {
+                recommendation.classList.add('buy');
+            } else if (rec.includes('sell')) {
+                recommendation.classList.add('sell');
+            } else {
+                recommendation.classList.add('hold');
+            }
+        },
+        confidence_level: (value) => {
+            document.getElementById('confidence').textContent = value || 'N/A';
+        },
+        trend_direction: (value) => {
+            const trend = document.getElementById('trend');
+            trend.textContent = value || 'N/A';
+            trend.className = 'meta-value';
+            if ((value || '').toLowerCase().includes('bullish')) {
+                trend.classList.add('bullish');
+            } else if ((value || '').toLowerCase().includes('bearish')) {
+                trend.classList.add('bearish');
+            }
+        },
+        rsi_analysis: (value) => renderIndicator('rsiBadge', 'rsiDescription', value, 'RSI analysis not available'),
+        macd_analysis: (value) => renderIndicator('macdBadge', 'macdDescription', value, 'MACD analysis not available'),
+        support_levels: (value) => populateList('supportLevels', value),
+        resistance_levels: (value) => populateList('resistanceLevels', value),
+        entry_points: (value) => populateList('entryPoints', value),
+        exit_points: (value) => populateList('exitPoints', value),
+        key_observations: (value) => populateList('observations', value),
+        risk_factors: (value) => populateList('riskFactors', value),
+        fibonacci_levels: (value) => {
+            const fibLevels = document.getElementById('fibLevels');
+            fibLevels.innerHTML = '';
+            if (value && value.length > 0) {
+                value.forEach(fib => {
+                    const fibEl = document.createElement('div');
+                    fibEl.className = 'fib-level';
+                    fibEl.innerHTML = `
+                        <span class="level">${fib.level}</span>
+                        <span class="significance">${fib.significance}</span>
+                    `;
+                    fibLevels.appendChild(fibEl);
+                });
+            }
+        },
+        summary: (value) => {
+            document.getElementById('summary').textContent = value || 'Analysis complete.';
         }
+    };
 
-        const macdBadge = document.getElementById('macdBadge');
-        const macdDesc = document.getElementById('macdDescription');
-        if (analysis.macd_analysis) {
-            macdBadge.textContent = analysis.macd_analysis.signal || 'NEUTRAL';
-            macdBadge.className = 'indicator-badge ' + (analysis.macd_analysis.signal || 'neutral').toLowerCase();
-            macdDesc.textContent = analysis.macd_analysis.description || 'MACD analysis not available';
+    function renderField(field, value) {
+        const renderer = fieldRenderers[field];
+        if (renderer) {
+            renderer(value);
         }
+    }
 
-        populateList('supportLevels', analysis.support_levels);
-        populateList('resistanceLevels', analysis.resistance_levels);
-        populateList('entryPoints', analysis.entry_points);
-        populateList('exitPoints', analysis.exit_points);
-        populateList('observations', analysis.key_observations);
-        populateList('riskFactors', analysis.risk_factors);
-
-        const fibLevels = document.getElementById('fibLevels');
-        fibLevels.innerHTML = '';
-        if (analysis.fibonacci_levels && analysis.fibonacci_levels.length > 0) {
-            analysis.fibonacci_levels.forEach(fib => {
-                const fibEl = document.createElement('div');
-                fibEl.className = 'fib-level';
-                fibEl.innerHTML = `
-                    <span class="level">${fib.level}</span>
-                    <span class="significance">${fib.significance}</span>
-                `;
-                fibLevels.appendChild(fibEl);
-            });
+    function renderIndicator(badgeId, descriptionId, value, fallback) {
+        const badge = document.getElementById(badgeId);
+        const description = document.getElementById(descriptionId);
+        if (value) {
+            badge.textContent = value.signal || 'NEUTRAL';
+            badge.className = 'indicator-badge ' + (value.signal || 'neutral').toLowerCase();
+            description.textContent = value.description || fallback;
         }
+    }
 
-        document.getElementById('summary').textContent = analysis.summary || 'Analysis complete.';
+    function resetResults() {
+        ['supportLevels', 'resistanceLevels', 'entryPoints', 'exitPoints', 'observations', 'riskFactors'].forEach(id => {
+            document.getElementById(id).innerHTML = '<li>Analyzing...</li>';
+        });
+        document.getElementById('fibLevels').innerHTML = '';
+        document.getElementById('summary').textContent = 'Analyzing...';
+    }
 
+    function showResults() {
+        loadingSection.style.display = 'none';
         resultsSection.style.display = 'block';
         resultsSection.scrollIntoView({ behavior: 'smooth' });
     }
 
+    function displayResults(analysis, alreadyShown) {
+        Object.keys(fieldRenderers).forEach(field => renderField(field, analysis[field]));
+
+        if (!alreadyShown) {
+            showResults();
+        }
+    }
+
     function populateList(elementId, items) {
         const list = document.getElementById(elementId);
         list.innerHTML = '';
@@ -2,6 +2,8 @@ document.addEventListener('DOMContentLoaded', function() {
     let performanceChart = null;
     let distributionChart = null;
     let allTrades = [];
+    let tradeParams = null;
+    let nextCursor = null;
 
     loadData();
 
@@ -11,6 +13,7 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('closeModal').addEventListener('click', closeModal);
     document.getElementById('cancelBtn').addEventListener('click', closeModal);
     document.getElementById('tradeForm').addEventListener('submit', saveTrade);
+    document.getElementById('loadMoreBtn').addEventListener('click', loadMoreTrades);
 
     async function loadData() {
         const params = new URLSearchParams();
@@ -40,14 +43,46 @@ document.addEventListener('DOMContentLoaded', function() {
             }
 
             if (tradesData.success) {
+                tradeParams = params;
                 allTrades = tradesData.trades;
-                renderTrades(tradesData.trades);
+                setNextCursor(tradesData.next_cursor);
+                renderTrades(allTrades);
             }
         } catch (error) {
             console.error('Error loading data:', error);
         }
     }
 
+    async function loadMoreTrades() {
+        if (!nextCursor) return;
+
+        const params = new URLSearchParams(tradeParams);
+        params.set('cursor', nextCursor);
+
+        const loadMoreBtn = document.getElementById('loadMoreBtn');
+        loadMoreBtn.disabled = true;
+
+        try {
+            const response = await fetch(`/api/trades?${params}`);
+            const data = await response.json();
+
+            if (data.success) {
+                allTrades = allTrades.concat(data.trades);
+                setNextCursor(data.next_cursor);
+                appendTrades(data.trades);
+            }
+        } catch (error) {
+            console.error('Error loading trades:', error);
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    }
+
+    function setNextCursor(cursor) {
+        nextCursor = cursor;
+        document.getElementById('loadMoreContainer').style.display = cursor ? 'block' : 'none';
+    }
+
     function updateStats(stats) {
         document.getElementById('totalTrades').textContent = stats.total_trades;
         document.getElementById('winningTrades').textContent = stats.winning_trades;
@@ -149,7 +184,15 @@ document.addEventListener('DOMContentLoaded', function() {
         
         emptyMessage.style.display = 'none';
         
-        tbody.innerHTML = trades.map(trade => `
+        tbody.innerHTML = trades.map(tradeRow).join('');
+    }
+
+    function appendTrades(trades) {
+        document.getElementById('tradesBody').insertAdjacentHTML('beforeend', trades.map(tradeRow).join(''));
+    }
+
+    function tradeRow(trade) {
+        return `
             <tr>
                 <td>${trade.created_at ? new Date(trade.created_at).toLocaleDateString() : 'N/A'}</td>
                 <td>${trade.symbol || 'N/A'}</td>
@@ -172,7 +215,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     </button>
                 </td>
             </tr>
-        `).join('');
+        `;
     }
 
     function getRecommendationClass(rec) {
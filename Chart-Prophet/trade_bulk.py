@@ -0,0 +1,157 @@
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, select, update
+
+from models import Trade
+from trade_io import OUTCOMES
+from trade_queries import QueryError, apply_trade_filters
+from trade_rollups import apply_deltas, record_change, rollup_key
+
+PATCHABLE_FIELDS = ('outcome', 'profit_loss', 'exit_price', 'notes')
+NUMERIC_FIELDS = ('profit_loss', 'exit_price')
+FILTER_KEYS = ('start_date', 'end_date', 'indicator_type', 'outcome')
+MAX_BULK_TRADES = 1000
+
+
+def _validate_patch(patch: Dict[str, Any]) -> Optional[str]:
+    unknown = [key for key in patch if key not in PATCHABLE_FIELDS]
+    if unknown:
+        return f"Cannot update: {', '.join(unknown)}"
+    if not patch:
+        return 'No fields to update'
+    for key in NUMERIC_FIELDS:
+        value = patch.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)):
+            return f'{key} must be a number'
+    if patch.get('outcome') is not None and patch['outcome'] not in OUTCOMES:
+        return f"outcome must be one of: {', '.join(OUTCOMES)}"
+    if patch.get('notes') is not None and not isinstance(patch['notes'], str):
+        return 'notes must be a string'
+    return None
+
+
+def parse_updates(body: Any) -> List[Tuple[Any, Dict[str, Any]]]:
+    if not isinstance(body, dict):
+        raise QueryError('Request body must be a JSON object')
+    if 'updates' in body:
+        updates = body['updates']
+        if not isinstance(updates, list) or not all(isinstance(item, dict) for item in updates):
+            raise QueryError("'updates' must be a list of objects")
+        pairs = [(item.get('id'), {key: value for key, value in item.items() if key != 'id'}) for item in updates]
+    elif 'ids' in body:
+        if not isinstance(body['ids'], list) or not isinstance(body.get('patch'), dict):
+            raise QueryError("'ids' must be a list and 'patch' an object")
+        pairs = [(trade_id, dict(body['patch'])) for trade_id in body['ids']]
+    else:
+        raise QueryError("Provide 'updates' or 'ids' with 'patch'")
+    if not pairs:
+        raise QueryError('No trades to update')
+    if len(pairs) > MAX_BULK_TRADES:
+        raise QueryError(f'Update at most {MAX_BULK_TRADES} trades per request')
+    return pairs
+
+
+def _valid_id(trade_id: Any) -> bool:
+    return isinstance(trade_id, int) and not isinstance(trade_id, bool)
+
+
+def bulk_update_trades(db, pairs: List[Tuple[Any, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    patches: Dict[int, Dict[str, Any]] = {}
+    for trade_id, patch in pairs:
+        error = 'id must be an integer' if not _valid_id(trade_id) else _validate_patch(patch)
+        if error is None and trade_id in patches:
+            error = 'Duplicate id in request'
+        if error:
+            results.append({'id': trade_id, 'status': 'invalid', 'error': error})
+            continue
+        patches[trade_id] = patch
+        results.append({'id': trade_id, 'status': None})
+
+    if not patches:
+        return results
+
+    current = {
+        row.id: row for row in db.execute(
+            select(Trade.id, Trade.created_at, Trade.indicator_type, Trade.outcome, Trade.profit_loss)
+            .where(Trade.id.in_(list(patches)))
+            .with_for_update()
+        )
+    }
+
+    values = {}
+    for field in PATCHABLE_FIELDS:
+        whens = {trade_id: patch[field] for trade_id, patch in patches.items() if field in patch and trade_id in current}
+        if whens:
+            values[field] = case(whens, value=Trade.id, else_=getattr(Trade, field))
+    if current:
+        db.execute(
+            update(Trade).where(Trade.id.in_(list(current))).values(**values),
+            execution_options={'synchronize_session': False}
+        )
+
+    deltas: Dict[Any, List[float]] = {}
+    for trade_id, row in current.items():
+        patch = patches[trade_id]
+        outcome = patch.get('outcome', row.outcome)
+        profit_loss = patch.get('profit_loss', row.profit_loss)
+        record_change(
+            deltas,
+            (rollup_key(row.created_at, row.indicator_type, row.outcome), row.profit_loss or 0.0),
+            (rollup_key(row.created_at, row.indicator_type, outcome), profit_loss or 0.0)
+        )
+    apply_deltas(db, deltas)
+
+    for result in results:
+        if result['status'] is None:
+            result['status'] = 'updated' if result['id'] in current else 'not_found'
+    return results
+
+
+def parse_delete(body: Any) -> Tuple[Optional[List[int]], Optional[Dict[str, Any]]]:
+    if not isinstance(body, dict):
+        raise QueryError('Request body must be a JSON object')
+    if 'ids' in body:
+        ids = body['ids']
+        if not isinstance(ids, list) or not ids or not all(_valid_id(trade_id) for trade_id in ids):
+            raise QueryError("'ids' must be a non-empty list of integers")
+        if len(ids) > MAX_BULK_TRADES:
+            raise QueryError(f'Delete at most {MAX_BULK_TRADES} trades by id per request')
+        return list(dict.fromkeys(ids)), None
+    filters = body.get('filter')
+    if not isinstance(filters, dict):
+        raise QueryError("Provide 'ids' or a 'filter' object")
+    unknown = [key for key in filters if key not in FILTER_KEYS]
+    if unknown:
+        raise QueryError(f"Unknown filter keys: {', '.join(unknown)}")
+    if not any(value and value != 'all' for value in filters.values()):
+        raise QueryError('A delete filter must restrict at least one of: ' + ', '.join(FILTER_KEYS))
+    for key in ('start_date', 'end_date'):
+        if filters.get(key):
+            try:
+                datetime.fromisoformat(filters[key])
+            except (TypeError, ValueError):
+                raise QueryError(f'{key} must be an ISO 8601 date')
+    return None, filters
+
+
+def bulk_delete_trades(db, ids: Optional[List[int]] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    statement = delete(Trade)
+    statement = statement.where(Trade.id.in_(ids)) if ids is not None else apply_trade_filters(statement, filters)
+    deleted = db.execute(
+        statement.returning(Trade.id, Trade.created_at, Trade.indicator_type, Trade.outcome, Trade.profit_loss),
+        execution_options={'synchronize_session': False}
+    ).all()
+
+    deltas: Dict[Any, List[float]] = {}
+    for row in deleted:
+        record_change(deltas, (rollup_key(row.created_at, row.indicator_type, row.outcome), row.profit_loss or 0.0), None)
+    apply_deltas(db, deltas)
+
+    deleted_ids = {row.id for row in deleted}
+    if ids is None:
+        return [{'id': trade_id, 'status': 'deleted'} for trade_id in sorted(deleted_ids)]
+    return [{'id': trade_id, 'status': 'deleted' if trade_id in deleted_ids else 'not_found'} for trade_id in ids]
@@ -0,0 +1,232 @@
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import DateTime, Float, Integer, insert, select
+
+from analysis_store import load_analyses, store_analyses
+from models import Trade
+from trade_queries import STORED_FIELDS, TRADE_FIELDS, apply_trade_filters
+from trade_rollups import apply_deltas
+
+IMPORT_COLUMNS = tuple(
+    column.name for column in Trade.__table__.columns if column.name not in ('id', 'updated_at', 'analysis_id')
+)
+OUTCOMES = ('win', 'loss', 'pending')
+IMPORT_CHUNK_ROWS = 10000
+EXPORT_CHUNK_ROWS = 10000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: str, requested: Optional[str] = None) -> str:
+    file_format = (requested or filename.rsplit('.', 1)[-1]).lower()
+    if file_format not in ('csv', 'parquet'):
+        raise ImportFormatError("Unsupported format. Use 'csv' or 'parquet'")
+    return file_format
+
+
+def read_chunks(stream, file_format: str, chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    if file_format == 'parquet':
+        for batch in pq.ParquetFile(stream).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(stream, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+
+def _blank(values: pd.Series) -> pd.Series:
+    return values.isna() | (values.astype('string').str.strip() == '')
+
+
+def validate_chunk(frame: pd.DataFrame, first_row: int) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    frame = frame.rename(columns=lambda name: str(name).strip().lower())
+    clean = pd.DataFrame(index=frame.index)
+    checks = []
+
+    for name in IMPORT_COLUMNS:
+        column = Trade.__table__.c[name]
+        if name not in frame:
+            clean[name] = None
+            continue
+        raw = frame[name]
+        blank = _blank(raw)
+
+        if isinstance(column.type, Float):
+            values = pd.to_numeric(raw.where(~blank), errors='coerce').astype('float64')
+            checks.append((~blank & ~np.isfinite(values), f'{name} must be a number'))
+        elif isinstance(column.type, DateTime):
+            values = pd.to_datetime(raw.where(~blank), errors='coerce', utc=True, format='mixed').dt.tz_convert(None)
+            checks.append((~blank & values.isna(), f'{name} must be an ISO 8601 date or timestamp'))
+        else:
+            values = raw.astype('string').str.strip().where(~blank)
+            length = getattr(column.type, 'length', None)
+            if length:
+                checks.append((values.str.len().fillna(0) > length, f'{name} must be at most {length} characters'))
+        clean[name] = values
+
+    if 'raw_analysis' in frame:
+        raw = frame['raw_analysis']
+        clean['raw_analysis'] = raw.astype('string').where(~_blank(raw))
+    else:
+        clean['raw_analysis'] = None
+
+    clean['outcome'] = clean['outcome'].astype('string').str.lower()
+    checks.append((clean['outcome'].notna() & ~clean['outcome'].isin(OUTCOMES), f"outcome must be one of: {', '.join(OUTCOMES)}"))
+    clean['recommendation'] = clean['recommendation'].astype('string').fillna('HOLD')
+    clean['created_at'] = pd.to_datetime(clean['created_at']).fillna(pd.Timestamp(datetime.utcnow()))
+
+    invalid = pd.Series(False, index=frame.index)
+    for mask, _ in checks:
+        invalid |= mask.fillna(False).astype(bool)
+
+    errors = []
+    for position in invalid.to_numpy().nonzero()[0][:MAX_REPORTED_ERRORS]:
+        errors.append({
+            'row': first_row + int(position),
+            'errors': [message for mask, message in checks if bool(mask.fillna(False).iloc[position])]
+        })
+
+    return clean.loc[~invalid], errors
+
+
+def rollup_deltas(frame: pd.DataFrame) -> Dict[Tuple, List[float]]:
+    grouped = pd.DataFrame({
+        'day': frame['created_at'].dt.date,
+        'indicator_type': frame['indicator_type'].astype('string').fillna(''),
+        'outcome': frame['outcome'].astype('string').fillna(''),
+        'profit_loss': frame['profit_loss'].astype('float64').fillna(0.0),
+    }).groupby(['day', 'indicator_type', 'outcome'])['profit_loss'].agg(['count', 'sum'])
+    return {key: [int(count), float(total)] for key, count, total in zip(grouped.index, grouped['count'], grouped['sum'])}
+
+
+def _as_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    columns = []
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns.append(values.dt.to_pydatetime().tolist())
+        else:
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+    names = list(frame.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def insert_chunk(db, frame: pd.DataFrame) -> None:
+    analyses = frame.pop('raw_analysis').astype(object)
+    analysis_ids = store_analyses(db, analyses.where(analyses.notna(), None).tolist())
+    frame = frame.assign(
+        analysis_id=pd.array(analysis_ids, dtype='Int64'),
+        updated_at=pd.Timestamp(datetime.utcnow())
+    )
+    connection = db.connection()
+    if connection.dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        frame.to_csv(buffer, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY trades ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(Trade.__table__), _as_records(frame))
+    apply_deltas(db, rollup_deltas(frame))
+
+
+def import_trades(db, stream, file_format: str, skip_invalid: bool = False,
+                  chunk_rows: int = IMPORT_CHUNK_ROWS) -> Dict[str, Any]:
+    imported = 0
+    rejected = 0
+    errors: List[Dict[str, Any]] = []
+    first_row = 1
+
+    for chunk in read_chunks(stream, file_format, chunk_rows):
+        clean, chunk_errors = validate_chunk(chunk, first_row)
+        first_row += len(chunk)
+        rejected += len(chunk) - len(clean)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        if rejected and not skip_invalid:
+            continue
+        if len(clean):
+            insert_chunk(db, clean)
+            imported += len(clean)
+
+    return {
+        'imported': imported if skip_invalid or not rejected else 0,
+        'rejected': rejected,
+        'errors': errors
+    }
+
+
+def _arrow_schema(fields: Tuple[str, ...]):
+    types = []
+    for name in fields:
+        column_type = None if name in STORED_FIELDS else Trade.__table__.c[name].type
+        if isinstance(column_type, Integer):
+            types.append(pa.field(name, pa.int64()))
+        elif isinstance(column_type, Float):
+            types.append(pa.field(name, pa.float64()))
+        elif isinstance(column_type, DateTime):
+            types.append(pa.field(name, pa.timestamp('us')))
+        else:
+            types.append(pa.field(name, pa.string()))
+    return pa.schema(types)
+
+
+def export_chunks(db, args, fields: Tuple[str, ...] = TRADE_FIELDS,
+                  chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    columns = [Trade.__table__.c[STORED_FIELDS.get(name, name)] for name in fields]
+    statement = apply_trade_filters(select(*columns), args)
+    result = db.execute(statement.order_by(Trade.id).execution_options(yield_per=chunk_rows))
+    for rows in result.partitions():
+        frame = pd.DataFrame.from_records(rows, columns=list(fields))
+        for name in fields:
+            if name in STORED_FIELDS:
+                analyses = load_analyses(db, frame[name].dropna().astype(int).tolist())
+                frame[name] = frame[name].map(analyses)
+        yield frame
+
+
+def export_csv(chunks: Iterator[pd.DataFrame], fields: Tuple[str, ...]) -> Iterator[str]:
+    yield pd.DataFrame(columns=list(fields)).to_csv(index=False)
+    for frame in chunks:
+        yield frame.to_csv(index=False, header=False, date_format='%Y-%m-%dT%H:%M:%S.%f')
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def export_parquet(chunks: Iterator[pd.DataFrame], fields: Tuple[str, ...]) -> Iterator[bytes]:
+    schema = _arrow_schema(fields)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for frame in chunks:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
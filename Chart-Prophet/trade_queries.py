@@ -0,0 +1,237 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, or_, tuple_
+from sqlalchemy.orm import load_only
+
+import metrics
+from analysis_store import load_analyses
+from models import Trade
+
+TRADE_FIELDS = (
+    'id',
+    'created_at',
+    'symbol',
+    'recommendation',
+    'confidence_level',
+    'trend_direction',
+    'outcome',
+    'profit_loss',
+    'indicator_type',
+    'rsi_signal',
+    'macd_signal',
+    'entry_price',
+    'exit_price',
+    'notes',
+)
+OPTIONAL_FIELDS = ('raw_analysis',)
+STORED_FIELDS = {'raw_analysis': 'analysis_id'}
+SORTABLE_FIELDS = ('created_at', 'profit_loss', 'entry_price', 'exit_price', 'symbol', 'id')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class QueryError(ValueError):
+    pass
+
+
+def apply_trade_filters(query, args, include_outcome: bool = True):
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    indicator_type = args.get('indicator_type')
+    outcome = args.get('outcome')
+
+    if start_date:
+        query = query.filter(Trade.created_at >= datetime.fromisoformat(start_date))
+    if end_date:
+        end = datetime.fromisoformat(end_date) + timedelta(days=1)
+        query = query.filter(Trade.created_at < end)
+    if indicator_type and indicator_type != 'all':
+        query = query.filter(Trade.indicator_type == indicator_type)
+    if include_outcome and outcome and outcome != 'all':
+        query = query.filter(Trade.outcome == outcome)
+    return query
+
+
+def parse_fields(value: Optional[str]) -> Tuple[str, ...]:
+    if not value:
+        return TRADE_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in TRADE_FIELDS + OPTIONAL_FIELDS]
+    if unknown:
+        raise QueryError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_sort(value: Optional[str]) -> Tuple[str, bool]:
+    value = value or '-created_at'
+    descending = value.startswith('-')
+    column = value.lstrip('-+')
+    if column not in SORTABLE_FIELDS:
+        raise QueryError(f"Cannot sort by '{column}'. Use one of: {', '.join(SORTABLE_FIELDS)}")
+    return column, descending
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise QueryError('limit must be an integer')
+    if limit < 1:
+        raise QueryError('limit must be at least 1')
+    return min(limit, maximum)
+
+
+def _encode_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(sort_column: str, descending: bool, value: Any, trade_id: int) -> str:
+    payload = json.dumps([sort_column, descending, _encode_value(value), trade_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_column: str, descending: bool) -> Tuple[Any, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        column, cursor_descending, value, trade_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise QueryError('Invalid cursor')
+    if column != sort_column or cursor_descending != descending or not isinstance(trade_id, int):
+        raise QueryError('Cursor does not match the requested sort order')
+    if column == 'created_at' and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, trade_id
+
+
+def build_page_queries(query, sort_column: str, descending: bool, cursor: Optional[str] = None,
+                       fields: Tuple[str, ...] = TRADE_FIELDS) -> Tuple[Any, Any]:
+    column = getattr(Trade, sort_column)
+    loaded = dict.fromkeys(tuple(STORED_FIELDS.get(field, field) for field in fields) + ('id', sort_column))
+    query = query.options(load_only(*(getattr(Trade, field) for field in loaded)))
+
+    id_order = Trade.id.desc() if descending else Trade.id.asc()
+    nulls = None
+    if Trade.__table__.c[sort_column].nullable:
+        nulls = query.filter(column.is_(None)).order_by(id_order)
+
+    values = query.filter(column.isnot(None))
+    if cursor:
+        value, trade_id = decode_cursor(cursor, sort_column, descending)
+        if value is None:
+            if nulls is None:
+                raise QueryError('Invalid cursor')
+            return None, nulls.filter(Trade.id < trade_id if descending else Trade.id > trade_id)
+        key = tuple_(column, Trade.id)
+        values = values.filter(key < tuple_(value, trade_id) if descending else key > tuple_(value, trade_id))
+
+    values = values.order_by(column.desc() if descending else column.asc(), id_order)
+    return values, nulls
+
+
+def paginate_trades(query, sort_column: str, descending: bool, limit: int,
+                    cursor: Optional[str] = None, fields: Tuple[str, ...] = TRADE_FIELDS) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    values, nulls = build_page_queries(query, sort_column, descending, cursor, fields)
+
+    with metrics.stage('query'):
+        rows = values.limit(limit + 1).all() if values is not None else []
+        if len(rows) <= limit and nulls is not None:
+            rows += nulls.limit(limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_column, descending, getattr(last, sort_column), last.id)
+
+    analyses = None
+    if 'raw_analysis' in fields:
+        with metrics.stage('load_analyses'):
+            analyses = load_analyses(query.session, (trade.analysis_id for trade in rows))
+
+    with metrics.stage('serialize'):
+        return [serialize_trade(trade, fields, analyses) for trade in rows], next_cursor
+
+
+def serialize_trade(trade: Trade, fields: Tuple[str, ...] = TRADE_FIELDS,
+                    analyses: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+    row = {}
+    for field in fields:
+        if field == 'raw_analysis':
+            row[field] = (analyses or {}).get(trade.analysis_id)
+        else:
+            row[field] = _encode_value(getattr(trade, field))
+    return row
+
+
+def count_where(condition, weight: Any = 1):
+    return func.coalesce(func.sum(case((condition, weight), else_=0)), 0)
+
+
+def _day_key(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)[:10]
+
+
+def compute_stats_query(db, args):
+    day = func.date(Trade.created_at)
+    indicator = func.coalesce(Trade.indicator_type, 'Unknown')
+    query = db.query(
+        day.label('day'),
+        indicator.label('indicator'),
+        func.count(Trade.id),
+        count_where(Trade.outcome == 'win'),
+        count_where(Trade.outcome == 'loss'),
+        count_where(or_(Trade.outcome.is_(None), Trade.outcome == 'pending')),
+        func.coalesce(func.sum(Trade.profit_loss), 0.0)
+    )
+    return apply_trade_filters(query, args, include_outcome=False).group_by(day, Trade.indicator_type)
+
+
+def summarize_stats(rows) -> Dict[str, Any]:
+    totals = {'total': 0, 'wins': 0, 'losses': 0, 'pending': 0, 'profit_loss': 0.0}
+    performance_by_date: Dict[str, Dict[str, Any]] = {}
+    performance_by_indicator: Dict[str, Dict[str, int]] = {}
+
+    for day_value, indicator_type, total, wins, losses, pending, profit_loss in rows:
+        totals['total'] += total
+        totals['wins'] += wins
+        totals['losses'] += losses
+        totals['pending'] += pending
+        totals['profit_loss'] += profit_loss
+
+        date_key = _day_key(day_value)
+        if date_key is not None:
+            bucket = performance_by_date.setdefault(date_key, {'wins': 0, 'losses': 0, 'pending': 0, 'profit_loss': 0})
+            bucket['wins'] += wins
+            bucket['losses'] += losses
+            bucket['pending'] += total - wins - losses
+            bucket['profit_loss'] += profit_loss
+
+        bucket = performance_by_indicator.setdefault(indicator_type, {'wins': 0, 'losses': 0, 'total': 0})
+        bucket['wins'] += wins
+        bucket['losses'] += losses
+        bucket['total'] += total
+
+    win_rate = (totals['wins'] / totals['total'] * 100) if totals['total'] > 0 else 0
+
+    return {
+        'total_trades': totals['total'],
+        'winning_trades': totals['wins'],
+        'losing_trades': totals['losses'],
+        'pending_trades': totals['pending'],
+        'win_rate': round(win_rate, 2),
+        'total_profit_loss': round(totals['profit_loss'], 2),
+        'performance_by_date': performance_by_date,
+        'performance_by_indicator': performance_by_indicator
+    }
+
+
+def compute_stats(db, args) -> Dict[str, Any]:
+    return summarize_stats(compute_stats_query(db, args))
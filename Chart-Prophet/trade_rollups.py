@@ -0,0 +1,230 @@
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, insert, literal_column, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import JournalVersion, SessionLocal, Trade, TradeDailyRollup
+from trade_queries import count_where, summarize_stats
+
+NO_DAY = date.min
+PROFIT_LOSS_TOLERANCE = 1e-6
+JOURNAL_VERSION_ID = 1
+
+RollupKey = Tuple[date, str, str]
+Contribution = Tuple[RollupKey, float]
+Watermark = Tuple[Optional[datetime], int, int]
+
+
+def rollup_key(created_at: Optional[datetime], indicator_type: Optional[str], outcome: Optional[str]) -> RollupKey:
+    return (created_at.date() if created_at else NO_DAY, indicator_type or '', outcome or '')
+
+
+def trade_contribution(trade: Trade) -> Contribution:
+    return rollup_key(trade.created_at, trade.indicator_type, trade.outcome), trade.profit_loss or 0.0
+
+
+def record_change(deltas: Dict[RollupKey, List[float]], before: Optional[Contribution],
+                  after: Optional[Contribution]) -> Dict[RollupKey, List[float]]:
+    for contribution, sign in ((before, -1), (after, 1)):
+        if contribution is None:
+            continue
+        key, profit_loss = contribution
+        delta = deltas.setdefault(key, [0, 0.0])
+        delta[0] += sign
+        delta[1] += sign * profit_loss
+    return deltas
+
+
+def _key_filter(key: RollupKey):
+    day, indicator_type, outcome = key
+    return and_(
+        TradeDailyRollup.day == day,
+        TradeDailyRollup.indicator_type == indicator_type,
+        TradeDailyRollup.outcome == outcome
+    )
+
+
+def _upsert_many(db, rows: List[Dict[str, Any]]) -> None:
+    table = TradeDailyRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(table)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.indicator_type, table.c.outcome],
+            set_={
+                'trade_count': table.c.trade_count + statement.excluded.trade_count,
+                'profit_loss_sum': table.c.profit_loss_sum + statement.excluded.profit_loss_sum
+            }
+        ), rows)
+        return
+
+    for row in rows:
+        key = (row['day'], row['indicator_type'], row['outcome'])
+        updated = db.execute(update(table).where(_key_filter(key)).values(
+            trade_count=table.c.trade_count + row['trade_count'],
+            profit_loss_sum=table.c.profit_loss_sum + row['profit_loss_sum']
+        ))
+        if updated.rowcount == 0:
+            db.execute(insert(table).values(**row))
+
+
+def bump_journal_version(db) -> None:
+    table = JournalVersion.__table__
+    bumped = db.execute(update(table).where(table.c.id == JOURNAL_VERSION_ID).values(version=table.c.version + 1))
+    if bumped.rowcount == 0:
+        db.execute(insert(table).values(id=JOURNAL_VERSION_ID, version=1))
+
+
+def apply_deltas(db, deltas: Dict[RollupKey, List[float]]) -> None:
+    bump_journal_version(db)
+    rows = [{
+        'day': key[0],
+        'indicator_type': key[1],
+        'outcome': key[2],
+        'trade_count': count,
+        'profit_loss_sum': profit_loss
+    } for key, (count, profit_loss) in sorted(deltas.items()) if count or profit_loss]
+    if not rows:
+        return
+    _upsert_many(db, rows)
+
+    emptied = [row for row in rows if row['trade_count'] < 0]
+    if emptied:
+        table = TradeDailyRollup.__table__
+        db.execute(delete(table).where(
+            table.c.day == bindparam('key_day'),
+            table.c.indicator_type == bindparam('key_indicator_type'),
+            table.c.outcome == bindparam('key_outcome'),
+            table.c.trade_count <= 0
+        ), [{
+            'key_day': row['day'],
+            'key_indicator_type': row['indicator_type'],
+            'key_outcome': row['outcome']
+        } for row in emptied])
+
+
+def apply_trade_change(db, before: Optional[Contribution], after: Optional[Contribution]) -> None:
+    apply_deltas(db, record_change({}, before, after) if before != after else {})
+
+
+def _day_bound(value: Optional[str]) -> Tuple[bool, Optional[date]]:
+    if not value:
+        return True, None
+    moment = datetime.fromisoformat(value)
+    return moment.time() == time.min, moment.date()
+
+
+def rollup_stats(db, args) -> Optional[Dict[str, Any]]:
+    start_aligned, start = _day_bound(args.get('start_date'))
+    end_aligned, end = _day_bound(args.get('end_date'))
+    if not (start_aligned and end_aligned):
+        return None
+
+    indicator_type = args.get('indicator_type')
+    query = db.query(
+        func.nullif(TradeDailyRollup.day, NO_DAY),
+        func.coalesce(func.nullif(TradeDailyRollup.indicator_type, ''), 'Unknown'),
+        func.coalesce(func.sum(TradeDailyRollup.trade_count), 0),
+        count_where(TradeDailyRollup.outcome == 'win', TradeDailyRollup.trade_count),
+        count_where(TradeDailyRollup.outcome == 'loss', TradeDailyRollup.trade_count),
+        count_where(TradeDailyRollup.outcome.in_(('', 'pending')), TradeDailyRollup.trade_count),
+        func.coalesce(func.sum(TradeDailyRollup.profit_loss_sum), 0.0)
+    )
+    if start:
+        query = query.filter(TradeDailyRollup.day >= start)
+    if end:
+        query = query.filter(TradeDailyRollup.day > NO_DAY, TradeDailyRollup.day < end + timedelta(days=1))
+    if indicator_type and indicator_type != 'all':
+        query = query.filter(TradeDailyRollup.indicator_type == indicator_type)
+
+    return summarize_stats(query.group_by(TradeDailyRollup.day, TradeDailyRollup.indicator_type))
+
+
+def journal_watermark(db) -> Watermark:
+    trade_count = select(func.coalesce(func.sum(TradeDailyRollup.trade_count), 0)).scalar_subquery()
+    version = select(func.coalesce(func.max(JournalVersion.version), 0)).scalar_subquery()
+    latest, count, version = db.execute(select(func.max(Trade.updated_at), trade_count, version)).one()
+    return latest, int(count), int(version)
+
+
+def _base_aggregate():
+    day = func.date(Trade.created_at)
+    indicator_type = func.coalesce(Trade.indicator_type, literal_column("''"))
+    outcome = func.coalesce(Trade.outcome, literal_column("''"))
+    return select(
+        func.coalesce(day, NO_DAY),
+        indicator_type,
+        outcome,
+        func.count(Trade.id),
+        func.coalesce(func.sum(Trade.profit_loss), 0.0)
+    ).group_by(day, indicator_type, outcome)
+
+
+def rebuild_rollups(bind) -> None:
+    bind.execute(delete(TradeDailyRollup))
+    bind.execute(insert(TradeDailyRollup).from_select(
+        ['day', 'indicator_type', 'outcome', 'trade_count', 'profit_loss_sum'],
+        _base_aggregate()
+    ))
+
+
+def _as_date(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def verify_rollups(db) -> List[Dict[str, Any]]:
+    expected: Dict[RollupKey, List[float]] = {}
+    for day, indicator_type, outcome, count, profit_loss in db.execute(_base_aggregate()):
+        delta = expected.setdefault((_as_date(day), indicator_type, outcome), [0, 0.0])
+        delta[0] += count
+        delta[1] += profit_loss
+
+    actual = {
+        (row.day, row.indicator_type, row.outcome): (row.trade_count, row.profit_loss_sum)
+        for row in db.query(TradeDailyRollup)
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = tuple(expected.get(key, (0, 0.0)))
+        have = actual.get(key, (0, 0.0))
+        tolerance = PROFIT_LOSS_TOLERANCE * max(1.0, abs(want[1]))
+        if want[0] != have[0] or abs(want[1] - have[1]) > tolerance:
+            mismatches.append({
+                'day': None if key[0] == NO_DAY else key[0].isoformat(),
+                'indicator_type': key[1],
+                'outcome': key[2],
+                'expected': {'trade_count': want[0], 'profit_loss_sum': want[1]},
+                'actual': {'trade_count': have[0], 'profit_loss_sum': have[1]}
+            })
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Rebuild or verify the trade_daily_rollups summary table.')
+    parser.add_argument('command', choices=('rebuild', 'verify'))
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.command == 'rebuild':
+            rebuild_rollups(db)
+            db.commit()
+            print(f'rebuilt {db.query(TradeDailyRollup).count()} rollup rows')
+            return 0
+
+        mismatches = verify_rollups(db)
+        for mismatch in mismatches:
+            print(f"{mismatch['day']} {mismatch['indicator_type'] or '-'} {mismatch['outcome'] or '-'}: "
+                  f"expected {mismatch['expected']} got {mismatch['actual']}")
+        print('rollups match trades' if not mismatches else f'{len(mismatches)} rollup rows differ from trades')
+        return 1 if mismatches else 0
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())